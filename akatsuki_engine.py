@@ -0,0 +1,161 @@
+"""
+👹 AKATSUKI ENGINE - Load Once, Mutate in Memory, Save Once
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+A fight is loaded with its participants in a single query, every rule
+(join, turns, damage, cooldowns, rewards) is applied to the in-memory
+copy, and the result is written back in one transaction.
+
+Saves are optimistic: the fight row carries a `version`, and a save made
+from an outdated copy (double click, click during an AI turn) is rejected
+instead of overwriting newer state.
+
+Fight dict = akatsuki_fights row plus:
+    fight['players']    -> {user_id: player dict}
+    fight['originals']  -> {user_id: snapshot taken at load/join}
+"""
+
+import datetime
+import logging
+
+import cooldowns
+import database as db
+import game_logic as gl
+
+logger = logging.getLogger(__name__)
+
+PLAYER_SLOTS = ['player_1_id', 'player_2_id', 'player_3_id']
+AI_TURN = 'ai_turn'
+
+# ═══════════════════════════════════════
+# LOAD & SAVE
+# ═══════════════════════════════════════
+
+def load(chat_id, message_id):
+    """Fight + participants in one round trip, or None if the fight is gone."""
+    fight, players = db.load_akatsuki_fight(chat_id, message_id)
+    if not fight:
+        return None
+
+    fight['players'] = players
+    fight['originals'] = {user_id: db.snapshot_player(p) for user_id, p in players.items()}
+    return fight
+
+def _player_updates(fight):
+    return [
+        (user_id, player, fight['originals'].get(user_id))
+        for user_id, player in fight['players'].items()
+    ]
+
+def save(fight):
+    """Persist fight + changed player fields. False if the fight moved on meanwhile."""
+    if not db.save_akatsuki_fight(fight, _player_updates(fight)):
+        logger.info(f"Akatsuki fight {fight['message_id']}: stale save rejected (v{fight['version']})")
+        return False
+
+    fight['originals'] = {user_id: db.snapshot_player(p) for user_id, p in fight['players'].items()}
+    return True
+
+def finish(fight):
+    """Delete the fight row and write final player changes together."""
+    return db.save_akatsuki_fight(fight, _player_updates(fight), finished=True)
+
+# ═══════════════════════════════════════
+# PARTICIPANTS
+# ═══════════════════════════════════════
+
+def participant_ids(fight):
+    return [fight[slot] for slot in PLAYER_SLOTS if fight[slot]]
+
+def join(fight, player):
+    """
+    Put a player in the first free slot.
+    Returns 'already_joined', 'full', 'joined' or 'ready' (third player in).
+    """
+    user_id = player['user_id']
+    if user_id in participant_ids(fight):
+        return 'already_joined'
+
+    free = [slot for slot in PLAYER_SLOTS if not fight[slot]]
+    if not free:
+        return 'full'
+
+    fight[free[0]] = user_id
+    fight['players'][user_id] = player
+    fight['originals'][user_id] = db.snapshot_player(player)
+
+    if len(free) == 1:
+        fight['turn_player_id'] = str(fight['player_1_id'])
+        return 'ready'
+    return 'joined'
+
+def leave(fight, user_id):
+    """Remove a player from their slot. Returns True if nobody is left."""
+    for slot in PLAYER_SLOTS:
+        if fight[slot] == user_id:
+            fight[slot] = None
+    return not participant_ids(fight)
+
+def is_fainted(player):
+    return not player or player['current_hp'] <= 1
+
+def living_players(fight):
+    return [
+        fight['players'][user_id] for user_id in participant_ids(fight)
+        if not is_fainted(fight['players'].get(user_id))
+    ]
+
+# ═══════════════════════════════════════
+# TURNS & DAMAGE
+# ═══════════════════════════════════════
+
+def advance_turn(fight, from_start=False):
+    """
+    Move to the next living player after the current one, or to the AI
+    once the last slot has acted. `from_start` restarts at slot 1 (after the AI).
+    """
+    start = 0
+    if not from_start:
+        slot_ids = [str(fight[slot]) if fight[slot] else None for slot in PLAYER_SLOTS]
+        current = str(fight['turn_player_id'])
+        start = slot_ids.index(current) + 1 if current in slot_ids else len(PLAYER_SLOTS)
+
+    for slot in PLAYER_SLOTS[start:]:
+        user_id = fight[slot]
+        if user_id and not is_fainted(fight['players'].get(user_id)):
+            fight['turn_player_id'] = str(user_id)
+            return fight['turn_player_id']
+
+    fight['turn_player_id'] = AI_TURN
+    return AI_TURN
+
+def damage_enemy(fight, damage):
+    """Returns True if the enemy is defeated."""
+    fight['enemy_hp'] = max(0, fight['enemy_hp'] - damage)
+    return fight['enemy_hp'] == 0
+
+def damage_player(player, damage):
+    # Akatsuki hits never take a player below 1 HP (fainted)
+    player['current_hp'] = max(1, player['current_hp'] - damage)
+
+def set_cooldown(player, action, seconds):
+    """Start the cooldown in the fast registry now; the player column is saved with the fight."""
+    cooldowns.start('akatsuki', player['user_id'], action, seconds)
+    player_cooldowns = dict(player.get('akatsuki_cooldown') or {})
+    player_cooldowns[action] = (datetime.datetime.now() + datetime.timedelta(seconds=seconds)).isoformat()
+    player['akatsuki_cooldown'] = player_cooldowns
+
+def apply_rewards(fight, rewards):
+    """Credit rewards to every participant in memory. Returns level-up messages."""
+    msgs = []
+    for user_id in participant_ids(fight):
+        player = fight['players'].get(user_id)
+        if not player:
+            continue
+        player['ryo'] += rewards['ryo']
+        player['exp'] += rewards['exp']
+        player['total_exp'] += rewards['exp']
+        final_player, leveled_up, level_msgs = gl.check_for_level_up(player)
+        fight['players'][user_id] = final_player
+        if leveled_up:
+            msgs.append(f"@{final_player['username']}\n" + "\n".join(level_msgs))
+    return msgs
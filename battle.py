@@ -12,6 +12,7 @@ import json
 import datetime
 import asyncio
 import random
+import functools
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 from collections import Counter
@@ -21,6 +22,8 @@ import database as db
 import game_logic as gl
 import battle_core as bc
 import battle_actions as ba
+import battle_log as blog
+import spectator
 import auto_register
 
 logger = logging.getLogger(__name__)
@@ -32,17 +35,22 @@ logger = logging.getLogger(__name__)
 ACTIVE_BATTLES = {}
 BATTLE_INVITES = {}
 
+# Open escrows younger than this are never swept (battle may still be starting)
+ESCROW_SWEEP_MIN_AGE_MINUTES = 5
+ESCROW_SWEEP_INTERVAL_SECONDS = 600
+
 # ═══════════════════════════════════════
 # MENU FUNCTIONS
 # ═══════════════════════════════════════
 
-async def send_battle_menu(context: ContextTypes.DEFAULT_TYPE, battle_state, message_id=None):
-    """Send battle action menu"""
-    turn_player_id = battle_state['turn']
-    text = bc.get_enhanced_battle_display(battle_state)
-    
-    battle_state['base_text'] = text
-    
+@functools.lru_cache(maxsize=1024)
+def get_battle_keyboard(turn_player_id):
+    """
+    Build the 8-button action keyboard.
+    
+    Cached per turn_player_id: the buttons only depend on whose turn it
+    is, so the markup is reused across turns and battles.
+    """
     keyboard = [
         [
             InlineKeyboardButton("👊 Taijutsu", callback_data=f"battle_action_taijutsu_{turn_player_id}"),
@@ -62,7 +70,23 @@ async def send_battle_menu(context: ContextTypes.DEFAULT_TYPE, battle_state, mes
         ]
     ]
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return InlineKeyboardMarkup(keyboard)
+
+async def send_battle_menu(context: ContextTypes.DEFAULT_TYPE, battle_state, message_id=None):
+    """Send battle action menu"""
+    turn_player_id = battle_state['turn']
+    text = bc.get_enhanced_battle_display(battle_state)
+    
+    battle_state['base_text'] = text
+    spectator.publish(battle_state)
+    
+    render_key = (text, turn_player_id)
+    
+    # Skip the Telegram edit if the menu on screen is already identical
+    if message_id and battle_state.get('last_render') == render_key:
+        return message_id
+    
+    reply_markup = get_battle_keyboard(turn_player_id)
     
     try:
         if message_id:
@@ -73,6 +97,7 @@ async def send_battle_menu(context: ContextTypes.DEFAULT_TYPE, battle_state, mes
                 reply_markup=reply_markup,
                 parse_mode="HTML"
             )
+            battle_state['last_render'] = render_key
             return message_id
         else:
             message = await context.bot.send_message(
@@ -81,8 +106,12 @@ async def send_battle_menu(context: ContextTypes.DEFAULT_TYPE, battle_state, mes
                 reply_markup=reply_markup,
                 parse_mode="HTML"
             )
+            battle_state['last_render'] = render_key
             return message.message_id
     except Exception as e:
+        if "Message is not modified" in str(e):
+            battle_state['last_render'] = render_key
+            return message_id
         logger.error(f"Error sending battle menu: {e}")
         return message_id
 
@@ -96,28 +125,43 @@ async def end_battle(context: ContextTypes.DEFAULT_TYPE, battle_id, winner_id, l
     if not battle_state:
         return
     
+    blog.finish_battle(battle_state, winner_id)
+    
     winner = battle_state['players'][winner_id]
     loser = battle_state['players'][loser_id]
     
+    # Bets were debited into escrow when the battle started; pay the pot out
+    # from there so ryo changes made elsewhere during the fight are kept.
+    # Settled before the first await: the battle is no longer in
+    # ACTIVE_BATTLES, so escrow_sweep_job would otherwise refund it.
+    escrow_id = battle_state.get('escrow_id')
+    winner_ryo_gain = db.settle_battle_escrow(escrow_id, winner_id) if escrow_id else 0
+    
     if fled:
         result_text = f"🏃 <b>{loser['username']}</b> fled!\n<b>{winner['username']}</b> wins by forfeit!"
     else:
         result_text = f"🏆 <b>{winner['username']}</b> is VICTORIOUS!\n💀 {loser['username']} has been defeated!"
     
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=result_text,
-        reply_markup=None,
-        parse_mode="HTML"
-    )
+    spectator.publish_result(battle_state, result_text)
+    
+    try:
+        await context.bot.edit_message_text(
+            chat_id=chat_id,
+            message_id=message_id,
+            text=result_text,
+            reply_markup=None,
+            parse_mode="HTML"
+        )
+    except Exception as e:
+        logger.warning(f"Could not show result of battle {battle_id}: {e}")
     
     cooldown_time = datetime.datetime.now(timezone.utc) + datetime.timedelta(minutes=bc.BATTLE_COOLDOWN_MINUTES)
     
     winner_exp_gain = loser['level'] * 10
-    winner_ryo_gain = battle_state.get('winner_payout', loser['level'] * 20)
     
     achievements, bonus_ryo = bc.check_achievements(battle_state, winner_id, loser_id)
+    if bonus_ryo:
+        db.atomic_add_ryo(winner_id, bonus_ryo)
     winner_ryo_gain += bonus_ryo
     
     dropped, drop_key = bc.check_rare_drop()
@@ -126,7 +170,6 @@ async def end_battle(context: ContextTypes.DEFAULT_TYPE, battle_id, winner_id, l
     winner['battle_cooldown'] = cooldown_time
     winner['exp'] += winner_exp_gain
     winner['total_exp'] += winner_exp_gain
-    winner['ryo'] += winner_ryo_gain
     
     if dropped:
         winner_inv = winner.get('inventory', [])
@@ -134,7 +177,8 @@ async def end_battle(context: ContextTypes.DEFAULT_TYPE, battle_id, winner_id, l
         winner['inventory'] = winner_inv
     
     final_winner_data, leveled_up, level_messages = gl.check_for_level_up(winner)
-    db.update_player(winner_id, final_winner_data)
+    final_winner_data.pop('ryo', None)  # Ryo only moves through escrow/atomic updates
+    db.update_player(winner_id, final_winner_data, original=battle_state['snapshots'][winner_id])
     
     loser['losses'] += 1
     loser['battle_cooldown'] = cooldown_time
@@ -142,15 +186,11 @@ async def end_battle(context: ContextTypes.DEFAULT_TYPE, battle_id, winner_id, l
     loser['max_hp'] = loser_stats['max_hp']
     loser['current_hp'] = 1
     
-    loser_ryo_loss = battle_state.get('bet_amount', 0)
-    loser['ryo'] = max(0, loser['ryo'] - loser_ryo_loss)
-    
     db.update_player(loser_id, {
         'losses': loser['losses'],
         'battle_cooldown': loser['battle_cooldown'].isoformat(),
         'current_hp': loser['current_hp'],
-        'max_hp': loser['max_hp'],
-        'ryo': loser['ryo']
+        'max_hp': loser['max_hp']
     })
     
     reward_text = "\n\n<b>🎁 BATTLE REWARDS</b>\n"
@@ -176,6 +216,13 @@ async def end_battle(context: ContextTypes.DEFAULT_TYPE, battle_id, winner_id, l
         parse_mode="HTML"
     )
 
+async def escrow_sweep_job(context: ContextTypes.DEFAULT_TYPE):
+    """Refund escrows left open by battles that no longer exist in memory."""
+    active_escrow_ids = [bstate['escrow_id'] for bstate in ACTIVE_BATTLES.values() if bstate.get('escrow_id')]
+    await asyncio.to_thread(
+        db.sweep_orphaned_escrows, ESCROW_SWEEP_MIN_AGE_MINUTES, active_escrow_ids
+    )
+
 # ═══════════════════════════════════════
 # /BATTLE COMMAND
 # ═══════════════════════════════════════
@@ -252,6 +299,8 @@ async def battle_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"❌ Maximum bet: {max_bet:,} Ryo")
         return
     
+    # Quick check against the cached rows; the authoritative debit happens
+    # atomically in db.open_battle_escrow when the invite is accepted.
     if p1['ryo'] < bet_amount:
         await update.message.reply_text(f"💸 You need {bet_amount:,} Ryo! (You have: {p1['ryo']:,})")
         return
@@ -341,6 +390,7 @@ async def battle_invite_callback(update: Update, context: ContextTypes.DEFAULT_T
     
     p1 = dict(challenger)
     p2 = dict(challenged)
+    snapshots = {p1['user_id']: db.snapshot_player(p1), p2['user_id']: db.snapshot_player(p2)}
     
     p1['total_stats'] = gl.get_total_stats(p1)
     p2['total_stats'] = gl.get_total_stats(p2)
@@ -368,6 +418,19 @@ async def battle_invite_callback(update: Update, context: ContextTypes.DEFAULT_T
     }
     
     battle_id = f"{p1['user_id']}_vs_{p2['user_id']}"
+    
+    escrow_id, short_user_id = db.open_battle_escrow(
+        battle_id, p1['user_id'], p2['user_id'],
+        invite_data['bet_amount'], invite_data['winner_payout']
+    )
+    if not escrow_id:
+        if short_user_id:
+            short_name = p1['username'] if short_user_id == p1['user_id'] else p2['username']
+            await query.edit_message_text(f"💸 {short_name} can no longer afford the {invite_data['bet_amount']:,} Ryo bet!", reply_markup=None)
+        else:
+            await query.edit_message_text("❌ Couldn't lock the bets. Try again.", reply_markup=None)
+        return
+    
     battle_state = {
         'players': {p1['user_id']: p1, p2['user_id']: p2},
         'player_states': player_states,
@@ -380,9 +443,12 @@ async def battle_invite_callback(update: Update, context: ContextTypes.DEFAULT_T
         'pot_amount': invite_data['total_pot'],
         'house_fee': invite_data['house_fee'],
         'winner_payout': invite_data['winner_payout'],
+        'escrow_id': escrow_id,
+        'snapshots': snapshots,
         'start_time': datetime.datetime.now(timezone.utc)
     }
     
+    blog.start_battle(battle_state)
     ACTIVE_BATTLES[battle_id] = battle_state
     
     ACTIVE_BATTLES[battle_id]['message_id'] = await send_battle_menu(
@@ -423,7 +489,6 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
         now = datetime.datetime.now(timezone.utc)
         elapsed_minutes = (now - start_time).total_seconds() / 60
         if elapsed_minutes > bc.BATTLE_TIMEOUT_MINUTES:
-            ACTIVE_BATTLES.pop(battle_id)
             other_player_id = [pid for pid in battle_state['players'] if pid != player_id][0]
             await query.answer("Battle timed out!", show_alert=True)
             await query.edit_message_text(
@@ -454,12 +519,7 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
         known_jutsus = attacker.get('known_jutsus', [])
         
         if not known_jutsus:
-            await context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=f"{battle_state['base_text']}\n\n<i>❌ You don't know any jutsus!</i>",
-                parse_mode="HTML"
-            )
+            await ba.edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>❌ You don't know any jutsus!</i>")
             await asyncio.sleep(1.5)
             await send_battle_menu(context, battle_state, message_id)
             return
@@ -473,13 +533,7 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
         
         keyboard.append([InlineKeyboardButton("❌ Cancel", callback_data=f"battle_jutsu_{player_id}_cancel")])
         
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=f"{battle_state['base_text']}\n\n<b>Select a Jutsu:</b>",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode="HTML"
-        )
+        await ba.edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<b>Select a Jutsu:</b>", reply_markup=InlineKeyboardMarkup(keyboard))
         return
     
     elif action == "item":
@@ -487,12 +541,7 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
         inventory = attacker.get('inventory', [])
         
         if not inventory:
-            await context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=f"{battle_state['base_text']}\n\n<i>❌ Inventory empty!</i>",
-                parse_mode="HTML"
-            )
+            await ba.edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>❌ Inventory empty!</i>")
             await asyncio.sleep(1.5)
             await send_battle_menu(context, battle_state, message_id)
             return
@@ -508,13 +557,7 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
         
         keyboard.append([InlineKeyboardButton("❌ Cancel", callback_data=f"battle_item_{player_id}_cancel")])
         
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=f"{battle_state['base_text']}\n\n<b>Select an Item:</b>",
-            reply_markup=InlineKeyboardMarkup(keyboard),
-            parse_mode="HTML"
-        )
+        await ba.edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<b>Select an Item:</b>", reply_markup=InlineKeyboardMarkup(keyboard))
         return
     
     elif action == "predict":
@@ -530,6 +573,9 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
         await end_battle(context, battle_id, defender_id, player_id, chat_id, message_id, fled=True)
     elif result == 'draw':
         ACTIVE_BATTLES.pop(battle_id)
+        blog.finish_battle(battle_state, None)
+        db.refund_battle_escrow(battle_state['escrow_id'])
+        spectator.publish_result(battle_state, "⏱️ <b>DRAW!</b> Battle reached max turns.")
         await context.bot.edit_message_text(
             chat_id=chat_id,
             message_id=message_id,
@@ -540,6 +586,39 @@ async def battle_action_callback(update: Update, context: ContextTypes.DEFAULT_T
     elif result == 'continue':
         await send_battle_menu(context, battle_state, message_id)
 
+# ═══════════════════════════════════════
+# /WATCH COMMAND
+# ═══════════════════════════════════════
+
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Spectate an active battle: reply to a fighter or pass their user id."""
+    if update.message.reply_to_message:
+        fighter_id = update.message.reply_to_message.from_user.id
+    elif context.args and context.args[0].isdigit():
+        fighter_id = int(context.args[0])
+    else:
+        await update.message.reply_text(
+            "👀 <b>WATCH A BATTLE</b>\n\n"
+            "Reply to a fighter with <code>/watch</code>\n"
+            "or use <code>/watch [user_id]</code>",
+            parse_mode="HTML"
+        )
+        return
+    
+    battle_state = next((bstate for bstate in ACTIVE_BATTLES.values() 
+                         if fighter_id in bstate['players']), None)
+    
+    if not battle_state:
+        await update.message.reply_text("❌ That ninja isn't in a battle right now.")
+        return
+    
+    if spectator.spectator_count(battle_state) >= spectator.MAX_SPECTATORS:
+        await update.message.reply_text("🏟️ This battle is full of spectators!")
+        return
+    
+    message = await update.message.reply_text(spectator.render_view(battle_state), parse_mode="HTML")
+    spectator.subscribe(battle_state, ('chat', message.chat_id, message.message_id))
+
 # ═══════════════════════════════════════
 # STANCE CALLBACK - FIXED
 # ═══════════════════════════════════════
@@ -697,18 +776,14 @@ async def battle_predict_callback(update: Update, context: ContextTypes.DEFAULT_
     
     # Get opponent ID
     opponent_id = [pid for pid in battle_state['players'] if pid != player_id][0]
+    blog.record(battle_state, player_id, blog.PREDICT)
     
     # Show waiting message
     text = f"{battle_state['base_text']}\n\n"
     text += f"<b>🎯 {battle_state['players'][player_id]['username']} is reading opponent's moves...</b>\n\n"
     text += f"<i>Waiting for {battle_state['players'][opponent_id]['username']}'s action...</i>"
     
-    await context.bot.edit_message_text(
-        chat_id=battle_state['chat_id'],
-        message_id=battle_state['message_id'],
-        text=text,
-        parse_mode="HTML"
-    )
+    await ba.edit_battle_text(context, battle_state, battle_state['message_id'], text)
     await asyncio.sleep(1.5)
     
     # Switch turn to opponent - they must now act
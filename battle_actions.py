@@ -13,9 +13,30 @@ from collections import Counter
 import game_logic as gl
 import animations as anim
 import battle_core as bc
+import battle_log as blog
 
 logger = logging.getLogger(__name__)
 
+# ═══════════════════════════════════════
+# MESSAGE HELPER
+# ═══════════════════════════════════════
+
+async def edit_battle_text(context, battle_state, message_id, text, reply_markup=None):
+    """
+    Edit the battle message with an intermediate (non-menu) frame.
+    
+    Clears the cached menu render so the next send_battle_menu call
+    always redraws the action menu over this frame.
+    """
+    battle_state['last_render'] = None
+    await context.bot.edit_message_text(
+        chat_id=battle_state['chat_id'],
+        message_id=message_id,
+        text=text,
+        reply_markup=reply_markup,
+        parse_mode="HTML"
+    )
+
 # ═══════════════════════════════════════
 # TAIJUTSU ACTION
 # ═══════════════════════════════════════
@@ -44,16 +65,12 @@ async def execute_taijutsu(context, battle_state, attacker_id, defender_id, mess
     if 'stun' in attacker_state['status_effects']:
         if random.random() < bc.STATUS_EFFECTS['stun']['skip_chance']:
             # Stunned! Skip turn
-            await context.bot.edit_message_text(
-                chat_id=chat_id,
-                message_id=message_id,
-                text=f"{battle_state['base_text']}\n\n<i>⚡ {attacker['username']} is STUNNED and can't move!</i>",
-                parse_mode="HTML"
-            )
+            await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>⚡ {attacker['username']} is STUNNED and can't move!</i>")
             await asyncio.sleep(2)
             
             # Reset combo
             attacker_state['combo'] = 0
+            blog.record(battle_state, attacker_id, blog.STUNNED)
             
             # Switch turn
             return await switch_turn(context, battle_state, defender_id, message_id)
@@ -69,12 +86,7 @@ async def execute_taijutsu(context, battle_state, attacker_id, defender_id, mess
     )
     
     # Show processing
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=f"{battle_state['base_text']}\n\n<i>👊 {attacker['username']} prepares to strike...</i>",
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>👊 {attacker['username']} prepares to strike...</i>")
     await asyncio.sleep(1)
     
     # Apply damage
@@ -87,6 +99,8 @@ async def execute_taijutsu(context, battle_state, attacker_id, defender_id, mess
     # Reset defender combo (took damage)
     defender_state['combo'] = 0
     
+    blog.record(battle_state, attacker_id, blog.TAIJUTSU, damage=final_damage, crit=is_crit)
+    
     # Build result text
     result_text = f"{battle_state['base_text']}\n\n"
     
@@ -101,12 +115,7 @@ async def execute_taijutsu(context, battle_state, attacker_id, defender_id, mess
     result_text += f"<b>💢 {final_damage} damage!</b>"
     
     # Show result
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=result_text,
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, result_text)
     await asyncio.sleep(2)
     
     # Check for KO
@@ -148,12 +157,7 @@ async def execute_jutsu(context, battle_state, attacker_id, defender_id, jutsu_k
     
     # Check chakra
     if attacker['current_chakra'] < jutsu_info['chakra_cost']:
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=f"{battle_state['base_text']}\n\n<i>❌ Not enough chakra!</i>",
-            parse_mode="HTML"
-        )
+        await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>❌ Not enough chakra!</i>")
         await asyncio.sleep(1.5)
         return 'continue'
     
@@ -172,12 +176,7 @@ async def execute_jutsu(context, battle_state, attacker_id, defender_id, jutsu_k
     
     # Show jutsu activation
     jutsu_name = jutsu_info['name']
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=f"{battle_state['base_text']}\n\n<i>🌀 {attacker['username']} uses <b>{jutsu_name}</b>!</i>",
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>🌀 {attacker['username']} uses <b>{jutsu_name}</b>!</i>")
     await asyncio.sleep(1.5)
     
     # Apply damage
@@ -193,6 +192,13 @@ async def execute_jutsu(context, battle_state, attacker_id, defender_id, jutsu_k
         attacker, defender_state, jutsu_info['element']
     )
     
+    blog.record(
+        battle_state, attacker_id, blog.JUTSU,
+        damage=final_damage, chakra_delta=-jutsu_info['chakra_cost'],
+        crit=is_crit, super_effective=is_super_eff,
+        status=blog.STATUS_CODES[effect_key] if status_applied else 0
+    )
+    
     # Build result text
     result_text = f"{battle_state['base_text']}\n\n"
     
@@ -224,12 +230,7 @@ async def execute_jutsu(context, battle_state, attacker_id, defender_id, jutsu_k
         result_text += f"\n{effect['emoji']} <b>{defender['username']} is {effect['name']}!</b>"
     
     # Show result
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=result_text,
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, result_text)
     await asyncio.sleep(2.5)
     
     # Check for KO
@@ -264,22 +265,12 @@ async def execute_item(context, battle_state, player_id, item_key, message_id):
     # Check inventory
     inventory = player.get('inventory', [])
     if item_key not in inventory:
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=f"{battle_state['base_text']}\n\n<i>❌ Item not found in inventory!</i>",
-            parse_mode="HTML"
-        )
+        await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>❌ Item not found in inventory!</i>")
         await asyncio.sleep(1.5)
         return 'continue'
     
     # Show usage
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=f"{battle_state['base_text']}\n\n<i>🧪 {player['username']} uses {item_info['name']}...</i>",
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>🧪 {player['username']} uses {item_info['name']}...</i>")
     await asyncio.sleep(1.5)
     
     # Remove from inventory
@@ -300,6 +291,7 @@ async def execute_item(context, battle_state, player_id, item_key, message_id):
             result_text += "<i>💊 HP is already full!</i>"
         else:
             player['current_hp'] += actual_heal
+            blog.record(battle_state, player_id, blog.ITEM, hp_delta=actual_heal)
             result_text += f"<b>💚 Restored {actual_heal} HP!</b>"
     
     elif item_key == 'chakra_pill':
@@ -313,15 +305,11 @@ async def execute_item(context, battle_state, player_id, item_key, message_id):
             result_text += "<i>🔵 Chakra is already full!</i>"
         else:
             player['current_chakra'] += actual_restore
+            blog.record(battle_state, player_id, blog.ITEM, chakra_delta=actual_restore)
             result_text += f"<b>💙 Restored {actual_restore} Chakra!</b>"
     
     # Show result
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=result_text,
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, result_text)
     await asyncio.sleep(2)
     
     # Using item doesn't break combo, but ends turn
@@ -351,6 +339,7 @@ async def switch_stance(context, battle_state, player_id, new_stance, message_id
     # Update stance
     old_stance = player_state['stance']
     player_state['stance'] = new_stance
+    blog.record(battle_state, player_id, blog.STANCE, status=blog.STANCE_CODES[new_stance])
     
     stance_info = bc.STANCES[new_stance]
     
@@ -359,12 +348,7 @@ async def switch_stance(context, battle_state, player_id, new_stance, message_id
     text += f"<i>{stance_info['emoji']} {player['username']} switches to <b>{stance_info['name']}</b> stance!</i>\n"
     text += f"<i>{stance_info['desc']}</i>"
     
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=text,
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, text)
     await asyncio.sleep(1.5)
     
     # Stance change doesn't end turn - return to menu
@@ -411,13 +395,7 @@ async def initiate_prediction(context, battle_state, predictor_id, message_id):
         ]
     ]
     
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=text,
-        reply_markup=InlineKeyboardMarkup(keyboard),
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, text, reply_markup=InlineKeyboardMarkup(keyboard))
     
     return 'prediction_wait'
 
@@ -459,18 +437,15 @@ async def resolve_prediction(context, battle_state, predicted_action, actual_act
         predictor_state['combo'] += 1
         opponent_state['combo'] = 0
         
+        blog.record(battle_state, predictor_id, blog.PREDICT_HIT, damage=counter_damage, success=True)
+        
         # Show result
         result_text = f"{battle_state['base_text']}\n\n"
         result_text += "<b>🎯 PREDICTION SUCCESS! 🎯</b>\n\n"
         result_text += f"<i>{predictor['username']} read {opponent['username']}'s move!</i>\n"
         result_text += f"<b>⚡ COUNTER ATTACK! {counter_damage} damage!</b>"
         
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=result_text,
-            parse_mode="HTML"
-        )
+        await edit_battle_text(context, battle_state, message_id, result_text)
         await asyncio.sleep(2.5)
         
         # Check for KO
@@ -482,18 +457,15 @@ async def resolve_prediction(context, battle_state, predicted_action, actual_act
     
     else:
         # WRONG PREDICTION
+        blog.record(battle_state, predictor_id, blog.PREDICT_MISS)
+        
         # Opponent gets free hit with bonus damage
         result_text = f"{battle_state['base_text']}\n\n"
         result_text += "<b>❌ PREDICTION FAILED!</b>\n\n"
         result_text += f"<i>{predictor['username']} guessed wrong!</i>\n"
         result_text += f"<i>{opponent['username']} punishes the mistake!</i>"
         
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=result_text,
-            parse_mode="HTML"
-        )
+        await edit_battle_text(context, battle_state, message_id, result_text)
         await asyncio.sleep(2)
         
         # Opponent gets turn with damage bonus stored
@@ -524,18 +496,22 @@ async def switch_turn(context, battle_state, next_player_id, message_id):
     chat_id = battle_state['chat_id']
     
     # Process status effects
+    hp_before = next_player['current_hp']
+    effects_before = set(next_state['status_effects'])
     effect_messages = bc.process_status_effects(next_player, next_state)
     
     if effect_messages:
+        worn_off = effects_before - set(next_state['status_effects'])
+        blog.record(
+            battle_state, next_player_id, blog.STATUS_TICK,
+            hp_delta=next_player['current_hp'] - hp_before,
+            status=sum(1 << (blog.STATUS_CODES[key] - 1) for key in worn_off)
+        )
+        
         status_text = f"{battle_state['base_text']}\n\n"
         status_text += "\n".join(effect_messages)
         
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=status_text,
-            parse_mode="HTML"
-        )
+        await edit_battle_text(context, battle_state, message_id, status_text)
         await asyncio.sleep(2)
         
         # Check if status effect killed player
@@ -549,10 +525,13 @@ async def switch_turn(context, battle_state, next_player_id, message_id):
     next_stats = gl.get_total_stats(next_player)
     max_chakra = next_stats['max_chakra']
     
+    chakra_before = next_player['current_chakra']
     next_player['current_chakra'] = min(
         next_player['current_chakra'] + chakra_regen,
         max_chakra
     )
+    if next_player['current_chakra'] != chakra_before:
+        blog.record(battle_state, next_player_id, blog.REGEN, chakra_delta=next_player['current_chakra'] - chakra_before)
     
     # Increment turn
     battle_state['turn'] = next_player_id
@@ -583,12 +562,7 @@ async def attempt_flee(context, battle_state, fleeing_player_id, message_id):
     chat_id = battle_state['chat_id']
     
     # Show attempt
-    await context.bot.edit_message_text(
-        chat_id=chat_id,
-        message_id=message_id,
-        text=f"{battle_state['base_text']}\n\n<i>🏃 {fleeing_player['username']} attempts to flee...</i>",
-        parse_mode="HTML"
-    )
+    await edit_battle_text(context, battle_state, message_id, f"{battle_state['base_text']}\n\n<i>🏃 {fleeing_player['username']} attempts to flee...</i>")
     await asyncio.sleep(1.5)
     
     # Reset combo
@@ -597,18 +571,15 @@ async def attempt_flee(context, battle_state, fleeing_player_id, message_id):
     # 50% chance
     if random.random() < 0.5:
         # Success!
+        blog.record(battle_state, fleeing_player_id, blog.FLEE, success=True)
         return 'fled'
     else:
         # Failed
+        blog.record(battle_state, fleeing_player_id, blog.FLEE)
         result_text = f"{battle_state['base_text']}\n\n"
         result_text += f"<i>❌ {fleeing_player['username']} couldn't escape!</i>"
         
-        await context.bot.edit_message_text(
-            chat_id=chat_id,
-            message_id=message_id,
-            text=result_text,
-            parse_mode="HTML"
-        )
+        await edit_battle_text(context, battle_state, message_id, result_text)
         await asyncio.sleep(2)
         
         # Switch turn
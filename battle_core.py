@@ -252,10 +252,65 @@ def get_combo_display(combo_count):
 # BATTLE DISPLAY
 # ═══════════════════════════════════════
 
+# Static box-drawing layout, compiled once at import. Only the {fields}
+# change between turns; optional rows are rendered as "" when empty.
+_BOX_TOP = "╔══════════════════════════╗\n"
+_BOX_BOTTOM = "╚══════════════════════════╝\n"
+
+_FIGHTER_TEMPLATE = (
+    _BOX_TOP
+    + "║  <b>{name}</b>\n"
+    + "║  Lvl {level} | {stance_emoji} {stance_name}\n"
+    + "║  HP: {hp_bar}\n"
+    + "{hp_status_row}"
+    + "║  ⚡ Chakra: {chakra}/{max_chakra}\n"
+    + "{effects_row}"
+    + "{combo_row}"
+    + _BOX_BOTTOM
+)
+
+_BATTLE_TEMPLATE = (
+    "{p1_box}"
+    "        ⚔️ VS ⚔️\n"
+    "{p2_box}\n"
+    "{pot_rows}"
+    "🎯 <b>{turn_name}'s Turn</b>\n"
+    "<i>Turn {turn_number}/" + str(MAX_TURNS) + "</i>"
+)
+
+_POT_TEMPLATE = "💰 <b>POT: {pot:,} Ryo</b>\n<i>Winner takes: {payout:,} Ryo</i>\n\n"
+
+def _optional_row(value):
+    """Render an optional '║  value' row, or nothing when value is empty."""
+    return f"║  {value}\n" if value else ""
+
+def _render_fighter_box(player, player_state):
+    """Fill the fighter box template for one player."""
+    stats = gl.get_total_stats(player)
+    hp_pct = (player['current_hp'] / stats['max_hp']) * 100
+    stance = STANCES[player_state['stance']]
+    effects = " ".join([STATUS_EFFECTS[e]['emoji'] for e in player_state['status_effects'].keys()])
+    
+    return _FIGHTER_TEMPLATE.format(
+        name=player['username'][:20],
+        level=player['level'],
+        stance_emoji=stance['emoji'],
+        stance_name=stance['name'],
+        hp_bar=create_hp_bar(player['current_hp'], stats['max_hp']),
+        hp_status_row=_optional_row(get_hp_status_emoji(hp_pct)),
+        chakra=player['current_chakra'],
+        max_chakra=stats['max_chakra'],
+        effects_row=_optional_row(effects),
+        combo_row=_optional_row(get_combo_display(player_state['combo']))
+    )
+
 def get_enhanced_battle_display(battle_state):
     """
     Create epic visual battle display.
     Returns formatted HTML text for battle status.
+    
+    The layout is a precompiled template; only the dynamic fields
+    (HP, chakra, stance, effects, combo, turn) are filled in here.
     """
     players = battle_state['players']
     player_ids = list(players.keys())
@@ -266,69 +321,20 @@ def get_enhanced_battle_display(battle_state):
     else:
         p1, p2 = players[player_ids[1]], players[player_ids[0]]
     
-    # Get stats
-    p1_stats = gl.get_total_stats(p1)
-    p2_stats = gl.get_total_stats(p2)
-    
-    # Get battle states
     p1_state = battle_state['player_states'][p1['user_id']]
     p2_state = battle_state['player_states'][p2['user_id']]
     
-    # HP percentages and bars
-    p1_hp_pct = (p1['current_hp'] / p1_stats['max_hp']) * 100
-    p2_hp_pct = (p2['current_hp'] / p2_stats['max_hp']) * 100
-    
-    p1_hp_bar = create_hp_bar(p1['current_hp'], p1_stats['max_hp'])
-    p2_hp_bar = create_hp_bar(p2['current_hp'], p2_stats['max_hp'])
-    
-    # Status icons
-    p1_hp_status = get_hp_status_emoji(p1_hp_pct)
-    p2_hp_status = get_hp_status_emoji(p2_hp_pct)
-    
-    # Stance display
-    p1_stance = STANCES[p1_state['stance']]
-    p2_stance = STANCES[p2_state['stance']]
-    
-    # Combo display
-    p1_combo = get_combo_display(p1_state['combo'])
-    p2_combo = get_combo_display(p2_state['combo'])
-    
-    # Status effects
-    p1_effects = " ".join([STATUS_EFFECTS[e]['emoji'] for e in p1_state['status_effects'].keys()])
-    p2_effects = " ".join([STATUS_EFFECTS[e]['emoji'] for e in p2_state['status_effects'].keys()])
-    
-    # Build display
-    text = "╔══════════════════════════╗\n"
-    text += f"║  <b>{p1['username'][:20]}</b>\n"
-    text += f"║  Lvl {p1['level']} | {p1_stance['emoji']} {p1_stance['name']}\n"
-    text += f"║  HP: {p1_hp_bar}\n"
-    text += f"║  {p1_hp_status}\n" if p1_hp_status else ""
-    text += f"║  ⚡ Chakra: {p1['current_chakra']}/{p1_stats['max_chakra']}\n"
-    text += f"║  {p1_effects}\n" if p1_effects else ""
-    text += f"║  {p1_combo}\n" if p1_combo else ""
-    text += "╚══════════════════════════╝\n"
-    text += "        ⚔️ VS ⚔️\n"
-    text += "╔══════════════════════════╗\n"
-    text += f"║  <b>{p2['username'][:20]}</b>\n"
-    text += f"║  Lvl {p2['level']} | {p2_stance['emoji']} {p2_stance['name']}\n"
-    text += f"║  HP: {p2_hp_bar}\n"
-    text += f"║  {p2_hp_status}\n" if p2_hp_status else ""
-    text += f"║  ⚡ Chakra: {p2['current_chakra']}/{p2_stats['max_chakra']}\n"
-    text += f"║  {p2_effects}\n" if p2_effects else ""
-    text += f"║  {p2_combo}\n" if p2_combo else ""
-    text += "╚══════════════════════════╝\n\n"
-    
-    # Pot display
+    pot_rows = ""
     if 'bet_amount' in battle_state:
-        text += f"💰 <b>POT: {battle_state['pot_amount']:,} Ryo</b>\n"
-        text += f"<i>Winner takes: {battle_state['winner_payout']:,} Ryo</i>\n\n"
-    
-    # Turn indicator
-    turn_player = battle_state['players'][battle_state['turn']]
-    text += f"🎯 <b>{turn_player['username']}'s Turn</b>\n"
-    text += f"<i>Turn {battle_state.get('turn_number', 1)}/{MAX_TURNS}</i>"
-    
-    return text
+        pot_rows = _POT_TEMPLATE.format(pot=battle_state['pot_amount'], payout=battle_state['winner_payout'])
+    
+    return _BATTLE_TEMPLATE.format(
+        p1_box=_render_fighter_box(p1, p1_state),
+        p2_box=_render_fighter_box(p2, p2_state),
+        pot_rows=pot_rows,
+        turn_name=players[battle_state['turn']]['username'],
+        turn_number=battle_state.get('turn_number', 1)
+    )
 
 # ═══════════════════════════════════════
 # STATUS EFFECT LOGIC
@@ -1,6 +1,7 @@
 """
 Battle Enemies - All enemy definitions organized by league tier
 """
+import random
 
 # 🎮 ENEMY DATABASE - Organized by League Tier
 
@@ -262,6 +263,89 @@ ENEMIES_BY_LEAGUE = {
 }
 
 
+# ⚡ COMPILED CATALOG
+# Built once at import: a flat key -> enemy index, and per enemy its
+# attacks pre-sorted by power and by chakra plus a decision function for
+# its AI pattern, so a turn is a short scan over a tuple.
+
+def _build_enemy_index():
+    index = {}
+    for enemies in ENEMIES_BY_LEAGUE.values():
+        for enemy_key, enemy in enemies.items():
+            index.setdefault(enemy_key, enemy)  # first league wins, like the old scan
+    return index
+
+
+ENEMY_INDEX = _build_enemy_index()
+
+
+def _first_affordable(attacks, chakra):
+    """First (key, cost) in `attacks` the enemy can pay for."""
+    for key, cost in attacks:
+        if cost <= chakra:
+            return key
+    return None
+
+
+def _random_policy(ai, game_state):
+    chakra = game_state['enemy_chakra']
+    available = [key for key, cost in ai['attacks'] if cost <= chakra]
+    return random.choice(available) if available else None
+
+
+def _aggressive_policy(ai, game_state):
+    return _first_affordable(ai['by_power'], game_state['enemy_chakra'])
+
+
+def _defensive_policy(ai, game_state):
+    if game_state['enemy_hp'] < ai['low_hp']:
+        return _first_affordable(ai['by_power'], game_state['enemy_chakra'])
+    return _first_affordable(ai['by_chakra'], game_state['enemy_chakra'])
+
+
+def _smart_policy(ai, game_state):
+    # Punish a player repeating the same move with an attack strong against it
+    moves = game_state.get('player_move_history', [])
+    if len(moves) >= 2 and moves[-1] == moves[-2]:
+        counter = _first_affordable(ai['counters'].get(moves[-1], ()), game_state['enemy_chakra'])
+        if counter:
+            return counter
+    return _first_affordable(ai['by_power'], game_state['enemy_chakra'])
+
+
+AI_POLICIES = {
+    'random': _random_policy,
+    'aggressive': _aggressive_policy,
+    'defensive': _defensive_policy,
+    'smart': _smart_policy,
+    'genius': _smart_policy,
+    'legendary': _smart_policy
+}
+
+
+def compile_enemy_ai(enemy_data):
+    """Attack tables and decision function for one enemy."""
+    attacks = tuple((key, attack['chakra']) for key, attack in enemy_data['attacks'].items())
+    powers = {key: attack['power'] for key, attack in enemy_data['attacks'].items()}
+    counters = {}
+    for key, attack in enemy_data['attacks'].items():
+        for move_type in attack.get('strong_vs', []):
+            counters.setdefault(move_type, []).append((key, attack['chakra']))
+    
+    return {
+        'policy': AI_POLICIES.get(enemy_data.get('ai_pattern', 'random'), _random_policy),
+        'attacks': attacks,
+        # sorted() is stable, so ties keep catalog order (as max()/min() did)
+        'by_power': tuple(sorted(attacks, key=lambda item: -powers[item[0]])),
+        'by_chakra': tuple(sorted(attacks, key=lambda item: item[1])),
+        'counters': {move_type: tuple(options) for move_type, options in counters.items()},
+        'low_hp': enemy_data['max_hp'] * 0.3
+    }
+
+
+ENEMY_AI = {key: compile_enemy_ai(enemy) for key, enemy in ENEMY_INDEX.items()}
+
+
 def get_enemies_for_league(league_tier):
     """Get all enemies available for a league tier."""
     return ENEMIES_BY_LEAGUE.get(league_tier, {})
@@ -269,52 +353,14 @@ def get_enemies_for_league(league_tier):
 
 def get_enemy_by_key(enemy_key):
     """Get a specific enemy by its key across all leagues."""
-    for league, enemies in ENEMIES_BY_LEAGUE.items():
-        if enemy_key in enemies:
-            return enemies[enemy_key]
-    return None
+    return ENEMY_INDEX.get(enemy_key)
 
 
 def get_enemy_ai_move(enemy_data, game_state):
     """Determine enemy's next move based on AI pattern."""
-    import random
-    
-    ai_pattern = enemy_data.get('ai_pattern', 'random')
-    available_attacks = [
-        key for key, attack in enemy_data['attacks'].items()
-        if attack['chakra'] <= game_state['enemy_chakra']
-    ]
-    
-    if not available_attacks:
-        return None
-    
-    if ai_pattern == 'random':
-        return random.choice(available_attacks)
-    
-    elif ai_pattern == 'aggressive':
-        best_attack = max(available_attacks, 
-                         key=lambda k: enemy_data['attacks'][k]['power'])
-        return best_attack
-    
-    elif ai_pattern == 'defensive':
-        if game_state['enemy_hp'] < enemy_data['max_hp'] * 0.3:
-            return max(available_attacks, 
-                      key=lambda k: enemy_data['attacks'][k]['power'])
-        else:
-            return min(available_attacks,
-                      key=lambda k: enemy_data['attacks'][k]['chakra'])
-    
-    elif ai_pattern in ['smart', 'genius', 'legendary']:
-        last_player_moves = game_state.get('player_move_history', [])
-        
-        if len(last_player_moves) >= 2 and last_player_moves[-1] == last_player_moves[-2]:
-            for attack_key in available_attacks:
-                attack = enemy_data['attacks'][attack_key]
-                if last_player_moves[-1] in attack.get('strong_vs', []):
-                    return attack_key
-        
-        return max(available_attacks,
-                  key=lambda k: enemy_data['attacks'][k]['power'])
-    
+    enemy_key = game_state.get('enemy_key')
+    if ENEMY_INDEX.get(enemy_key) is enemy_data:
+        ai = ENEMY_AI[enemy_key]
     else:
-        return random.choice(available_attacks)
+        ai = compile_enemy_ai(enemy_data)  # an enemy from outside the catalog
+    return ai['policy'](ai, game_state)
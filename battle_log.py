@@ -0,0 +1,257 @@
+"""
+📜 BATTLE LOG - Event-Sourced PvP Battle History
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Every PvP turn appends a fixed-size binary event to the battle's own
+buffer. Finished battles are queued and flushed to battle_history in
+batches by a repeating job, so logging never adds latency to turns.
+
+Encoding (stored base64 in battle_history.battle_log):
+- Header: version, player ids, starting HP/chakra for both players
+- Events: turn, actor slot, action, damage, hp/chakra deltas, flags, status
+
+Usage (replay a stored battle):
+    python battle_log.py <battle_history_id>
+"""
+
+import asyncio
+import base64
+import datetime
+import logging
+import struct
+import sys
+from datetime import timezone
+
+import battle_core as bc
+import database as db
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════
+# ENCODING
+# ═══════════════════════════════════════
+
+LOG_VERSION = 1
+
+# version, p1_id, p2_id, p1_hp, p1_chakra, p2_hp, p2_chakra
+HEADER = struct.Struct('<Bqqiiii')
+# turn, actor_slot, action, damage, hp_delta, chakra_delta, flags, status
+EVENT = struct.Struct('<BBBhhhBB')
+
+# Action codes
+TAIJUTSU = 1
+JUTSU = 2
+ITEM = 3
+STANCE = 4
+FLEE = 5
+STUNNED = 6
+PREDICT = 7
+PREDICT_HIT = 8
+PREDICT_MISS = 9
+STATUS_TICK = 10
+REGEN = 11
+
+ACTION_NAMES = {
+    TAIJUTSU: 'taijutsu', JUTSU: 'jutsu', ITEM: 'item', STANCE: 'stance',
+    FLEE: 'flee', STUNNED: 'stunned', PREDICT: 'predict',
+    PREDICT_HIT: 'predict_hit', PREDICT_MISS: 'predict_miss',
+    STATUS_TICK: 'status_tick', REGEN: 'regen'
+}
+
+# Flag bits
+FLAG_CRIT = 1
+FLAG_SUPER_EFFECTIVE = 2
+FLAG_SUCCESS = 4
+
+# Status / stance codes (0 = none)
+STATUS_CODES = {key: i + 1 for i, key in enumerate(bc.STATUS_EFFECTS)}
+STATUS_KEYS = {code: key for key, code in STATUS_CODES.items()}
+STANCE_CODES = {key: i + 1 for i, key in enumerate(bc.STANCES)}
+STANCE_KEYS = {code: key for key, code in STANCE_CODES.items()}
+
+# Finished battles waiting for the next batch flush
+PENDING_BATTLES = []
+MAX_PENDING_BATTLES = 5000
+FLUSH_INTERVAL_SECONDS = 10
+
+def _clamp16(value):
+    return max(-32768, min(32767, int(value)))
+
+# ═══════════════════════════════════════
+# RECORDING
+# ═══════════════════════════════════════
+
+def start_battle(battle_state):
+    """Open the append-only event buffer for a new battle."""
+    p1_id, p2_id = list(battle_state['players'].keys())
+    p1 = battle_state['players'][p1_id]
+    p2 = battle_state['players'][p2_id]
+
+    battle_state['log_slots'] = {p1_id: 0, p2_id: 1}
+    battle_state['event_log'] = bytearray(HEADER.pack(
+        LOG_VERSION, p1_id, p2_id,
+        p1['current_hp'], p1['current_chakra'],
+        p2['current_hp'], p2['current_chakra']
+    ))
+
+def record(battle_state, actor_id, action, damage=0, hp_delta=0, chakra_delta=0,
+           crit=False, super_effective=False, success=False, status=0):
+    """Append one turn event. Cheap: a single struct pack into a bytearray."""
+    event_log = battle_state.get('event_log')
+    if event_log is None:
+        return
+
+    flags = (FLAG_CRIT if crit else 0) | (FLAG_SUPER_EFFECTIVE if super_effective else 0) | (FLAG_SUCCESS if success else 0)
+    event_log += EVENT.pack(
+        min(255, battle_state.get('turn_number', 1)),
+        battle_state['log_slots'][actor_id],
+        action,
+        _clamp16(damage),
+        _clamp16(hp_delta),
+        _clamp16(chakra_delta),
+        flags,
+        status
+    )
+
+def finish_battle(battle_state, winner_id):
+    """Queue a finished battle for the next batch flush (winner_id None = draw)."""
+    event_log = battle_state.pop('event_log', None)
+    if event_log is None:
+        return
+
+    p1_id, p2_id = list(battle_state['log_slots'].keys())
+    start_time = battle_state.get('start_time')
+    duration = 0
+    if start_time:
+        duration = int((datetime.datetime.now(timezone.utc) - start_time).total_seconds())
+
+    if len(PENDING_BATTLES) >= MAX_PENDING_BATTLES:
+        logger.warning("Battle log buffer full, dropping oldest entry.")
+        PENDING_BATTLES.pop(0)
+
+    PENDING_BATTLES.append((
+        p1_id, p2_id, winner_id,
+        base64.b64encode(bytes(event_log)).decode('ascii'),
+        duration
+    ))
+
+# ═══════════════════════════════════════
+# BATCH FLUSH
+# ═══════════════════════════════════════
+
+async def flush_battle_log_job(context):
+    """Repeating job: write all finished battles to battle_history in one batch."""
+    if not PENDING_BATTLES:
+        return
+
+    batch = PENDING_BATTLES[:]
+    del PENDING_BATTLES[:len(batch)]
+
+    inserted = await asyncio.to_thread(db.insert_battle_history_batch, batch)
+    if not inserted:
+        logger.error(f"Battle log flush failed, re-queueing {len(batch)} battles.")
+        PENDING_BATTLES[:0] = batch[-MAX_PENDING_BATTLES:]
+        return
+
+    logger.info(f"📜 Flushed {len(batch)} battles to battle_history")
+
+# ═══════════════════════════════════════
+# DECODE & REPLAY
+# ═══════════════════════════════════════
+
+def decode(encoded_log):
+    """Decode a stored log into (header dict, list of event dicts)."""
+    raw = base64.b64decode(encoded_log)
+    version, p1_id, p2_id, p1_hp, p1_chakra, p2_hp, p2_chakra = HEADER.unpack_from(raw, 0)
+    if version != LOG_VERSION:
+        raise ValueError(f"Unsupported battle log version: {version}")
+
+    header = {
+        'player_ids': (p1_id, p2_id),
+        'start': {
+            p1_id: {'hp': p1_hp, 'chakra': p1_chakra},
+            p2_id: {'hp': p2_hp, 'chakra': p2_chakra}
+        }
+    }
+
+    events = []
+    for turn, slot, action, damage, hp_delta, chakra_delta, flags, status in EVENT.iter_unpack(raw[HEADER.size:]):
+        events.append({
+            'turn': turn,
+            'actor_id': header['player_ids'][slot],
+            'action': ACTION_NAMES.get(action, str(action)),
+            'damage': damage,
+            'hp_delta': hp_delta,
+            'chakra_delta': chakra_delta,
+            'crit': bool(flags & FLAG_CRIT),
+            'super_effective': bool(flags & FLAG_SUPER_EFFECTIVE),
+            'success': bool(flags & FLAG_SUCCESS),
+            'status': status
+        })
+
+    return header, events
+
+def replay(encoded_log):
+    """
+    Rebuild a battle's final state from its event log.
+    Returns {player_id: {hp, chakra, stance, status_effects}} plus 'turns'.
+    """
+    header, events = decode(encoded_log)
+    p1_id, p2_id = header['player_ids']
+
+    state = {
+        pid: {
+            'hp': header['start'][pid]['hp'],
+            'chakra': header['start'][pid]['chakra'],
+            'stance': 'balanced',
+            'status_effects': set()
+        }
+        for pid in (p1_id, p2_id)
+    }
+
+    last_turn = 1
+    for event in events:
+        actor = state[event['actor_id']]
+        opponent = state[p2_id if event['actor_id'] == p1_id else p1_id]
+        last_turn = event['turn']
+
+        opponent['hp'] -= event['damage']
+        actor['hp'] += event['hp_delta']
+        actor['chakra'] += event['chakra_delta']
+
+        if event['action'] == 'stance':
+            actor['stance'] = STANCE_KEYS.get(event['status'], actor['stance'])
+        elif event['action'] == 'status_tick':
+            # status holds a bitmask of effects that wore off this tick
+            for code, key in STATUS_KEYS.items():
+                if event['status'] & (1 << (code - 1)):
+                    actor['status_effects'].discard(key)
+        elif event['status'] and event['action'] == 'jutsu':
+            opponent['status_effects'].add(STATUS_KEYS[event['status']])
+
+    return {
+        'turns': last_turn,
+        'players': {
+            pid: {**s, 'status_effects': sorted(s['status_effects'])}
+            for pid, s in state.items()
+        }
+    }
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if len(sys.argv) != 2:
+        print("Usage: python battle_log.py <battle_history_id>")
+        sys.exit(1)
+
+    row = db.get_battle_history(int(sys.argv[1]))
+    if not row:
+        print("Battle not found.")
+        sys.exit(1)
+
+    print(f"Battle #{row['id']}: {row['player1_id']} vs {row['player2_id']} "
+          f"(winner: {row['winner_id'] or 'draw'}, {row['duration_seconds']}s)")
+    header, events = decode(row['battle_log'])
+    for event in events:
+        print(f"  T{event['turn']:>2} {event['actor_id']}: {event['action']} "
+              f"dmg={event['damage']} hp{event['hp_delta']:+} chakra{event['chakra_delta']:+}"
+              f"{' CRIT' if event['crit'] else ''}")
+    print(replay(row['battle_log']))
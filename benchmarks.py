@@ -0,0 +1,851 @@
+"""
+📊 BENCHMARKS & STRESS TESTS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Manual performance / correctness checks for the bot's hot paths.
+DB-backed checks create throwaway players with ids from BENCH_ID_BASE
+and delete them afterwards.
+
+Usage:
+    python benchmarks.py escrow [--players 20] [--threads 4] [--ops 2000]
+    python benchmarks.py payload [--collection 200]
+    python benchmarks.py spectators [--turns 200]
+    python benchmarks.py boss [--attackers 200] [--seconds 5]
+    python benchmarks.py cooldowns [--clicks 100000]
+    python benchmarks.py boss-payout [--participants 1000] [--db]
+    python benchmarks.py inline [--queries 20000] [--players 500]
+    python benchmarks.py rank [--players 1000000] [--lookups 1000] [--db]
+    python benchmarks.py daily-reset [--players 1000000] [--db]
+    python benchmarks.py league-settle [--players 50] [--games 2000] [--threads 4]
+    python benchmarks.py weekly-settle [--players 1000000] [--chunk 2000]
+    python benchmarks.py enemy-ai [--moves 200000]
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import random
+import threading
+import time
+
+import battle_core as bc
+import battle_enemies as be
+import boss_engine
+import cache
+import cooldowns
+import database as db
+import game_logic as gl
+import inline_handler_league as ilh
+import league_system as ls
+import league_weekly
+import outbound
+import world_boss
+import spectator
+
+logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BENCH_ID_BASE = 990_000_000_000
+
+# ═══════════════════════════════════════
+# HELPERS
+# ═══════════════════════════════════════
+
+def create_bench_players(count, ryo=10_000):
+    """Create `count` throwaway players (column defaults, one INSERT) and return their ids."""
+    user_ids = [BENCH_ID_BASE + i for i in range(count)]
+    delete_bench_players(user_ids)
+
+    def _insert(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                INSERT INTO players (user_id, username, village, ryo)
+                SELECT id, 'bench_' || (id - %s), 'Konoha', %s FROM unnest(%s::bigint[]) AS id
+            """, (BENCH_ID_BASE, ryo, user_ids))
+        conn.commit()
+        return True
+
+    db.execute_with_retry(_insert)
+    return user_ids
+
+def delete_bench_players(user_ids):
+    def _delete(conn):
+        with conn.cursor() as c:
+            c.execute("DELETE FROM battle_escrow WHERE player1_id = ANY(%s) OR player2_id = ANY(%s)", (user_ids, user_ids))
+            c.execute("DELETE FROM league_sessions WHERE player_id = ANY(%s)", (user_ids,))
+            c.execute("DELETE FROM league_weekly_settlements WHERE user_id = ANY(%s)", (user_ids,))
+            c.execute("DELETE FROM players WHERE user_id = ANY(%s)", (user_ids,))
+        conn.commit()
+        return True
+
+    db.execute_with_retry(_delete)
+
+def fetch_one(sql, params=()):
+    def _fetch(conn):
+        with conn.cursor() as c:
+            c.execute(sql, params)
+            return c.fetchone()
+
+    return db.execute_with_retry(_fetch)
+
+def report(name, count, elapsed):
+    rate = count / elapsed if elapsed else float('inf')
+    print(f"{name:<32} {count:>8} ops  {elapsed:8.3f}s  {rate:10.1f} ops/s")
+
+def report_percentiles(samples_ms):
+    samples_ms = sorted(samples_ms)
+    p99 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.99))]
+    print(f"  p50 {samples_ms[len(samples_ms) // 2]:.3f} ms   p99 {p99:.3f} ms")
+
+# ═══════════════════════════════════════
+# ESCROW STRESS TEST
+# ═══════════════════════════════════════
+
+def bench_escrow(args):
+    """
+    Hammer escrow open/settle/refund concurrently with /rob- and /gift-style
+    transfers on the same players, then check no ryo was created or lost:
+    final balances + open stakes + house fees == starting balances.
+    """
+    user_ids = create_bench_players(args.players)
+    start_total = fetch_one("SELECT SUM(ryo) FROM players WHERE user_id = ANY(%s)", (user_ids,))[0]
+    counters = {'opened': 0, 'rejected': 0, 'settled': 0, 'refunded': 0, 'transfers': 0}
+    lock = threading.Lock()
+
+    def worker(ops):
+        rng = random.Random()
+        for _ in range(ops):
+            a, b = rng.sample(user_ids, 2)
+            if rng.random() < 0.5:
+                stake = rng.randint(100, 3000)
+                escrow_id, _ = db.open_battle_escrow(f"{a}_vs_{b}", a, b, stake, int(stake * 2 * 0.9))
+                if not escrow_id:
+                    with lock:
+                        counters['rejected'] += 1
+                    continue
+                if rng.random() < 0.8:
+                    db.settle_battle_escrow(escrow_id, rng.choice((a, b)))
+                    key = 'settled'
+                else:
+                    db.refund_battle_escrow(escrow_id)
+                    key = 'refunded'
+                with lock:
+                    counters['opened'] += 1
+                    counters[key] += 1
+            else:
+                amount = rng.randint(1, 500)
+                db.atomic_add_ryo(a, -amount)
+                db.atomic_add_ryo(b, amount)
+                with lock:
+                    counters['transfers'] += 1
+
+    per_thread = args.ops // args.threads
+    threads = [threading.Thread(target=worker, args=(per_thread,)) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    end_total = fetch_one("SELECT SUM(ryo) FROM players WHERE user_id = ANY(%s)", (user_ids,))[0]
+    open_stakes, house_fees, open_count = fetch_one("""
+        SELECT
+            COALESCE(SUM(stake * 2) FILTER (WHERE status = 'open'), 0),
+            COALESCE(SUM(stake * 2 - payout) FILTER (WHERE status = 'settled'), 0),
+            COUNT(*) FILTER (WHERE status = 'open')
+        FROM battle_escrow WHERE player1_id = ANY(%s)
+    """, (user_ids,))
+
+    report("escrow + transfers", per_thread * args.threads, elapsed)
+    print(f"  {counters}")
+    print(f"  start={start_total:,} end={end_total:,} open_stakes={open_stakes:,} house_fees={house_fees:,} open={open_count}")
+    balanced = start_total == end_total + open_stakes + house_fees
+    print(f"  ryo conserved: {'✅' if balanced else '❌'}")
+
+    delete_bench_players(user_ids)
+    return balanced
+
+# ═══════════════════════════════════════
+# UPDATE PAYLOAD SIZE
+# ═══════════════════════════════════════
+
+def make_sample_player(collection_size):
+    """A fully populated player row, shaped like get_player() output."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    player = {
+        'user_id': BENCH_ID_BASE, 'username': 'bench_player', 'village': 'Konoha',
+        'level': 25, 'exp': 1200, 'total_exp': 54000, 'max_hp': 400, 'current_hp': 400,
+        'max_chakra': 300, 'current_chakra': 300, 'strength': 40, 'speed': 35,
+        'intelligence': 40, 'stamina': 30, 'ryo': 125000, 'rank': 'Chunin',
+        'wins': 80, 'losses': 20, 'kills': 12, 'battle_cooldown': None, 'created_at': now,
+        'known_jutsus': list(gl.JUTSU_LIBRARY)[:10],
+        'discovered_combinations': ['tiger-snake-rat'] * 5,
+        'equipment': {'weapon': 'kunai', 'armor': 'flak_jacket'},
+        'inventory': ['health_potion', 'chakra_pill'] * 15,
+        'legendary_items': [],
+        'daily_missions_data': {'date': str(now.date()), 'missions': {'win_battles': 2}},
+        'character_collection': {
+            str(i): {'name': f"Character {i}", 'rarity': 'Rare', 'image': 'x' * 80,
+                     'count': 1, 'caught_at': str(now)}
+            for i in range(collection_size)
+        },
+    }
+    for col in ('daily_train_count', 'story_progress', 'daily_mission_count', 'heat_level', 'bounty',
+                'reputation_points', 'total_steals', 'total_steals_caught', 'total_scouts',
+                'total_gifts_given', 'total_heals_given', 'total_escapes', 'total_protections_bought',
+                'contracts_completed', 'league_points', 'win_streak', 'battles_today', 'total_battles'):
+        player[col] = 0
+    for col in ('steal_cooldown', 'scout_cooldown', 'assassinate_cooldown', 'protection_until',
+                'hospitalized_until', 'hospitalized_by', 'last_heat_decay', 'inline_pack_cooldown',
+                'last_train_reset_date', 'last_mission_reset_date', 'last_daily_claim',
+                'last_inline_game_date', 'reputation_title', 'daily_missions_reset'):
+        player[col] = None
+    player['auto_registered'] = False
+    return player
+
+def payload_bytes(set_clause, values):
+    return len(set_clause) + sum(len(str(v)) for v in values)
+
+def bench_payload(args):
+    """Compare the UPDATE that end_battle sends for a winner, before and after dirty tracking."""
+    player = make_sample_player(args.collection)
+    original = db.snapshot_player(player)
+    columns = frozenset(k for k in player if k != 'total_stats')
+
+    # Same mutations end_battle makes to the winner
+    winner = dict(player)
+    winner['total_stats'] = gl.get_total_stats(winner)
+    winner['wins'] += 1
+    winner['exp'] += 250
+    winner['total_exp'] += 250
+    winner['current_hp'] -= 120
+    winner['battle_cooldown'] = datetime.datetime.now(datetime.timezone.utc)
+
+    full_clause, full_values = db.build_player_update(winner)
+    delta_clause, delta_values = db.build_player_update(winner, original, columns)
+
+    full_size = payload_bytes(full_clause, full_values)
+    delta_size = payload_bytes(delta_clause, delta_values)
+    print(f"{'full row (before)':<24} {len(full_values):>3} columns  {full_size:>8,} bytes")
+    print(f"{'dirty fields (after)':<24} {len(delta_values):>3} columns  {delta_size:>8,} bytes")
+    print(f"  reduction: {100 * (1 - delta_size / full_size):.1f}%  ({delta_clause})")
+
+    runs = 2000
+    started = time.perf_counter()
+    for _ in range(runs):
+        db.build_player_update(winner)
+    report("build full update", runs, time.perf_counter() - started)
+    started = time.perf_counter()
+    for _ in range(runs):
+        db.build_player_update(winner, original, columns)
+    report("build dirty update", runs, time.perf_counter() - started)
+
+# ═══════════════════════════════════════
+# SPECTATOR FAN-OUT
+# ═══════════════════════════════════════
+
+def make_sample_battle():
+    p1 = make_sample_player(0)
+    p2 = dict(make_sample_player(0), user_id=BENCH_ID_BASE + 1, username='bench_rival')
+    return {
+        'players': {p1['user_id']: p1, p2['user_id']: p2},
+        'player_states': {
+            pid: {'stance': 'balanced', 'combo': 0, 'status_effects': {}, 'took_damage': False}
+            for pid in (p1['user_id'], p2['user_id'])
+        },
+        'turn': p1['user_id'],
+        'turn_number': 1,
+        'chat_id': -100,
+        'base_text': ''
+    }
+
+def bench_spectators(args):
+    """Per-turn spectator cost as the audience grows: renders stay at 1/turn."""
+    for audience in (0, 1, 10, 50, 500):
+        battle_state = make_sample_battle()
+        for i in range(audience):
+            battle_state.setdefault('spectators', {})[('chat', -1000 - i, i)] = True
+        ids = list(battle_state['players'])
+
+        renders_before = spectator.STATS['renders']
+        publish_time = 0.0
+        for turn in range(args.turns):
+            defender = battle_state['players'][ids[(turn + 1) % 2]]
+            defender['current_hp'] = max(1, defender['current_hp'] - 7)
+            battle_state['turn'] = ids[turn % 2]
+            battle_state['turn_number'] = turn + 1
+            battle_state['base_text'] = bc.get_enhanced_battle_display(battle_state)
+
+            started = time.perf_counter()
+            spectator.publish(battle_state)
+            spectator.publish(battle_state)  # Same frame again: must be free
+            publish_time += time.perf_counter() - started
+            outbound.PENDING_EDITS.clear()
+
+        renders = spectator.STATS['renders'] - renders_before
+        print(f"{audience:>4} spectators: {renders / args.turns:.2f} renders/turn, "
+              f"{publish_time / args.turns * 1e6:8.1f} µs/turn publish")
+
+# ═══════════════════════════════════════
+# WORLD BOSS LOAD TEST
+# ═══════════════════════════════════════
+
+def bench_boss(args):
+    """
+    Sustained clicks/sec one boss can absorb through boss_engine.apply_hit,
+    and how many rows each periodic flush has to write.
+    """
+    chat_id = -BENCH_ID_BASE
+    boss_engine.BOSSES[chat_id] = {
+        'boss_key': 'bench', 'max_hp': 10 ** 12, 'hp': 10 ** 12, 'ryo_pool': 0,
+        'defeated': False, 'damage': {}, 'names': {}, 'dirty': {}, 'hp_dirty': False
+    }
+    attackers = [(BENCH_ID_BASE + i, f"bench_{i}") for i in range(args.attackers)]
+    rng = random.Random(1)
+
+    clicks = 0
+    flushes = []
+    started = time.perf_counter()
+    next_flush = started + boss_engine.FLUSH_INTERVAL_SECONDS
+    deadline = started + args.seconds
+    while True:
+        for _ in range(1000):
+            user_id, username = attackers[rng.randrange(len(attackers))]
+            boss_engine.apply_hit(chat_id, user_id, username, rng.randint(20, 200))
+        clicks += 1000
+        now = time.perf_counter()
+        if now >= next_flush:
+            # What the flush job would send: one UPDATE + one batched upsert
+            flushes.append(len(boss_engine._take_dirty(chat_id, boss_engine.BOSSES[chat_id])[1]))
+            next_flush += boss_engine.FLUSH_INTERVAL_SECONDS
+        if now >= deadline:
+            break
+    elapsed = time.perf_counter() - started
+
+    report("boss apply_hit", clicks, elapsed)
+    if flushes:
+        print(f"  {len(flushes)} flushes, avg {sum(flushes) / len(flushes):.0f} damage rows each "
+              f"(vs {clicks:,} row-locked transactions before)")
+
+    # Kill detection: exactly one hit reports the kill
+    boss_engine.BOSSES[chat_id].update(hp=1000, defeated=False)
+    kills = sum(boss_engine.apply_hit(chat_id, user_id, username, 150)[0] for user_id, username in attackers)
+    print(f"  kill reported by {kills} hit(s) {'✅' if kills == 1 else '❌'}")
+    boss_engine.forget(chat_id)
+
+# ═══════════════════════════════════════
+# COOLDOWN SPAM REJECTION
+# ═══════════════════════════════════════
+
+def bench_cooldowns(args):
+    """Cost of rejecting a click on cooldown: cached player row + ISO parse vs the registry."""
+    player = make_sample_player(args.collection)
+    player['boss_attack_cooldown'] = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)).isoformat()
+    cached_row = json.dumps(player, cls=cache.DateTimeEncoder)
+    clicks = args.clicks
+
+    started = time.perf_counter()
+    for _ in range(clicks):
+        # What a spam click cost before: cache read (JSON decode) + fromisoformat
+        can_act, _ = world_boss._check_cooldown(json.loads(cached_row), world_boss.TAIJUTSU_COOLDOWN_SECONDS)
+    before = time.perf_counter() - started
+    report("player row + _check_cooldown", clicks, before)
+
+    cooldowns.start('bench', BENCH_ID_BASE, 'attack', 300)
+    started = time.perf_counter()
+    for _ in range(clicks):
+        can_act, _ = cooldowns.check('bench', BENCH_ID_BASE, 'attack')
+    after = time.perf_counter() - started
+    report("cooldowns.check", clicks, after)
+    print(f"  {after / clicks * 1e6:.2f} µs per rejected click, {before / after:.0f}x faster "
+          f"(and no Redis round trip) {'✅' if not can_act else '❌'}")
+
+# ═══════════════════════════════════════
+# WORLD BOSS PAYOUT
+# ═══════════════════════════════════════
+
+def bench_boss_payout(args):
+    """Reward split + payout for a large boss fight: per-row loop vs one unnest UPDATE."""
+    rng = random.Random(1)
+    all_damage = [
+        {'user_id': BENCH_ID_BASE + i, 'username': f"bench_{i}", 'total_damage': rng.randint(100, 100_000)}
+        for i in range(args.participants)
+    ]
+
+    runs = 200
+    started = time.perf_counter()
+    for _ in range(runs):
+        rewards, _ = world_boss.compute_boss_rewards(all_damage, 5_000_000)
+    report(f"compute rewards ({args.participants})", runs, time.perf_counter() - started)
+
+    if not args.db:
+        print("  (pass --db to time the payout statements against the database)")
+        return
+
+    user_ids = create_bench_players(args.participants, ryo=0)
+
+    def _row_by_row(conn):
+        with conn.cursor() as c:
+            for user_id, ryo_gain in rewards.items():
+                c.execute("UPDATE players SET ryo = ryo + %s, boss_attack_cooldown = NULL WHERE user_id = %s", (ryo_gain, user_id))
+        conn.commit()
+        for user_id in rewards:
+            db.cache.clear_player_cache(user_id)
+        return True
+
+    started = time.perf_counter()
+    db.execute_with_retry(_row_by_row)
+    old_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    db.payout_boss_rewards(-BENCH_ID_BASE, rewards)
+    new_elapsed = time.perf_counter() - started
+
+    total = fetch_one("SELECT SUM(ryo) FROM players WHERE user_id = ANY(%s)", (user_ids,))[0]
+    print(f"  per-row UPDATEs ({len(rewards)} statements): {old_elapsed * 1000:8.1f} ms")
+    print(f"  unnest UPDATE   (1 statement):      {new_elapsed * 1000:8.1f} ms")
+    print(f"  paid twice as expected: {'✅' if total == 2 * sum(rewards.values()) else '❌'}")
+    delete_bench_players(user_ids)
+
+# ═══════════════════════════════════════
+# INLINE QUERY ANSWERS
+# ═══════════════════════════════════════
+
+def bench_inline(args):
+    """Inline answer build cost: full render per keystroke vs the per-player result cache."""
+    players = []
+    for i in range(args.players):
+        player = make_sample_player(0)
+        player.update({'user_id': BENCH_ID_BASE + i, 'league_points': (i * 37) % 3000, 'win_streak': i % 7})
+        players.append(player)
+    # Shared top-5 fragment as the refresh job leaves it (keeps the benchmark off the database)
+    ilh.TOP_LEAGUE['article'] = object()
+    rng = random.Random(1)
+    queries = [players[rng.randrange(len(players))] for _ in range(args.queries)]
+
+    def measure(name, build):
+        samples = []
+        started = time.perf_counter()
+        for player in queries:
+            t = time.perf_counter()
+            ilh.materialize(build(player))
+            samples.append((time.perf_counter() - t) * 1000)
+        report(name, len(queries), time.perf_counter() - started)
+        report_percentiles(samples)
+
+    ilh.INLINE_CACHE.clear()
+    measure("render every query", ilh.render_player_items)
+    measure("result cache", ilh.get_player_items)
+    hits, misses = ilh.INLINE_STATS['hits'], ilh.INLINE_STATS['misses']
+    print(f"  cache hits {hits:,} / misses {misses:,} (excludes get_player and the Bot API call; "
+          f"the leaderboard query is gone from this path entirely)")
+
+# ═══════════════════════════════════════
+# RANK LOOKUPS
+# ═══════════════════════════════════════
+
+def bench_rank(args):
+    """
+    Rank + the 5 players either side, on a synthetic table of --players:
+    a sorted set (what leaderboard_service uses) vs COUNT(*) scans on an
+    unindexed column (the only option with the players schema).
+    Uses its own Redis key and table, never the live leaderboards.
+    """
+    rng = random.Random(1)
+    n = args.players
+    probes = [BENCH_ID_BASE + rng.randrange(n) for _ in range(args.lookups)]
+
+    r = cache.redis_conn
+    if r:
+        key = "bench:lb:ryo"
+        r.delete(key)
+        started = time.perf_counter()
+        for chunk in range(0, n, 10_000):
+            r.zadd(key, {BENCH_ID_BASE + i: rng.randint(0, 5_000_000) for i in range(chunk, min(n, chunk + 10_000))})
+        print(f"  loaded {n:,} members into a sorted set in {time.perf_counter() - started:.1f}s")
+
+        samples = []
+        started = time.perf_counter()
+        for user_id in probes:
+            t = time.perf_counter()
+            pipe = r.pipeline(transaction=False)
+            pipe.zrevrank(key, user_id)
+            pipe.zscore(key, user_id)
+            position, score = pipe.execute()
+            pipe = r.pipeline(transaction=False)
+            pipe.zcount(key, f"({score}", '+inf')
+            pipe.zrevrange(key, max(0, position - 5), position + 5, withscores=True)
+            pipe.execute()
+            samples.append((time.perf_counter() - t) * 1000)
+        report("sorted set rank + neighbors", len(probes), time.perf_counter() - started)
+        report_percentiles(samples)
+        r.delete(key)
+    else:
+        print("  Redis unavailable, skipping the sorted set run")
+
+    if not args.db:
+        print("  (pass --db to time the SQL scan on a synthetic table)")
+        return
+
+    def _create(conn):
+        with conn.cursor() as c:
+            c.execute("DROP TABLE IF EXISTS bench_rank_players")
+            c.execute("""
+                CREATE TABLE bench_rank_players AS
+                SELECT %s + g AS user_id, 'bench_' || g AS username, (random() * 5000000)::int AS ryo
+                FROM generate_series(0, %s - 1) AS g
+            """, (BENCH_ID_BASE, n))
+            c.execute("ALTER TABLE bench_rank_players ADD PRIMARY KEY (user_id)")
+            c.execute("ANALYZE bench_rank_players")
+        conn.commit()
+        return True
+
+    def _rank(conn, user_id):
+        with conn.cursor() as c:
+            c.execute("SELECT ryo FROM bench_rank_players WHERE user_id = %s", (user_id,))
+            score = c.fetchone()[0]
+            c.execute("SELECT COUNT(*) + 1 FROM bench_rank_players WHERE ryo > %s", (score,))
+            c.execute("""
+                (SELECT user_id, ryo FROM bench_rank_players WHERE ryo >= %s ORDER BY ryo LIMIT 6)
+                UNION ALL
+                (SELECT user_id, ryo FROM bench_rank_players WHERE ryo < %s ORDER BY ryo DESC LIMIT 5)
+            """, (score, score))
+            c.fetchall()
+        return True
+
+    def _drop(conn):
+        with conn.cursor() as c:
+            c.execute("DROP TABLE IF EXISTS bench_rank_players")
+        conn.commit()
+        return True
+
+    started = time.perf_counter()
+    db.execute_with_retry(_create)
+    print(f"  created bench_rank_players ({n:,} rows) in {time.perf_counter() - started:.1f}s")
+
+    db_probes = probes[:args.db_lookups]
+    samples = []
+    started = time.perf_counter()
+    for user_id in db_probes:
+        t = time.perf_counter()
+        db.execute_with_retry(lambda conn: _rank(conn, user_id))
+        samples.append((time.perf_counter() - t) * 1000)
+    report("SQL COUNT(*) rank + neighbors", len(db_probes), time.perf_counter() - started)
+    report_percentiles(samples)
+    db.execute_with_retry(_drop)
+
+# ═══════════════════════════════════════
+# DAILY COUNTER RESET
+# ═══════════════════════════════════════
+
+def bench_daily_reset(args):
+    """
+    Midnight reset cost: the old full-table UPDATE (time, table growth) vs
+    lazy (count, day) counters, which do no work at midnight and add a date
+    comparison to each read.
+    """
+    player = make_sample_player(0)
+    player['battles_today'] = 3
+    player['battles_today_date'] = gl.game_today()
+    reads = 1_000_000
+    started = time.perf_counter()
+    for _ in range(reads):
+        gl.get_daily_count(player, 'battles_today')
+    report("lazy read (gl.get_daily_count)", reads, time.perf_counter() - started)
+
+    if not args.db:
+        print("  (pass --db to time the full-table reset on a synthetic table)")
+        return
+
+    n = args.players
+
+    def _create(conn):
+        with conn.cursor() as c:
+            c.execute("DROP TABLE IF EXISTS bench_daily_players")
+            c.execute("""
+                CREATE TABLE bench_daily_players AS
+                SELECT %s + g AS user_id, (random() * 10)::int AS battles_today,
+                       CURRENT_DATE AS battles_today_date, repeat('x', 400) AS payload
+                FROM generate_series(0, %s - 1) AS g
+            """, (BENCH_ID_BASE, n))
+            c.execute("ALTER TABLE bench_daily_players ADD PRIMARY KEY (user_id)")
+            c.execute("ANALYZE bench_daily_players")
+        conn.commit()
+        return True
+
+    def _reset(conn):
+        with conn.cursor() as c:
+            c.execute("UPDATE bench_daily_players SET battles_today = 0")
+        conn.commit()
+        return True
+
+    def _drop(conn):
+        with conn.cursor() as c:
+            c.execute("DROP TABLE IF EXISTS bench_daily_players")
+        conn.commit()
+        return True
+
+    db.execute_with_retry(_create)
+    size_before = fetch_one("SELECT pg_total_relation_size('bench_daily_players')")[0]
+    started = time.perf_counter()
+    db.execute_with_retry(_reset)
+    elapsed = time.perf_counter() - started
+    size_after = fetch_one("SELECT pg_total_relation_size('bench_daily_players')")[0]
+    report(f"full-table reset ({n:,} rows)", 1, elapsed)
+    print(f"  table + indexes: {size_before / 2**20:.0f} MB -> {size_after / 2**20:.0f} MB "
+          f"(every row rewritten; dead tuples until vacuum)")
+    print(f"  lazy counters: 0 rows written at midnight")
+    db.execute_with_retry(_drop)
+
+# ═══════════════════════════════════════
+# LEAGUE SETTLEMENT
+# ═══════════════════════════════════════
+
+def run_threads(worker, jobs, threads):
+    """Split jobs across threads; returns (elapsed seconds, per-job latencies in ms)."""
+    samples = []
+    lock = threading.Lock()
+
+    def run(chunk):
+        local = []
+        for job in chunk:
+            t = time.perf_counter()
+            worker(job)
+            local.append((time.perf_counter() - t) * 1000)
+        with lock:
+            samples.extend(local)
+
+    chunks = [jobs[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=run, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - started, samples
+
+def bench_league_settle(args):
+    """
+    Many league games finishing at once, a few games per player, each final
+    click delivered twice. Old path: get_player + update_player per game.
+    New path: db.settle_league_battle (session close + rewards + missions in
+    one transaction, missions planned from the locked row). Checks ryo adds
+    up and every game paid exactly once.
+    """
+    user_ids = create_bench_players(args.players, ryo=100_000)
+    tier_data = ls.LEAGUE_TIERS['genin']
+    enemy_data = {'base_reward': 200}
+    rng = random.Random(1)
+    players = {user_id: db.get_player(user_id) for user_id in user_ids}
+
+    games = []
+    for i in range(args.games):
+        user_id = user_ids[i % len(user_ids)]
+        game_state = {'used_heal': rng.random() < 0.3, 'player_hp': rng.randint(1, 100)}
+        settlement = ls.build_settlement(players[user_id], game_state, enemy_data, tier_data, rng.random() < 0.7)
+        games.append((f"bench_{i}", user_id, settlement))
+    expected_ryo = sum(st['ryo'] for _, _, st in games)
+
+    def total_ryo():
+        return fetch_one("SELECT SUM(ryo) FROM players WHERE user_id = ANY(%s)", (user_ids,))[0]
+
+    # Old: read-modify-write of absolute values
+    def old_settle(game):
+        _, user_id, st = game
+        player = db.get_player(user_id)
+        db.update_player(user_id, {
+            'ryo': player['ryo'] + st['ryo'],
+            'exp': player['exp'] + st['exp'],
+            'league_points': max(0, player['league_points'] + st['points']),
+            'win_streak': player['win_streak'] + 1 if st['won'] else 0
+        })
+
+    start_ryo = total_ryo()
+    elapsed, samples = run_threads(old_settle, games, args.threads)
+    report("get_player + update_player", len(games), elapsed)
+    report_percentiles(samples)
+    print(f"  ryo lost to overwrites: {start_ryo + expected_ryo - total_ryo():,}")
+
+    # New: one transaction per game, double-clicked
+    for game_id, user_id, _ in games:
+        db.open_league_session(game_id, user_id, 0, tier_data['point_loss'], args.games, {'turn': 2}, 3600)
+    settled = []
+    lock = threading.Lock()
+
+    mission_ryo = []
+
+    def new_settle(game):
+        game_id, user_id, st = game
+        result = db.settle_league_battle(game_id, user_id, st)
+        if result:
+            with lock:
+                settled.append(game_id)
+                mission_ryo.append(sum(m['reward_ryo'] for m in result['completed_missions']))
+
+    start_ryo = total_ryo()
+    elapsed, samples = run_threads(new_settle, games + games, args.threads)
+    report("settle_league_battle (x2 clicks)", len(games) * 2, elapsed)
+    report_percentiles(samples)
+    drift = start_ryo + expected_ryo + sum(mission_ryo) - total_ryo()
+    once = len(settled) == len(set(settled)) == len(games)
+    print(f"  settled {len(settled):,}/{len(games):,} games, ryo drift {drift:,}")
+    print(f"  each game paid exactly once: {'✅' if once and drift == 0 else '❌'}")
+
+    delete_bench_players(user_ids)
+
+# ═══════════════════════════════════════
+# WEEKLY LEAGUE SETTLEMENT
+# ═══════════════════════════════════════
+
+def bench_weekly_settle(args):
+    """
+    Weekly league rewards for --players synthetic players (needs DB): the
+    chunked set-based settlement, then a rerun of the finished week that
+    must pay nobody.
+    Only touches the bench id range, under a week no real run uses.
+    """
+    n = args.players
+    last_id = BENCH_ID_BASE + n - 1
+    week_start = datetime.date(2000, 1, 3)
+
+    def _create(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                INSERT INTO players (user_id, username, village, ryo, league_points)
+                SELECT %s + g, 'bench_' || g, 'Konoha', 0, (random() * 6000)::int
+                FROM generate_series(0, %s - 1) AS g
+            """, (BENCH_ID_BASE, n))
+        conn.commit()
+        return True
+
+    def _cleanup(conn):
+        with conn.cursor() as c:
+            c.execute("DELETE FROM league_weekly_settlements WHERE week_start = %s", (week_start,))
+            c.execute("DELETE FROM league_weekly_runs WHERE week_start = %s", (week_start,))
+            c.execute("DELETE FROM players WHERE user_id BETWEEN %s AND %s", (BENCH_ID_BASE, last_id))
+        conn.commit()
+        return True
+
+    db.execute_with_retry(_cleanup)
+    started = time.perf_counter()
+    db.execute_with_retry(_create)
+    print(f"  created {n:,} bench players in {time.perf_counter() - started:.1f}s")
+
+    paid, elapsed = league_weekly.settle_week(week_start, args.chunk, BENCH_ID_BASE - 1, last_id)
+    report(f"weekly settlement (chunk {args.chunk:,})", paid, elapsed)
+
+    repaid, elapsed = league_weekly.settle_week(week_start, args.chunk, BENCH_ID_BASE - 1, last_id)
+    report("rerun (week already finished)", n, elapsed)
+
+    ledger_count, ledger_ryo = db.get_weekly_league_settlement(week_start)
+    player_ryo = fetch_one("SELECT SUM(ryo) FROM players WHERE user_id BETWEEN %s AND %s", (BENCH_ID_BASE, last_id))[0]
+    ok = repaid == 0 and ledger_count == paid and ledger_ryo == player_ryo
+    print(f"  paid {paid:,} players, rerun paid {repaid:,}, ledger ryo {ledger_ryo:,} vs players {player_ryo:,}")
+    print(f"  paid exactly once: {'✅' if ok else '❌'}")
+    db.execute_with_retry(_cleanup)
+
+# ═══════════════════════════════════════
+# ENEMY AI
+# ═══════════════════════════════════════
+
+def bench_enemy_ai(args):
+    """League enemy turn cost: enemy lookup + AI move, per AI pattern, on random mid-fight states."""
+    rng = random.Random(1)
+    move_types = [jutsu['type'] for jutsu in ilh.PLAYER_JUTSUS.values()]
+    by_pattern = {}
+    for enemy_key, enemy in be.ENEMY_INDEX.items():
+        by_pattern.setdefault(enemy.get('ai_pattern', 'random'), []).append(enemy_key)
+
+    for pattern, enemy_keys in sorted(by_pattern.items()):
+        states = []
+        for _ in range(min(args.moves, 10_000)):
+            enemy_key = rng.choice(enemy_keys)
+            enemy = be.ENEMY_INDEX[enemy_key]
+            states.append({
+                'enemy_key': enemy_key,
+                'enemy_chakra': rng.randint(0, enemy['chakra']),
+                'enemy_hp': rng.randint(1, enemy['max_hp']),
+                'player_move_history': [rng.choice(move_types) for _ in range(2)]
+            })
+
+        started = time.perf_counter()
+        for i in range(args.moves):
+            game_state = states[i % len(states)]
+            be.get_enemy_ai_move(be.get_enemy_by_key(game_state['enemy_key']), game_state)
+        report(f"AI move ({pattern})", args.moves, time.perf_counter() - started)
+
+# ═══════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot benchmarks and stress tests")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('escrow', help="Concurrent battle escrow stress test (needs DB)")
+    p.add_argument('--players', type=int, default=20)
+    p.add_argument('--threads', type=int, default=4)  # pool maxconn is 5
+    p.add_argument('--ops', type=int, default=2000)
+    p.set_defaults(func=bench_escrow)
+
+    p = sub.add_parser('payload', help="end_battle UPDATE payload size, full row vs dirty fields")
+    p.add_argument('--collection', type=int, default=200, help="characters in the sample collection")
+    p.set_defaults(func=bench_payload)
+
+    p = sub.add_parser('spectators', help="Spectator render cost vs audience size")
+    p.add_argument('--turns', type=int, default=200)
+    p.set_defaults(func=bench_spectators)
+
+    p = sub.add_parser('boss', help="World boss hit throughput and flush batch size")
+    p.add_argument('--attackers', type=int, default=200)
+    p.add_argument('--seconds', type=float, default=5)
+    p.set_defaults(func=bench_boss)
+
+    p = sub.add_parser('cooldowns', help="Spam-click rejection cost")
+    p.add_argument('--clicks', type=int, default=100_000)
+    p.add_argument('--collection', type=int, default=200)
+    p.set_defaults(func=bench_cooldowns)
+
+    p = sub.add_parser('boss-payout', help="Boss reward payout for many participants")
+    p.add_argument('--participants', type=int, default=1000)
+    p.add_argument('--db', action='store_true', help="also time the SQL against the database")
+    p.set_defaults(func=bench_boss_payout)
+
+    p = sub.add_parser('inline', help="Inline query answer build cost, cached vs uncached")
+    p.add_argument('--queries', type=int, default=20_000)
+    p.add_argument('--players', type=int, default=500)
+    p.set_defaults(func=bench_inline)
+
+    p = sub.add_parser('rank', help="Rank + neighbors lookup on a synthetic player table")
+    p.add_argument('--players', type=int, default=1_000_000)
+    p.add_argument('--lookups', type=int, default=1000)
+    p.add_argument('--db-lookups', type=int, default=20, help="SQL lookups (each is a full scan)")
+    p.add_argument('--db', action='store_true', help="also time the SQL scan (needs DB)")
+    p.set_defaults(func=bench_rank)
+
+    p = sub.add_parser('daily-reset', help="Midnight full-table reset vs lazy daily counters")
+    p.add_argument('--players', type=int, default=1_000_000)
+    p.add_argument('--db', action='store_true', help="time the full-table UPDATE on a synthetic table (needs DB)")
+    p.set_defaults(func=bench_daily_reset)
+
+    p = sub.add_parser('league-settle', help="Concurrent league game settlement, old vs one-transaction (needs DB)")
+    p.add_argument('--players', type=int, default=50)
+    p.add_argument('--games', type=int, default=2000)
+    p.add_argument('--threads', type=int, default=4)  # pool maxconn is 5
+    p.set_defaults(func=bench_league_settle)
+
+    p = sub.add_parser('weekly-settle', help="Weekly league rewards on a synthetic player table (needs DB)")
+    p.add_argument('--players', type=int, default=1_000_000)
+    p.add_argument('--chunk', type=int, default=league_weekly.SETTLE_CHUNK_SIZE)
+    p.set_defaults(func=bench_weekly_settle)
+
+    p = sub.add_parser('enemy-ai', help="League enemy lookup + AI move throughput")
+    p.add_argument('--moves', type=int, default=200_000)
+    p.set_defaults(func=bench_enemy_ai)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+💹 BOSS ENGINE - Authoritative World Boss HP & Damage Counter
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Hits are applied to an in-process counter per chat instead of locking the
+world_boss_status row on every click. The bot runs as a single process,
+so this counter is the source of truth while a boss is alive.
+
+- apply_hit: atomic HP decrement + per-player damage, detects the kill once
+- Dirty per-player deltas are flushed to Postgres in one batch every
+  FLUSH_INTERVAL_SECONDS and immediately when the boss dies
+- State is (re)loaded from the database on first use after a restart
+- Rankings for the boss card are mirrored to a Redis ZSET (cache.boss_damage_*)
+"""
+
+import asyncio
+import heapq
+import logging
+import threading
+
+import cache
+import database as db
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5
+
+# chat_id -> boss state (see _load)
+BOSSES = {}
+_lock = threading.Lock()
+_flush_locks = {}  # chat_id -> lock held from taking a chat's deltas until they are written
+
+# ═══════════════════════════════════════
+# STATE
+# ═══════════════════════════════════════
+
+def _load(chat_id):
+    """Load an active boss and its damage table from the database."""
+    boss_status = db.get_boss_status(chat_id)
+    if not boss_status or not boss_status['is_active']:
+        return None
+
+    state = {
+        'boss_key': boss_status['boss_key'],
+        'max_hp': boss_status['max_hp'],
+        'hp': boss_status['current_hp'],
+        'ryo_pool': boss_status['ryo_pool'],
+        'defeated': boss_status['current_hp'] <= 0,
+        'damage': {},
+        'names': {},
+        'dirty': {},
+        'hp_dirty': False
+    }
+    damage_rows = db.get_boss_damage_totals(chat_id)
+    for user_id, username, total_damage in damage_rows:
+        state['damage'][user_id] = total_damage
+        state['names'][user_id] = username
+    cache.boss_damage_seed(chat_id, damage_rows)
+
+    with _lock:
+        # Another caller may have loaded it while we were querying
+        return BOSSES.setdefault(chat_id, state)
+
+def get_boss(chat_id):
+    """Engine state for a chat's active boss, loading it if needed."""
+    state = BOSSES.get(chat_id)
+    if state is None:
+        state = _load(chat_id)
+    return state
+
+def get_status(chat_id):
+    """world_boss_status-shaped dict served from memory."""
+    state = get_boss(chat_id)
+    if state is None:
+        return db.get_boss_status(chat_id)
+
+    return {
+        'chat_id': chat_id,
+        'is_active': 0 if state['defeated'] else 1,
+        'boss_key': state['boss_key'],
+        'current_hp': state['hp'],
+        'max_hp': state['max_hp'],
+        'ryo_pool': state['ryo_pool']
+    }
+
+def start_boss(chat_id, boss_key, max_hp, ryo_pool):
+    """Register a freshly spawned boss without re-reading it from the database."""
+    with _lock:
+        BOSSES[chat_id] = {
+            'boss_key': boss_key,
+            'max_hp': max_hp,
+            'hp': max_hp,
+            'ryo_pool': ryo_pool,
+            'defeated': False,
+            'damage': {},
+            'names': {},
+            'dirty': {},
+            'hp_dirty': False
+        }
+
+def forget(chat_id):
+    """Drop a chat's boss from memory (after defeat processing or a respawn)."""
+    with _lock:
+        BOSSES.pop(chat_id, None)
+    cache.boss_damage_clear(chat_id)
+
+# ═══════════════════════════════════════
+# HITS
+# ═══════════════════════════════════════
+
+def apply_hit(chat_id, user_id, username, damage):
+    """
+    Apply damage to the boss.
+    Returns (killed, hp_after). `killed` is True for exactly one hit - the
+    one that takes HP to 0. Hits on an already-dead boss are not counted.
+    """
+    state = get_boss(chat_id)
+    if state is None:
+        return False, 0
+
+    with _lock:
+        if state['defeated']:
+            return False, 0
+
+        state['hp'] = max(0, state['hp'] - damage)
+        state['hp_dirty'] = True
+        state['damage'][user_id] = state['damage'].get(user_id, 0) + damage
+        state['dirty'][user_id] = state['dirty'].get(user_id, 0) + damage
+        state['names'][user_id] = username
+
+        if state['hp'] == 0:
+            state['defeated'] = True
+        hp_after = state['hp']
+    
+    cache.boss_damage_incr(chat_id, user_id, username, damage)
+    return hp_after == 0, hp_after
+
+def top_damage(chat_id, limit=5):
+    """
+    Top damage dealers: [{'user_id', 'username', 'total_damage'}].
+    Served from the Redis ZSET, or from memory when Redis is down.
+    """
+    top = cache.boss_damage_top(chat_id, limit)
+    if top is not None:
+        return top
+    
+    state = get_boss(chat_id)
+    if state is None:
+        return []
+
+    top = heapq.nlargest(limit, state['damage'].items(), key=lambda item: item[1])
+    return [
+        {'user_id': user_id, 'username': state['names'].get(user_id, '???'), 'total_damage': total}
+        for user_id, total in top
+    ]
+
+# ═══════════════════════════════════════
+# BATCHED FLUSH
+# ═══════════════════════════════════════
+
+def _take_dirty(chat_id, state):
+    with _lock:
+        if not state['hp_dirty'] and not state['dirty']:
+            return None
+        rows = [(chat_id, user_id, state['names'][user_id], delta) for user_id, delta in state['dirty'].items()]
+        state['dirty'] = {}
+        state['hp_dirty'] = False
+        return state['hp'], rows
+
+def _restore_dirty(state, rows):
+    with _lock:
+        state['hp_dirty'] = True
+        for _, user_id, _, delta in rows:
+            state['dirty'][user_id] = state['dirty'].get(user_id, 0) + delta
+
+def _flush_lock(chat_id):
+    with _lock:
+        return _flush_locks.setdefault(chat_id, threading.Lock())
+
+def flush_chat_sync(chat_id):
+    """
+    Write one chat's pending HP and damage deltas in a single transaction.
+    Flushes of a chat run one at a time, so a flush that finds nothing
+    dirty returns only after deltas taken by a concurrent flush are written.
+    """
+    state = BOSSES.get(chat_id)
+    if state is None:
+        return True
+
+    with _flush_lock(chat_id):
+        pending = _take_dirty(chat_id, state)
+        if pending is None:
+            return True
+
+        current_hp, rows = pending
+        if not db.flush_boss_damage(chat_id, current_hp, rows):
+            logger.error(f"Boss flush failed for chat {chat_id}, keeping {len(rows)} deltas for retry.")
+            _restore_dirty(state, rows)
+            return False
+        return True
+
+def flush_all_sync():
+    flushed = 0
+    for chat_id in list(BOSSES):
+        if flush_chat_sync(chat_id):
+            flushed += 1
+    return flushed
+
+async def flush_chat(chat_id):
+    """
+    Flush one chat now (used on defeat, before rewards read the table).
+    Waits for an in-flight boss_flush_job flush of the chat, which may hold
+    the killing hits.
+    """
+    return await asyncio.to_thread(flush_chat_sync, chat_id)
+
+async def boss_flush_job(context):
+    """Repeating job: persist damage for every live boss."""
+    if BOSSES:
+        await asyncio.to_thread(flush_all_sync)
@@ -0,0 +1,236 @@
+"""
+🧪 BOSS SIM - Offline World Boss Balance Simulator
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Plays out thousands of world boss fights with the same damage, recoil
+and reward code the bot uses (world_boss.roll_* / compute_boss_rewards),
+honoring per-player attack cooldowns and the faint lockout, and reports
+time-to-kill and payout distributions for tuning gl.WORLD_BOSSES.
+
+Attackers are sampled from real player builds (--from-db) or from a
+synthetic level curve. Scenarios are independent, so they are split
+across worker processes.
+
+Usage:
+    python boss_sim.py [--boss gedo_mazo] [--attackers 20] [--scenarios 2000]
+                       [--policy mixed] [--think 20] [--hours 6] [--from-db] [--workers 4]
+"""
+
+import argparse
+import heapq
+import logging
+import multiprocessing
+import random
+import time
+
+import database as db
+import game_logic as gl
+import world_boss as wb
+
+logger = logging.getLogger(__name__)
+
+COOLDOWNS = {
+    'taijutsu': wb.TAIJUTSU_COOLDOWN_SECONDS,
+    'throw_kunai': wb.KUNAI_COOLDOWN_SECONDS,
+    'jutsu': wb.JUTSU_COOLDOWN_SECONDS
+}
+FAINT_LOCKOUT_SECONDS = wb.FAINT_LOCKOUT_HOURS * 3600
+POLICIES = ('mixed', 'taijutsu', 'throw_kunai')
+
+# ═══════════════════════════════════════
+# ATTACKER PROFILES
+# ═══════════════════════════════════════
+
+def synthetic_profiles(count, rng):
+    """Player builds along the level curve (most players low level, a long tail up to 60)."""
+    profiles = []
+    for _ in range(count):
+        level = max(1, min(60, int(rng.triangular(1, 60, 8))))
+        stats = {'strength': 10, 'speed': 10, 'intelligence': 10, 'stamina': 10}
+        for _ in range((level - 1) * gl.STAT_POINTS_PER_LEVEL):
+            stats[rng.choice(list(stats))] += 1
+        known = [key for key, info in gl.JUTSU_LIBRARY.items()
+                 if info['level_required'] <= level and rng.random() < 0.6]
+        profiles.append({'level': level, **stats, 'equipment': {}, 'known_jutsus': known})
+    return profiles
+
+def prepare(profile):
+    """Precompute what the fight loop needs for one build."""
+    total_stats = gl.get_total_stats(profile)
+    jutsus = [gl.JUTSU_LIBRARY[key] for key in (profile.get('known_jutsus') or []) if key in gl.JUTSU_LIBRARY]
+    best_jutsu = max(jutsus, key=lambda info: info['power'], default=None)
+    if profile['level'] < gl.JUTSU_LIBRARY['fireball']['level_required']:
+        best_jutsu = None
+    return {
+        'level': profile['level'],
+        'stats': total_stats,
+        'max_hp': total_stats['max_hp'],
+        'max_chakra': total_stats['max_chakra'],
+        'jutsu': best_jutsu
+    }
+
+# ═══════════════════════════════════════
+# FIGHT LOOP
+# ═══════════════════════════════════════
+
+def _choose_action(attacker, chakra, policy):
+    if policy != 'mixed':
+        return policy
+    jutsu = attacker['jutsu']
+    if jutsu and chakra >= jutsu['chakra_cost']:
+        return 'jutsu'
+    # Kunai scales with level, taijutsu with strength: take the better damage per cooldown second
+    taijutsu_rate = attacker['stats']['strength'] * 2 / COOLDOWNS['taijutsu']
+    kunai_rate = (10 + attacker['level']) / COOLDOWNS['throw_kunai']
+    return 'taijutsu' if taijutsu_rate >= kunai_rate else 'throw_kunai'
+
+def simulate_fight(boss_info, attackers, rng, policy='mixed', think_seconds=20.0,
+                   join_window=600.0, max_seconds=6 * 3600):
+    """
+    One fight. Attackers join at a random time within join_window, then click
+    again each time their cooldown ends (plus an exponential "think" delay).
+    Returns (kill_time or None, damage per attacker, hits, faints).
+    """
+    boss_hp = boss_info['hp']
+    hp = [a['max_hp'] for a in attackers]
+    chakra = [a['max_chakra'] for a in attackers]
+    damage = [0] * len(attackers)
+    hits = faints = 0
+
+    queue = [(rng.uniform(0, join_window), i) for i in range(len(attackers))]
+    heapq.heapify(queue)
+
+    while queue:
+        now, i = heapq.heappop(queue)
+        if now > max_seconds:
+            break
+
+        attacker = attackers[i]
+        if hp[i] <= 1:
+            hp[i] = attacker['max_hp']  # Back from the faint lockout, healed
+
+        action = _choose_action(attacker, chakra[i], policy)
+        if action == 'jutsu':
+            dealt, _, recoil = wb.roll_jutsu(attacker['jutsu'], attacker['stats'], boss_info, rng)
+            chakra[i] -= attacker['jutsu']['chakra_cost']
+        elif action == 'throw_kunai':
+            dealt, _, recoil = wb.roll_throw_kunai(attacker['level'], attacker['stats'], boss_info, rng)
+        else:
+            dealt, _, recoil = wb.roll_taijutsu(attacker['stats'], boss_info, rng)
+
+        hits += 1
+        damage[i] += dealt
+        boss_hp -= dealt
+        if boss_hp <= 0:
+            return now, damage, hits, faints
+
+        hp[i] -= recoil
+        if hp[i] <= 1:
+            # Locked out for FAINT_LOCKOUT_HOURS from the attack that fainted them
+            faints += 1
+            heapq.heappush(queue, (now + FAINT_LOCKOUT_SECONDS, i))
+        else:
+            heapq.heappush(queue, (now + COOLDOWNS[action] + rng.expovariate(1 / think_seconds), i))
+
+    return None, damage, hits, faints
+
+def run_batch(job):
+    """Worker entry point: simulate `scenarios` fights and return their summaries."""
+    boss_key, profiles, scenarios, attackers_per_fight, seed, options = job
+    rng = random.Random(seed)
+    boss_info = gl.WORLD_BOSSES[boss_key]
+    prepared = [prepare(p) for p in profiles]
+
+    results = []
+    for _ in range(scenarios):
+        attackers = [prepared[rng.randrange(len(prepared))] for _ in range(attackers_per_fight)]
+        kill_time, damage, hits, faints = simulate_fight(boss_info, attackers, rng, **options)
+
+        payouts = []
+        if kill_time is not None:
+            all_damage = [
+                {'user_id': i, 'username': str(i), 'total_damage': dealt}
+                for i, dealt in enumerate(damage) if dealt > 0
+            ]
+            rewards, _ = wb.compute_boss_rewards(all_damage, boss_info['ryo_pool'])
+            payouts = sorted(rewards.values(), reverse=True)
+        results.append((kill_time, hits, faints, payouts))
+    return results
+
+# ═══════════════════════════════════════
+# REPORT
+# ═══════════════════════════════════════
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def print_report(boss_key, args, results, elapsed):
+    boss_info = gl.WORLD_BOSSES[boss_key]
+    kills = sorted(r[0] / 60 for r in results if r[0] is not None)
+    hits = sorted(r[1] for r in results)
+    faints = [r[2] for r in results]
+    all_payouts = sorted(p for r in results for p in r[3])
+    top_shares = [r[3][0] / boss_info['ryo_pool'] for r in results if r[3]]
+
+    print(f"\n🧪 {boss_info['name']} - HP {boss_info['hp']:,}, pool {boss_info['ryo_pool']:,}")
+    print(f"   {len(results):,} fights x {args.attackers} attackers, policy={args.policy}, "
+          f"think={args.think}s  ({elapsed:.1f}s)\n")
+    print(f"Killed within {args.hours}h: {len(kills) / len(results):6.1%}")
+    if kills:
+        print(f"Time to kill (min):   p10 {percentile(kills, 10):6.1f}   p50 {percentile(kills, 50):6.1f}   "
+              f"p90 {percentile(kills, 90):6.1f}   max {kills[-1]:6.1f}")
+    print(f"Hits per fight:       p50 {percentile(hits, 50):6}   p90 {percentile(hits, 90):6}")
+    print(f"Faints per fight:     avg {sum(faints) / len(faints):6.2f}")
+    if all_payouts:
+        print(f"Payout per attacker:  p10 {percentile(all_payouts, 10):,}   p50 {percentile(all_payouts, 50):,}   "
+              f"p90 {percentile(all_payouts, 90):,}   max {all_payouts[-1]:,}")
+        print(f"Top attacker share:   avg {sum(top_shares) / len(top_shares):.1%}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline world boss balance simulator")
+    parser.add_argument('--boss', choices=list(gl.WORLD_BOSSES), default='gedo_mazo')
+    parser.add_argument('--attackers', type=int, default=20)
+    parser.add_argument('--scenarios', type=int, default=2000)
+    parser.add_argument('--policy', choices=POLICIES, default='mixed')
+    parser.add_argument('--think', type=float, default=20.0, help="mean seconds between cooldown end and next click")
+    parser.add_argument('--join-window', type=float, default=600.0, help="attackers arrive within this many seconds")
+    parser.add_argument('--hours', type=float, default=6.0, help="give up on a fight after this long")
+    parser.add_argument('--from-db', action='store_true', help="sample attacker builds from the players table")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.from_db:
+        profiles = db.get_boss_sim_profiles()
+        if not profiles:
+            parser.error("No player profiles returned from the database.")
+    else:
+        profiles = synthetic_profiles(500, random.Random(args.seed))
+
+    options = {
+        'policy': args.policy,
+        'think_seconds': args.think,
+        'join_window': args.join_window,
+        'max_seconds': args.hours * 3600
+    }
+    workers = max(1, min(args.workers, args.scenarios))
+    per_worker = -(-args.scenarios // workers)
+    jobs = [
+        (args.boss, profiles, min(per_worker, args.scenarios - w * per_worker), args.attackers, args.seed + w, options)
+        for w in range(workers) if args.scenarios - w * per_worker > 0
+    ]
+
+    started = time.perf_counter()
+    if len(jobs) == 1:
+        batches = [run_batch(jobs[0])]
+    else:
+        with multiprocessing.Pool(len(jobs)) as pool:
+            batches = pool.map(run_batch, jobs)
+    results = [r for batch in batches for r in batch]
+    print_report(args.boss, args, results, time.perf_counter() - started)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
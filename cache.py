@@ -68,6 +68,20 @@ def clear_player_cache(user_id):
     except Exception as e:
         logger.error(f"Failed to clear cache for player {user_id}: {e}")
 
+def clear_player_cache_many(user_ids):
+    """Deletes many players' cache entries in one round trip."""
+    if not redis_conn or not user_ids:
+        return
+        
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.delete(f"player:{user_id}")
+        pipe.execute()
+        logger.info(f"CACHE CLEARED for {len(user_ids)} players")
+    except Exception as e:
+        logger.error(f"Failed to clear cache for {len(user_ids)} players: {e}")
+
 def flush_all_cache():
     """Wipes the ENTIRE Redis cache clean."""
     if not redis_conn: return False
@@ -78,3 +92,414 @@ def flush_all_cache():
     except Exception as e:
         logger.error(f"Failed to flush Redis: {e}")
         return False
+
+# --- World Boss Damage Rankings ---
+# Per-chat ZSET of total damage (member = user_id) plus a hash of usernames.
+# Postgres (world_boss_damage) stays the durable source for payouts.
+
+BOSS_RANKING_TTL = 86400
+
+def _boss_keys(chat_id):
+    return f"boss:dmg:{chat_id}", f"boss:names:{chat_id}"
+
+def boss_damage_incr(chat_id, user_id, username, damage):
+    """Add damage to a player's score in the chat's boss ranking."""
+    if not redis_conn:
+        return False
+        
+    zkey, hkey = _boss_keys(chat_id)
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.zincrby(zkey, damage, user_id)
+        pipe.hset(hkey, user_id, username)
+        pipe.expire(zkey, BOSS_RANKING_TTL)
+        pipe.expire(hkey, BOSS_RANKING_TTL)
+        pipe.execute()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to update boss ranking for chat {chat_id}: {e}")
+        return False
+
+def boss_damage_top(chat_id, limit=3):
+    """
+    Top damage dealers as [{'user_id', 'username', 'total_damage'}].
+    Returns None if Redis is unavailable (caller should fall back).
+    """
+    if not redis_conn:
+        return None
+        
+    zkey, hkey = _boss_keys(chat_id)
+    try:
+        top = redis_conn.zrevrange(zkey, 0, limit - 1, withscores=True)
+        if not top:
+            return []
+        names = redis_conn.hmget(hkey, [member for member, _ in top])
+        return [
+            {'user_id': int(member), 'username': name or '???', 'total_damage': int(score)}
+            for (member, score), name in zip(top, names)
+        ]
+    except Exception as e:
+        logger.error(f"Failed to read boss ranking for chat {chat_id}: {e}")
+        return None
+
+def boss_damage_seed(chat_id, rows):
+    """Rebuild a chat's ranking from (user_id, username, total_damage) rows if it's missing."""
+    if not redis_conn or not rows:
+        return
+        
+    zkey, hkey = _boss_keys(chat_id)
+    try:
+        if redis_conn.exists(zkey):
+            return
+        pipe = redis_conn.pipeline(transaction=True)
+        pipe.zadd(zkey, {user_id: total for user_id, _, total in rows})
+        pipe.hset(hkey, mapping={user_id: username for user_id, username, _ in rows})
+        pipe.expire(zkey, BOSS_RANKING_TTL)
+        pipe.expire(hkey, BOSS_RANKING_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to seed boss ranking for chat {chat_id}: {e}")
+
+def boss_damage_clear(chat_id):
+    """Drop a chat's ranking (boss defeated or respawned)."""
+    if not redis_conn:
+        return
+        
+    try:
+        redis_conn.delete(*_boss_keys(chat_id))
+    except Exception as e:
+        logger.error(f"Failed to clear boss ranking for chat {chat_id}: {e}")
+
+# --- Telegram Media file_ids ---
+# media key (URL or local path) -> file_id returned by Telegram, no expiry.
+
+MEDIA_HASH = "media:file_ids"
+
+def get_media_file_id(media_key):
+    if not redis_conn:
+        return None
+        
+    try:
+        return redis_conn.hget(MEDIA_HASH, media_key)
+    except Exception as e:
+        logger.error(f"Failed to get media file_id for {media_key}: {e}")
+        return None
+
+def set_media_file_id(media_key, file_id):
+    if not redis_conn:
+        return
+        
+    try:
+        redis_conn.hset(MEDIA_HASH, media_key, file_id)
+    except Exception as e:
+        logger.error(f"Failed to save media file_id for {media_key}: {e}")
+
+def delete_media_file_id(media_key):
+    if not redis_conn:
+        return
+        
+    try:
+        redis_conn.hdel(MEDIA_HASH, media_key)
+    except Exception as e:
+        logger.error(f"Failed to delete media file_id for {media_key}: {e}")
+
+# --- Action Cooldowns ---
+# Mirror of cooldowns.py's registry so cooldowns survive a restart.
+# One key per (namespace, user, action), expiring with the cooldown.
+
+def cooldown_ttl(key):
+    """Seconds left on a mirrored cooldown (0 if none), or None if Redis is unavailable."""
+    if not redis_conn:
+        return None
+        
+    try:
+        ttl_ms = redis_conn.pttl(f"cd:{key}")
+        return ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else 0
+    except Exception as e:
+        logger.error(f"Failed to read cooldown {key}: {e}")
+        return None
+
+def cooldown_set_many(items):
+    """Write many cooldowns in one pipeline. items: (key, seconds) pairs."""
+    if not redis_conn or not items:
+        return
+        
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        for key, seconds in items:
+            pipe.set(f"cd:{key}", 1, px=max(1, int(seconds * 1000)))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to save {len(items)} cooldowns: {e}")
+
+# --- Leaderboards ---
+# One ZSET per ranked players column (member = user_id), the same per
+# village, and one hash per display field. Postgres stays the source of
+# truth: writes keep these current incrementally and leaderboard_service
+# rebuilds them periodically. Reads return None until the first rebuild
+# has completed (LEADERBOARD_READY).
+# Chat membership (for per-chat ranks) is a SET of user_ids seen in the chat.
+
+LEADERBOARD_COLUMNS = ('ryo', 'total_exp', 'wins', 'kills', 'league_points')
+LEADERBOARD_INFO_FIELDS = ('username', 'level', 'win_streak')
+LEADERBOARD_READY = "lb:ready"
+LEADERBOARD_VILLAGES = "lb:villages"
+LEADERBOARD_CHAT_TTL = 30 * 86400
+
+# user_ids written while a rebuild is running (see leaderboard_service.reconcile)
+_leaderboard_touched = None
+
+def leaderboard_key(column, village=None):
+    return f"lb:{column}:v:{village}" if village else f"lb:{column}"
+
+def leaderboard_info_key(field):
+    return f"lb:info:{field}"
+
+def leaderboard_record_many(rows):
+    """
+    Store new absolute values for many players in one pipeline.
+    rows: (user_id, fields) pairs; fields may hold any players columns,
+    only ranked columns, display fields and `village` are used.
+    """
+    if not redis_conn:
+        return
+    
+    pipe = redis_conn.pipeline(transaction=False)
+    queued = 0
+    for user_id, fields in rows:
+        before = queued
+        village = fields.get('village')
+        for column in LEADERBOARD_COLUMNS:
+            if fields.get(column) is not None:
+                pipe.zadd(leaderboard_key(column), {user_id: fields[column]})
+                if village:
+                    pipe.zadd(leaderboard_key(column, village), {user_id: fields[column]})
+                queued += 1
+        for field in LEADERBOARD_INFO_FIELDS:
+            if fields.get(field) is not None:
+                pipe.hset(leaderboard_info_key(field), user_id, fields[field])
+                queued += 1
+        if queued > before and _leaderboard_touched is not None:
+            _leaderboard_touched.add(user_id)
+    
+    if not queued:
+        return
+    try:
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to update leaderboards: {e}")
+
+def leaderboard_record(user_id, fields):
+    leaderboard_record_many([(user_id, fields)])
+
+def _leaderboard_info(members):
+    """Display fields for ZSET members: {member: (username, level, win_streak)}."""
+    pipe = redis_conn.pipeline(transaction=False)
+    for field in LEADERBOARD_INFO_FIELDS:
+        pipe.hmget(leaderboard_info_key(field), members)
+    usernames, levels, streaks = pipe.execute()
+    return {
+        member: (username or '???', int(level or 1), int(streak or 0))
+        for member, username, level, streak in zip(members, usernames, levels, streaks)
+    }
+
+def _leaderboard_rows(column, scored, first_position=1):
+    """[(member, score)] -> row dicts with display fields and board position."""
+    if not scored:
+        return []
+    info = _leaderboard_info([member for member, _ in scored])
+    rows = []
+    for position, (member, score) in enumerate(scored, first_position):
+        username, level, streak = info[member]
+        rows.append({
+            'user_id': int(member), 'username': username, 'level': level,
+            'win_streak': streak, column: int(score), 'position': position
+        })
+    return rows
+
+def leaderboard_top(column, limit=10, positive_only=False, village=None):
+    """
+    Top players by a ranked column as [{'user_id', 'username', 'level', 'win_streak', column, 'position'}].
+    Returns None if Redis is unavailable or not rebuilt yet (caller should fall back).
+    """
+    if not redis_conn:
+        return None
+    
+    try:
+        if not redis_conn.exists(LEADERBOARD_READY):
+            return None
+        top = redis_conn.zrevrangebyscore(
+            leaderboard_key(column, village), '+inf', '(0' if positive_only else '-inf',
+            start=0, num=limit, withscores=True
+        )
+        return _leaderboard_rows(column, top)
+    except Exception as e:
+        logger.error(f"Failed to read {column} leaderboard: {e}")
+        return None
+
+def leaderboard_neighborhood(column, user_id, radius=5, village=None):
+    """
+    A player's standing: {'rank', 'total', 'score', 'rows'} where rank counts
+    players with a strictly higher score (ties share a rank) and rows are the
+    `radius` players either side. rank is None if the player isn't ranked.
+    All O(log n + radius). Returns None if Redis is unavailable or not rebuilt yet.
+    """
+    if not redis_conn:
+        return None
+    
+    key = leaderboard_key(column, village)
+    try:
+        if not redis_conn.exists(LEADERBOARD_READY):
+            return None
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.zrevrank(key, user_id)
+        pipe.zscore(key, user_id)
+        pipe.zcard(key)
+        position, score, total = pipe.execute()
+        if position is None:
+            return {'rank': None, 'total': total, 'score': 0, 'rows': []}
+        
+        start = max(0, position - radius)
+        pipe = redis_conn.pipeline(transaction=False)
+        pipe.zcount(key, f"({score}", '+inf')
+        pipe.zrevrange(key, start, position + radius, withscores=True)
+        higher, around = pipe.execute()
+        return {
+            'rank': higher + 1,
+            'total': total,
+            'score': int(score),
+            'rows': _leaderboard_rows(column, around, start + 1)
+        }
+    except Exception as e:
+        logger.error(f"Failed to read {column} rank for {user_id}: {e}")
+        return None
+
+def leaderboard_note_chat_members(pairs):
+    """Remember that players were seen in chats. pairs: (chat_id, user_id)."""
+    if not redis_conn or not pairs:
+        return
+    
+    try:
+        pipe = redis_conn.pipeline(transaction=False)
+        for chat_id, user_id in pairs:
+            pipe.sadd(f"lb:chat:{chat_id}", user_id)
+        for chat_id in {chat_id for chat_id, _ in pairs}:
+            pipe.expire(f"lb:chat:{chat_id}", LEADERBOARD_CHAT_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to save {len(pairs)} chat members: {e}")
+
+def leaderboard_chat_scores(chat_id, column):
+    """
+    [(member, score)] for every ranked member of a chat, best first.
+    O(m log m) in the chat's member count. None if Redis is unavailable.
+    """
+    if not redis_conn:
+        return None
+    
+    try:
+        members = list(redis_conn.smembers(f"lb:chat:{chat_id}"))
+        if not members:
+            return []
+        pipe = redis_conn.pipeline(transaction=False)
+        for member in members:
+            pipe.zscore(leaderboard_key(column), member)
+        scores = pipe.execute()
+        scored = [(member, score) for member, score in zip(members, scores) if score is not None]
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored
+    except Exception as e:
+        logger.error(f"Failed to read chat {chat_id} scores: {e}")
+        return None
+
+def leaderboard_chat_neighborhood(chat_id, column, user_id, radius=5):
+    """Same shape as leaderboard_neighborhood, among the chat's members."""
+    scored = leaderboard_chat_scores(chat_id, column)
+    if scored is None:
+        return None
+    
+    member = str(user_id)
+    position = next((i for i, (m, _) in enumerate(scored) if m == member), None)
+    if position is None:
+        return {'rank': None, 'total': len(scored), 'score': 0, 'rows': []}
+    
+    score = scored[position][1]
+    start = max(0, position - radius)
+    try:
+        rows = _leaderboard_rows(column, scored[start:position + radius + 1], start + 1)
+    except Exception as e:
+        logger.error(f"Failed to read chat {chat_id} rank rows: {e}")
+        return None
+    return {
+        'rank': sum(1 for _, s in scored if s > score) + 1,
+        'total': len(scored),
+        'score': int(score),
+        'rows': rows
+    }
+
+def leaderboard_track_writes():
+    """Start recording which players get leaderboard writes (during a rebuild)."""
+    global _leaderboard_touched
+    _leaderboard_touched = set()
+
+def leaderboard_take_touched():
+    """Stop recording and return the players written meanwhile."""
+    global _leaderboard_touched
+    touched, _leaderboard_touched = _leaderboard_touched or set(), None
+    return touched
+
+def leaderboard_replace(rows_iter):
+    """
+    Rebuild every leaderboard from full player rows (with `village`), then swap
+    the new keys in atomically. rows_iter yields lists of row dicts.
+    Returns rows written, or None.
+    """
+    if not redis_conn:
+        return None
+    
+    suffix = ":rebuild"
+    keys = [leaderboard_key(col) for col in LEADERBOARD_COLUMNS] + [leaderboard_info_key(f) for f in LEADERBOARD_INFO_FIELDS]
+    try:
+        old_villages = redis_conn.smembers(LEADERBOARD_VILLAGES)
+        redis_conn.delete(*(key + suffix for key in keys))
+        for village in old_villages:
+            redis_conn.delete(*(leaderboard_key(col, village) + suffix for col in LEADERBOARD_COLUMNS))
+        
+        count = 0
+        villages = set()
+        for rows in rows_iter:
+            pipe = redis_conn.pipeline(transaction=False)
+            by_village = {}
+            for r in rows:
+                if r.get('village'):
+                    by_village.setdefault(r['village'], []).append(r)
+            for column in LEADERBOARD_COLUMNS:
+                pipe.zadd(leaderboard_key(column) + suffix, {r['user_id']: r[column] or 0 for r in rows})
+                for village, village_rows in by_village.items():
+                    pipe.zadd(leaderboard_key(column, village) + suffix, {r['user_id']: r[column] or 0 for r in village_rows})
+            for field in LEADERBOARD_INFO_FIELDS:
+                pipe.hset(leaderboard_info_key(field) + suffix, mapping={r['user_id']: r[field] if r[field] is not None else '' for r in rows})
+            pipe.execute()
+            villages.update(by_village)
+            count += len(rows)
+        
+        pipe = redis_conn.pipeline(transaction=True)
+        for key in keys:
+            if count:
+                pipe.rename(key + suffix, key)
+            else:
+                pipe.delete(key)
+        for village in villages:
+            for column in LEADERBOARD_COLUMNS:
+                pipe.rename(leaderboard_key(column, village) + suffix, leaderboard_key(column, village))
+        for village in set(old_villages) - villages:
+            pipe.delete(*(leaderboard_key(col, village) for col in LEADERBOARD_COLUMNS))
+        pipe.delete(LEADERBOARD_VILLAGES)
+        if villages:
+            pipe.sadd(LEADERBOARD_VILLAGES, *villages)
+        pipe.set(LEADERBOARD_READY, 1)
+        pipe.execute()
+        return count
+    except Exception as e:
+        logger.error(f"Failed to rebuild leaderboards: {e}")
+        return None
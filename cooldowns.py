@@ -0,0 +1,90 @@
+"""
+⏳ COOLDOWNS - In-Memory Per-User Action Cooldown Registry
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Button mashers are rejected from a dict lookup against a monotonic clock,
+before the handler loads the player from Redis/Postgres.
+
+- check() / start() work on (namespace, user_id, action) keys
+- New cooldowns are mirrored to Redis (cache.cooldown_*) by a repeating
+  job, so they survive a restart; the first check of a key after a
+  restart reads the Redis TTL once
+- The player row's own cooldown column stays the persisted record and is
+  still written with the rest of the player update
+"""
+
+import asyncio
+import logging
+import time
+
+import cache
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = 5
+
+# (namespace, user_id, action) -> time.monotonic() deadline (0.0 = known ready)
+_deadlines = {}
+_dirty = {}  # key -> deadline, waiting to be mirrored to Redis
+
+STATS = {
+    'checks': 0,
+    'rejected': 0,
+    'redis_reads': 0
+}
+
+def _redis_key(key):
+    namespace, user_id, action = key
+    return f"{namespace}:{user_id}:{action}"
+
+def remaining(namespace, user_id, action):
+    """Seconds left on a cooldown (0 when the action is allowed)."""
+    key = (namespace, user_id, action)
+    deadline = _deadlines.get(key)
+    if deadline is None:
+        # Unknown since startup - ask Redis once, then remember the answer
+        STATS['redis_reads'] += 1
+        ttl = cache.cooldown_ttl(_redis_key(key)) or 0
+        deadline = time.monotonic() + ttl if ttl else 0.0
+        _deadlines[key] = deadline
+
+    return max(0.0, deadline - time.monotonic())
+
+def check(namespace, user_id, action):
+    """Returns (can_act, remaining_seconds)."""
+    STATS['checks'] += 1
+    left = remaining(namespace, user_id, action)
+    if left > 0:
+        STATS['rejected'] += 1
+        return False, left
+    return True, 0
+
+def start(namespace, user_id, action, seconds):
+    """Put an action on cooldown now."""
+    key = (namespace, user_id, action)
+    deadline = time.monotonic() + seconds
+    _deadlines[key] = deadline
+    _dirty[key] = deadline
+
+# ═══════════════════════════════════════
+# LAZY PERSISTENCE
+# ═══════════════════════════════════════
+
+def take_pending():
+    """
+    Cooldowns still running that Redis doesn't have yet, as (key, seconds)
+    pairs. Also drops expired entries from memory.
+    """
+    now = time.monotonic()
+    pending = [(_redis_key(key), deadline - now) for key, deadline in _dirty.items() if deadline > now]
+    _dirty.clear()
+
+    expired = [key for key, deadline in _deadlines.items() if deadline <= now]
+    for key in expired:
+        del _deadlines[key]
+    return pending
+
+async def cooldown_flush_job(context):
+    """Repeating job: mirror new cooldowns to Redis in one pipeline."""
+    pending = take_pending()
+    if pending:
+        await asyncio.to_thread(cache.cooldown_set_many, pending)
@@ -8,7 +8,9 @@
 import logging
 import psycopg2
 from psycopg2 import pool, OperationalError, InterfaceError
+from psycopg2.extras import execute_values
 import json
+import copy
 import datetime
 from datetime import timezone
 import threading
@@ -265,13 +267,22 @@ def create_tables():
                 league_points INTEGER DEFAULT 0,
                 win_streak INTEGER DEFAULT 0,
                 battles_today INTEGER DEFAULT 0,
+                battles_today_date DATE DEFAULT NULL,
                 total_battles INTEGER DEFAULT 0,
                 daily_missions_data JSONB DEFAULT '{}'::jsonb,
                 daily_missions_reset TIMESTAMP DEFAULT NULL
             );
             """,
             """CREATE TABLE IF NOT EXISTS jutsu_discoveries (id SERIAL PRIMARY KEY, combination TEXT UNIQUE, jutsu_name TEXT, discovered_by TEXT, discovered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);""",
-            """CREATE TABLE IF NOT EXISTS battle_history (id SERIAL PRIMARY KEY, player1_id BIGINT, player2_id BIGINT, winner_id BIGINT, battle_log TEXT, duration_seconds INTEGER, fought_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);"""
+            """CREATE TABLE IF NOT EXISTS battle_history (id SERIAL PRIMARY KEY, player1_id BIGINT, player2_id BIGINT, winner_id BIGINT, battle_log TEXT, duration_seconds INTEGER, fought_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);""",
+            """CREATE TABLE IF NOT EXISTS battle_escrow (id SERIAL PRIMARY KEY, battle_id TEXT NOT NULL, player1_id BIGINT NOT NULL, player2_id BIGINT NOT NULL, stake INTEGER NOT NULL, payout INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'open', winner_id BIGINT DEFAULT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, settled_at TIMESTAMP DEFAULT NULL);""",
+            """CREATE INDEX IF NOT EXISTS idx_battle_escrow_open ON battle_escrow (created_at) WHERE status = 'open';""",
+            """CREATE TABLE IF NOT EXISTS league_sessions (game_id TEXT PRIMARY KEY, player_id BIGINT NOT NULL, entry_fee INTEGER NOT NULL, point_loss INTEGER NOT NULL, status TEXT NOT NULL DEFAULT 'open', state JSONB NOT NULL, expires_at TIMESTAMP NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, closed_at TIMESTAMP DEFAULT NULL);""",
+            """CREATE INDEX IF NOT EXISTS idx_league_sessions_open ON league_sessions (expires_at) WHERE status = 'open';""",
+            """CREATE TABLE IF NOT EXISTS league_weekly_settlements (week_start DATE NOT NULL, user_id BIGINT NOT NULL, tier_key TEXT NOT NULL, ryo INTEGER NOT NULL, exp INTEGER NOT NULL, items INTEGER NOT NULL, paid_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (week_start, user_id));""",
+            """CREATE TABLE IF NOT EXISTS league_weekly_runs (week_start DATE PRIMARY KEY, max_user_id BIGINT NOT NULL, last_user_id BIGINT NOT NULL, started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, finished_at TIMESTAMP DEFAULT NULL);""",
+            """CREATE TABLE IF NOT EXISTS akatsuki_fights (message_id BIGINT PRIMARY KEY, chat_id BIGINT NOT NULL UNIQUE, enemy_name TEXT NOT NULL, enemy_hp INTEGER NOT NULL, player_1_id BIGINT DEFAULT NULL, player_2_id BIGINT DEFAULT NULL, player_3_id BIGINT DEFAULT NULL, turn_player_id TEXT DEFAULT NULL, version INTEGER NOT NULL DEFAULT 0, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);""",
+            """CREATE TABLE IF NOT EXISTS group_event_settings (chat_id BIGINT PRIMARY KEY, auto_events INTEGER DEFAULT 1);"""
         )
         
         with conn.cursor() as c:
@@ -331,9 +342,15 @@ def update_schema():
                 ('league_points', 'INTEGER DEFAULT 0'),
                 ('win_streak', 'INTEGER DEFAULT 0'),
                 ('battles_today', 'INTEGER DEFAULT 0'),
+                ('battles_today_date', 'DATE DEFAULT NULL'),
                 ('total_battles', 'INTEGER DEFAULT 0'),
                 ('daily_missions_data', "JSONB DEFAULT '{}'::jsonb"),
-                ('daily_missions_reset', 'TIMESTAMP DEFAULT NULL')
+                ('daily_missions_reset', 'TIMESTAMP DEFAULT NULL'),
+                # 👹 Akatsuki Event
+                ('akatsuki_cooldown', "JSONB DEFAULT '{}'::jsonb")
+            ],
+            'akatsuki_fights': [
+                ('version', 'INTEGER NOT NULL DEFAULT 0')
             ]
         }
         
@@ -344,6 +361,13 @@ def update_schema():
                         c.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {col} {dtype};")
                     except:
                         pass
+            
+            # Daily counters became lazy (count, day) pairs: a count left by the old
+            # midnight reset job is today's, so date it instead of zeroing it
+            c.execute("""
+                UPDATE players SET battles_today_date = (NOW() AT TIME ZONE 'UTC')::date
+                WHERE battles_today > 0 AND battles_today_date IS NULL
+            """)
         
         conn.commit()
         logger.info("✅ Schema updated successfully!")
@@ -365,7 +389,7 @@ def get_player(user_id):
                     cp[k] = datetime.datetime.fromisoformat(cp[k])
                 except:
                     pass
-        for k in ['last_train_reset_date','last_mission_reset_date','last_daily_claim','last_inline_game_date']:
+        for k in ['last_train_reset_date','last_mission_reset_date','last_daily_claim','last_inline_game_date','battles_today_date']:
             if cp.get(k):
                 try:
                     cp[k] = datetime.date.fromisoformat(cp[k])
@@ -434,26 +458,82 @@ def create_player(user_id, username, village, auto_registered=False):
     result = execute_with_retry(_create_player)
     return result if result else False
 
-def update_player(user_id, updates):
-    """Update player data"""
-    def _update_player(conn):
-        set_clauses = []
-        values = []
-        
-        for k, v in updates.items():
-            set_clauses.append(f"{k} = %s")
-            if isinstance(v, (dict, list)):
-                values.append(json.dumps(v))
-            else:
-                values.append(v)
+# Keys that appear on player dicts but must never be written back
+DERIVED_PLAYER_KEYS = frozenset({'user_id', 'created_at', 'total_stats'})
+_player_columns = None
+
+def get_player_columns():
+    """Column names of the players table, loaded once per process."""
+    global _player_columns
+    if _player_columns is None:
+        def _load_columns(conn):
+            with conn.cursor() as c:
+                c.execute("SELECT column_name FROM information_schema.columns WHERE table_name = 'players'")
+                return frozenset(r[0] for r in c.fetchall())
         
-        values.append(user_id)
+        _player_columns = execute_with_retry(_load_columns) or None
+    return _player_columns
+
+def snapshot_player(player):
+    """Deep copy of a player dict, used as `original` for update_player."""
+    return copy.deepcopy(player)
+
+def build_player_update(updates, original=None, columns=None):
+    """
+    Build the SET clause for update_player.
+    Skips derived keys (whole player dicts carry them), warns about and
+    skips unknown keys and, when `original` is given, skips any field whose
+    value is unchanged. Returns (set_clause, values).
+    """
+    set_clauses = []
+    values = []
+    rejected = []
+    
+    for k, v in updates.items():
+        if k in DERIVED_PLAYER_KEYS:
+            continue
+        if columns and k not in columns:
+            rejected.append(k)
+            continue
+        if original is not None and k in original and original[k] == v:
+            continue
         
+        set_clauses.append(f"{k} = %s")
+        if isinstance(v, (dict, list)):
+            values.append(json.dumps(v))
+        else:
+            values.append(v)
+    
+    if rejected:
+        logger.warning(f"update_player skipped non-column keys: {rejected}")
+    
+    return ', '.join(set_clauses), values
+
+def update_player(user_id, updates, original=None):
+    """
+    Update player data.
+    Pass `original` (a snapshot_player copy taken before mutating) to send
+    only the fields that actually changed.
+    """
+    set_clause, values = build_player_update(updates, original, get_player_columns())
+    if not set_clause:
+        return True
+    
+    def _update_player(conn):
         with conn.cursor() as c:
-            c.execute(f"UPDATE players SET {', '.join(set_clauses)} WHERE user_id = %s", tuple(values))
+            # Leaderboards get the row as written, never the caller's dict:
+            # callers pass whole snapshots whose unchanged fields may be stale
+            c.execute(
+                f"UPDATE players SET {set_clause} WHERE user_id = %s RETURNING {LEADERBOARD_ROW_COLUMNS}",
+                (*values, user_id)
+            )
+            row = c.fetchone()
+            row = dict_factory(c, row) if row else None
         conn.commit()
         
         cache.clear_player_cache(user_id)
+        if row:
+            cache.leaderboard_record(user_id, row)
         return True
     
     result = execute_with_retry(_update_player)
@@ -463,9 +543,12 @@ def atomic_add_ryo(user_id, amount):
     """Atomically add/subtract Ryo"""
     def _atomic_add_ryo(conn):
         with conn.cursor() as c:
-            c.execute("UPDATE players SET ryo = ryo + %s WHERE user_id = %s", (amount, user_id))
+            c.execute("UPDATE players SET ryo = ryo + %s WHERE user_id = %s RETURNING ryo, village", (amount, user_id))
+            row = c.fetchone()
         conn.commit()
         cache.clear_player_cache(user_id)
+        if row:
+            cache.leaderboard_record(user_id, {'ryo': row[0], 'village': row[1]})
         return True
     
     result = execute_with_retry(_atomic_add_ryo)
@@ -475,10 +558,13 @@ def atomic_add_exp(user_id, amount):
     """Atomically add EXP"""
     def _atomic_add_exp(conn):
         with conn.cursor() as c:
-            c.execute("UPDATE players SET exp = exp + %s, total_exp = total_exp + %s WHERE user_id = %s", 
+            c.execute("UPDATE players SET exp = exp + %s, total_exp = total_exp + %s WHERE user_id = %s RETURNING total_exp, village", 
                      (amount, amount, user_id))
+            row = c.fetchone()
         conn.commit()
         cache.clear_player_cache(user_id)
+        if row:
+            cache.leaderboard_record(user_id, {'total_exp': row[0], 'village': row[1]})
         return True
     
     result = execute_with_retry(_atomic_add_exp)
@@ -559,6 +645,68 @@ def get_top_players_by_kills(limit=10):
     result = execute_with_retry(_get_top_kills)
     return result if result else []
 
+LEADERBOARD_ROW_COLUMNS = 'user_id, username, village, level, win_streak, ryo, total_exp, wins, kills, league_points'
+
+def get_leaderboard_rows(after_user_id=0, limit=5000):
+    """One page of leaderboard fields for every player, in user_id order (keyset paging)"""
+    def _get_rows(conn):
+        with conn.cursor() as c:
+            c.execute(f"""
+                SELECT {LEADERBOARD_ROW_COLUMNS} FROM players
+                WHERE user_id > %s ORDER BY user_id LIMIT %s
+            """, (after_user_id, limit))
+            return [dict_factory(c, r) for r in c.fetchall()]
+    
+    result = execute_with_retry(_get_rows)
+    return result if result else []
+
+def get_leaderboard_rows_for(user_ids):
+    """Leaderboard fields for specific players"""
+    if not user_ids:
+        return []
+    
+    def _get_rows(conn):
+        with conn.cursor() as c:
+            c.execute(f"SELECT {LEADERBOARD_ROW_COLUMNS} FROM players WHERE user_id = ANY(%s)", (list(user_ids),))
+            return [dict_factory(c, r) for r in c.fetchall()]
+    
+    result = execute_with_retry(_get_rows)
+    return result if result else []
+
+def get_rank_neighborhood(user_id, column, radius=5, village=None):
+    """
+    SQL fallback for leaderboard_service.neighborhood (full scan, used only
+    when Redis is unavailable). column must be one of cache.LEADERBOARD_COLUMNS.
+    """
+    if column not in cache.LEADERBOARD_COLUMNS:
+        raise ValueError(f"Not a leaderboard column: {column}")
+    
+    def _get_neighborhood(conn):
+        with conn.cursor() as c:
+            c.execute(f"""
+                WITH ranked AS (
+                    SELECT user_id, username, level, win_streak, {column},
+                           RANK() OVER (ORDER BY {column} DESC) AS rank,
+                           ROW_NUMBER() OVER (ORDER BY {column} DESC, user_id DESC) AS position,
+                           COUNT(*) OVER () AS total
+                    FROM players
+                    WHERE %(village)s IS NULL OR village = %(village)s
+                ), me AS (
+                    SELECT position FROM ranked WHERE user_id = %(user_id)s
+                )
+                SELECT ranked.* FROM ranked, me
+                WHERE ranked.position BETWEEN me.position - %(radius)s AND me.position + %(radius)s
+                ORDER BY ranked.position
+            """, {'village': village, 'user_id': user_id, 'radius': radius})
+            rows = [dict_factory(c, r) for r in c.fetchall()]
+            if not rows:
+                return None
+            me = next(r for r in rows if r['user_id'] == user_id)
+            return {'rank': me['rank'], 'total': me['total'], 'score': me[column], 'rows': rows}
+    
+    result = execute_with_retry(_get_neighborhood)
+    return result if result else None
+
 # 🎮 League Battle System Functions
 def get_top_players_by_league(limit=10):
     """Get top players by league points"""
@@ -576,18 +724,858 @@ def get_top_players_by_league(limit=10):
     result = execute_with_retry(_get_top_league)
     return result if result else []
 
-def reset_daily_battles():
-    """Reset battles_today for all players (called daily via cron/scheduler)"""
-    def _reset_battles(conn):
+# --- BATTLE ESCROW ---
+# Bets are debited into battle_escrow when a battle starts and paid out
+# from it when the battle ends, so ryo never round-trips through the
+# in-memory battle copy. Player rows are always locked in user_id order.
+
+def open_battle_escrow(battle_id, player1_id, player2_id, stake, payout):
+    """
+    Atomically debit both stakes and open an escrow row.
+    Returns (escrow_id, None) on success, (None, user_id) if that player
+    can't cover the stake, or (None, None) on database failure.
+    """
+    def _open_escrow(conn):
+        with conn.cursor() as c:
+            c.execute(
+                "SELECT user_id, ryo FROM players WHERE user_id IN (%s, %s) ORDER BY user_id FOR UPDATE",
+                (player1_id, player2_id)
+            )
+            balances = dict(c.fetchall())
+            
+            for user_id in (player1_id, player2_id):
+                if balances.get(user_id, 0) < stake:
+                    conn.rollback()
+                    return (None, user_id)
+            
+            c.execute(
+                "UPDATE players SET ryo = ryo - %s WHERE user_id IN (%s, %s) RETURNING user_id, ryo, village",
+                (stake, player1_id, player2_id)
+            )
+            new_balances = c.fetchall()
+            c.execute("""
+                INSERT INTO battle_escrow (battle_id, player1_id, player2_id, stake, payout)
+                VALUES (%s, %s, %s, %s, %s) RETURNING id
+            """, (battle_id, player1_id, player2_id, stake, payout))
+            escrow_id = c.fetchone()[0]
+        conn.commit()
+        
+        cache.clear_player_cache(player1_id)
+        cache.clear_player_cache(player2_id)
+        cache.leaderboard_record_many([(user_id, {'ryo': ryo, 'village': village}) for user_id, ryo, village in new_balances])
+        return (escrow_id, None)
+    
+    result = execute_with_retry(_open_escrow)
+    return result if result else (None, None)
+
+def settle_battle_escrow(escrow_id, winner_id):
+    """Pay an open escrow to the winner. Returns the payout (0 if already closed)."""
+    def _settle_escrow(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                UPDATE battle_escrow SET status = 'settled', winner_id = %s, settled_at = NOW()
+                WHERE id = %s AND status = 'open'
+                RETURNING payout
+            """, (winner_id, escrow_id))
+            row = c.fetchone()
+            if not row:
+                conn.rollback()
+                return 0
+            
+            c.execute("UPDATE players SET ryo = ryo + %s WHERE user_id = %s RETURNING ryo, village", (row[0], winner_id))
+            balance = c.fetchone()
+        conn.commit()
+        
+        cache.clear_player_cache(winner_id)
+        if balance:
+            cache.leaderboard_record(winner_id, {'ryo': balance[0], 'village': balance[1]})
+        return row[0]
+    
+    result = execute_with_retry(_settle_escrow)
+    return result if result else 0
+
+def refund_battle_escrow(escrow_id):
+    """Return both stakes of an open escrow (draws, aborted battles)."""
+    def _refund_escrow(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                UPDATE battle_escrow SET status = 'refunded', settled_at = NOW()
+                WHERE id = %s AND status = 'open'
+                RETURNING player1_id, player2_id, stake
+            """, (escrow_id,))
+            row = c.fetchone()
+            if not row:
+                conn.rollback()
+                return False
+            
+            player1_id, player2_id, stake = row
+            c.execute(
+                "UPDATE players SET ryo = ryo + %s WHERE user_id IN (%s, %s) RETURNING user_id, ryo, village",
+                (stake, player1_id, player2_id)
+            )
+            new_balances = c.fetchall()
+        conn.commit()
+        
+        cache.clear_player_cache(player1_id)
+        cache.clear_player_cache(player2_id)
+        cache.leaderboard_record_many([(user_id, {'ryo': ryo, 'village': village}) for user_id, ryo, village in new_balances])
+        return True
+    
+    result = execute_with_retry(_refund_escrow)
+    return result if result else False
+
+def sweep_orphaned_escrows(max_age_minutes=0, active_escrow_ids=()):
+    """
+    Refund every open escrow older than max_age_minutes that no live battle
+    owns (crash recovery). Returns the number of escrows refunded.
+    """
+    def _sweep_escrows(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                WITH refunded AS (
+                    UPDATE battle_escrow SET status = 'refunded', settled_at = NOW()
+                    WHERE status = 'open'
+                      AND created_at < NOW() - make_interval(mins => %s)
+                      AND NOT (id = ANY(%s))
+                    RETURNING player1_id, player2_id, stake
+                ), credits AS (
+                    SELECT player1_id AS user_id, stake FROM refunded
+                    UNION ALL
+                    SELECT player2_id AS user_id, stake FROM refunded
+                ), totals AS (
+                    SELECT user_id, SUM(stake) AS amount FROM credits GROUP BY user_id
+                ), credited AS (
+                    UPDATE players p SET ryo = p.ryo + t.amount
+                    FROM totals t WHERE p.user_id = t.user_id
+                    RETURNING p.user_id, p.ryo, p.village
+                )
+                SELECT (SELECT COUNT(*) FROM refunded), ARRAY(SELECT user_id FROM credited),
+                       ARRAY(SELECT ryo FROM credited), ARRAY(SELECT village FROM credited)
+            """, (max_age_minutes, list(active_escrow_ids)))
+            refunded_count, credited_ids, balances, villages = c.fetchone()
+        conn.commit()
+        
+        for user_id in credited_ids:
+            cache.clear_player_cache(user_id)
+        cache.leaderboard_record_many([
+            (user_id, {'ryo': ryo, 'village': village})
+            for user_id, ryo, village in zip(credited_ids, balances, villages)
+        ])
+        if refunded_count:
+            logger.warning(f"💰 Refunded {refunded_count} orphaned battle escrows")
+        return refunded_count
+    
+    result = execute_with_retry(_sweep_escrows)
+    return result if result else 0
+
+# --- LEAGUE SESSIONS ---
+# Inline league games live in league_sessions from the first click until
+# they are settled or expire. Opening a game charges the entry fee in the
+# same transaction, so a restart can never lose a paid-for game.
+
+def open_league_session(game_id, player_id, entry_fee, point_loss, daily_limit, state, ttl_seconds):
+    """
+    Charge the entry fee, count the battle and open the session in one transaction.
+    Returns 'opened', 'exists' (game_id already taken), 'refused' (fee or
+    daily limit no longer covered) or None on database failure.
+    """
+    today = gl.game_today()
+    
+    def _open_session(conn):
+        with conn.cursor() as c:
+            c.execute("SELECT 1 FROM league_sessions WHERE game_id = %s", (game_id,))
+            if c.fetchone():
+                conn.rollback()
+                return 'exists'
+            
+            c.execute("""
+                UPDATE players SET
+                    ryo = ryo - %s,
+                    battles_today = CASE WHEN battles_today_date = %s THEN battles_today + 1 ELSE 1 END,
+                    battles_today_date = %s,
+                    total_battles = total_battles + 1
+                WHERE user_id = %s AND ryo >= %s
+                  AND (battles_today_date IS DISTINCT FROM %s OR battles_today < %s)
+                RETURNING ryo, village
+            """, (entry_fee, today, today, player_id, entry_fee, today, daily_limit))
+            balance = c.fetchone()
+            if not balance:
+                conn.rollback()
+                return 'refused'
+            
+            c.execute("""
+                INSERT INTO league_sessions (game_id, player_id, entry_fee, point_loss, state, expires_at)
+                VALUES (%s, %s, %s, %s, %s, NOW() + make_interval(secs => %s))
+                ON CONFLICT (game_id) DO NOTHING
+            """, (game_id, player_id, entry_fee, point_loss, json.dumps(state), ttl_seconds))
+            if c.rowcount == 0:
+                conn.rollback()
+                return 'exists'
+        conn.commit()
+        
+        cache.clear_player_cache(player_id)
+        cache.leaderboard_record(player_id, {'ryo': balance[0], 'village': balance[1]})
+        return 'opened'
+    
+    return execute_with_retry(_open_session)
+
+def get_league_session(game_id):
+    """(state, seconds until expiry) of an open, unexpired session, or None."""
+    def _get_session(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT state, EXTRACT(EPOCH FROM expires_at - NOW())::float FROM league_sessions
+                WHERE game_id = %s AND status = 'open' AND expires_at > NOW()
+            """, (game_id,))
+            row = c.fetchone()
+            return (row[0], row[1]) if row else None
+    
+    return execute_with_retry(_get_session)
+
+def save_league_session(game_id, state, ttl_seconds):
+    """Persist a session's state and push its expiry back. False if it is no longer open."""
+    def _save_session(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                UPDATE league_sessions SET state = %s, expires_at = NOW() + make_interval(secs => %s)
+                WHERE game_id = %s AND status = 'open'
+            """, (json.dumps(state), ttl_seconds, game_id))
+            saved = c.rowcount > 0
+        conn.commit()
+        return saved
+    
+    result = execute_with_retry(_save_session)
+    return result if result else False
+
+def _mission_progress_sql(missions, params):
+    """
+    SQL expression for the new daily_missions_data. A freshly rolled set is
+    written whole; otherwise only the touched paths change (progress.<id> + 1,
+    completed || new ids), relative to the value in the row being updated.
+    """
+    if missions is None:
+        return "daily_missions_data"
+    if missions['fresh'] is not None:
+        params['missions_fresh'] = json.dumps(missions['fresh'])
+        params['missions_reset'] = missions['fresh']['reset_time']
+        return "%(missions_fresh)s::jsonb"
+    
+    expr = "daily_missions_data"
+    for i, mission_id in enumerate(missions['progress']):
+        params[f'mission_{i}'] = mission_id
+        expr = (
+            f"jsonb_set({expr}, ARRAY['progress', %(mission_{i})s], "
+            f"to_jsonb(COALESCE((daily_missions_data #>> ARRAY['progress', %(mission_{i})s])::int, 0) + 1))"
+        )
+    if missions['completed']:
+        params['missions_completed'] = json.dumps([m['id'] for m in missions['completed']])
+        expr = (
+            f"jsonb_set({expr}, '{{completed}}', "
+            f"COALESCE(daily_missions_data -> 'completed', '[]'::jsonb) || %(missions_completed)s::jsonb)"
+        )
+    return expr
+
+def settle_league_battle(game_id, user_id, settlement):
+    """
+    Close a league session and apply its result in one transaction:
+    ryo/exp, league points (floored at 0), win streak, bonus items and
+    daily-mission progress (see league_system.build_settlement).
+    settlement['missions'] plans the mission progress from the player row,
+    which is read FOR UPDATE here so concurrent games plan one after the
+    other; completed missions add their rewards to this write.
+    Returns the player's new values plus 'completed_missions', or None if
+    the session was already closed (double click, expiry) or the write failed.
+    """
+    base_params = {
+        'game_id': game_id,
+        'user_id': user_id,
+        'status': 'settled' if settlement['won'] else settlement.get('status', 'lost'),
+        'won': settlement['won'],
+        'ryo': settlement['ryo'],
+        'exp': settlement['exp'],
+        'points': settlement['points'],
+        'items': json.dumps(settlement['bonus_items']),
+        'missions_reset': None
+    }
+    
+    def _settle(conn):
+        params = dict(base_params)
+        with conn.cursor() as c:
+            c.execute("""
+                UPDATE league_sessions SET status = %(status)s, closed_at = NOW()
+                WHERE game_id = %(game_id)s AND player_id = %(user_id)s AND status = 'open'
+            """, params)
+            if c.rowcount == 0:
+                conn.rollback()
+                return None
+            
+            missions = None
+            completed = []
+            if settlement['missions'] is not None:
+                c.execute("""
+                    SELECT daily_missions_data, daily_missions_reset, win_streak
+                    FROM players WHERE user_id = %s FOR UPDATE
+                """, (user_id,))
+                player = c.fetchone()
+                if not player:
+                    conn.rollback()
+                    return None
+                missions = settlement['missions'](dict_factory(c, player))
+                completed = missions['completed']
+                params['ryo'] += sum(m['reward_ryo'] for m in completed)
+                params['exp'] += sum(m['reward_exp'] for m in completed)
+            missions_sql = _mission_progress_sql(missions, params)
+            
+            c.execute(f"""
+                UPDATE players SET
+                    ryo = ryo + %(ryo)s,
+                    exp = exp + %(exp)s,
+                    total_exp = total_exp + %(exp)s,
+                    league_points = GREATEST(0, league_points + %(points)s),
+                    win_streak = CASE WHEN %(won)s THEN win_streak + 1 ELSE 0 END,
+                    inventory = COALESCE(inventory, '[]'::jsonb) || %(items)s::jsonb,
+                    daily_missions_data = {missions_sql},
+                    daily_missions_reset = COALESCE(%(missions_reset)s::timestamptz AT TIME ZONE 'UTC', daily_missions_reset)
+                WHERE user_id = %(user_id)s
+                RETURNING ryo, exp, total_exp, league_points, win_streak, username, level, village
+            """, params)
+            row = c.fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            result = dict(zip([col[0] for col in c.description], row))
+        conn.commit()
+        
+        cache.clear_player_cache(user_id)
+        cache.leaderboard_record(user_id, result)
+        result['completed_missions'] = completed
+        return result
+    
+    return execute_with_retry(_settle)
+
+def expire_league_sessions(retention_hours=24):
+    """
+    Close every open session past its expiry, in one statement:
+    games that never got a move refund their entry fee and no longer
+    count as a battle (today's count and total_battles), games abandoned
+    mid-fight count as a loss (league points and win streak), the same as
+    surrendering. Old closed rows are pruned.
+    Returns [(game_id, inline_message_id, refunded)] for the expired games.
+    """
+    today = gl.game_today()
+    
+    def _expire_sessions(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                WITH expired AS (
+                    UPDATE league_sessions SET status = 'expired', closed_at = NOW()
+                    WHERE status = 'open' AND expires_at <= NOW()
+                    RETURNING game_id, player_id, entry_fee, point_loss,
+                              state->>'inline_message_id' AS inline_message_id,
+                              (state->>'turn')::int <= 1 AS refunded
+                ), totals AS (
+                    SELECT player_id,
+                           SUM(CASE WHEN refunded THEN entry_fee ELSE 0 END) AS refund,
+                           COUNT(*) FILTER (WHERE refunded) AS refunded_games,
+                           SUM(CASE WHEN refunded THEN 0 ELSE point_loss END) AS point_loss,
+                           BOOL_OR(NOT refunded) AS lost
+                    FROM expired GROUP BY player_id
+                ), applied AS (
+                    UPDATE players p SET
+                        ryo = p.ryo + t.refund,
+                        battles_today = CASE WHEN p.battles_today_date = %(today)s
+                                             THEN GREATEST(0, p.battles_today - t.refunded_games)
+                                             ELSE p.battles_today END,
+                        total_battles = GREATEST(0, p.total_battles - t.refunded_games),
+                        league_points = GREATEST(0, p.league_points - t.point_loss),
+                        win_streak = CASE WHEN t.lost THEN 0 ELSE p.win_streak END
+                    FROM totals t WHERE p.user_id = t.player_id
+                    RETURNING p.user_id, p.ryo, p.league_points, p.win_streak, p.village
+                )
+                SELECT (SELECT COALESCE(json_agg(json_build_array(game_id, inline_message_id, refunded)), '[]') FROM expired),
+                       (SELECT COALESCE(json_agg(json_build_array(user_id, ryo, league_points, win_streak, village)), '[]') FROM applied)
+            """, {'today': today})
+            expired, applied = c.fetchone()
+            c.execute("""
+                DELETE FROM league_sessions
+                WHERE status <> 'open' AND closed_at < NOW() - make_interval(hours => %s)
+            """, (retention_hours,))
+        conn.commit()
+        
+        for user_id, *_ in applied:
+            cache.clear_player_cache(user_id)
+        cache.leaderboard_record_many([
+            (user_id, {'ryo': ryo, 'league_points': points, 'win_streak': streak, 'village': village})
+            for user_id, ryo, points, streak, village in applied
+        ])
+        if expired:
+            logger.info(f"⌛ Expired {len(expired)} league sessions")
+        return [tuple(row) for row in expired]
+    
+    result = execute_with_retry(_expire_sessions)
+    return result if result else []
+
+# --- WEEKLY LEAGUE REWARDS ---
+def start_weekly_league_run(week_start, min_user_id=0, max_user_id=None):
+    """
+    The league_weekly_runs row of a week, created on its first run: the
+    user_id range to scan is fixed then (up to max_user_id, or the highest
+    user_id at that moment), so resuming never reaches players who joined
+    afterwards. Returns {'last_user_id', 'max_user_id', 'finished'} or None.
+    """
+    def _start_run(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                INSERT INTO league_weekly_runs (week_start, max_user_id, last_user_id)
+                SELECT %s, COALESCE(%s, (SELECT MAX(user_id) FROM players), 0), %s
+                ON CONFLICT (week_start) DO NOTHING
+            """, (week_start, max_user_id, min_user_id))
+            c.execute("""
+                SELECT last_user_id, max_user_id, finished_at IS NOT NULL AS finished
+                FROM league_weekly_runs WHERE week_start = %s
+            """, (week_start,))
+            row = dict_factory(c, c.fetchone())
+        conn.commit()
+        return row
+    
+    return execute_with_retry(_start_run)
+
+def finish_weekly_league_run(week_start):
+    """Mark a week as fully paid; later runs for it do nothing."""
+    def _finish_run(conn):
         with conn.cursor() as c:
-            c.execute("UPDATE players SET battles_today = 0")
+            c.execute("""
+                UPDATE league_weekly_runs SET finished_at = NOW()
+                WHERE week_start = %s AND finished_at IS NULL
+            """, (week_start,))
         conn.commit()
-        logger.info("✅ Daily battles reset completed")
         return True
     
-    result = execute_with_retry(_reset_battles)
+    result = execute_with_retry(_finish_run)
     return result if result else False
 
+def settle_weekly_league_chunk(week_start, tiers, item_key, after_user_id, limit, max_user_id=None):
+    """
+    Pay one chunk of weekly league rewards: the next `limit` ranked players
+    (league_points > 0) after after_user_id, in one transaction.
+    tiers: (tier_key, min_points, ryo, exp, items) rows; each player gets the
+    tier with the highest min_points <= their points. The ledger insert is
+    what pays: players already in league_weekly_settlements for week_start
+    are skipped, so reruns are safe. The week's league_weekly_runs cursor
+    moves past the chunk in the same transaction.
+    Returns (last user_id scanned or None when done, players paid).
+    """
+    tier_keys, min_points, ryo, exp, items = (list(col) for col in zip(*tiers))
+    
+    def _settle_chunk(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                WITH batch AS (
+                    SELECT user_id, league_points FROM players
+                    WHERE user_id > %(after)s AND league_points > 0
+                      AND (%(max_user_id)s::bigint IS NULL OR user_id <= %(max_user_id)s)
+                    ORDER BY user_id LIMIT %(limit)s
+                    FOR UPDATE
+                ), rewards AS (
+                    SELECT b.user_id, t.tier_key, t.ryo, t.exp, t.items
+                    FROM batch b CROSS JOIN LATERAL (
+                        SELECT * FROM unnest(%(tier_keys)s::text[], %(min_points)s::int[], %(ryo)s::int[],
+                                             %(exp)s::int[], %(items)s::int[]) AS t(tier_key, min_points, ryo, exp, items)
+                        WHERE t.min_points <= b.league_points
+                        ORDER BY t.min_points DESC LIMIT 1
+                    ) t
+                ), ledger AS (
+                    INSERT INTO league_weekly_settlements (week_start, user_id, tier_key, ryo, exp, items)
+                    SELECT %(week_start)s, user_id, tier_key, ryo, exp, items FROM rewards
+                    ON CONFLICT (week_start, user_id) DO NOTHING
+                    RETURNING user_id, ryo, exp, items
+                ), paid AS (
+                    UPDATE players p SET
+                        ryo = p.ryo + l.ryo,
+                        exp = p.exp + l.exp,
+                        total_exp = p.total_exp + l.exp,
+                        inventory = COALESCE(p.inventory, '[]'::jsonb) || (
+                            SELECT COALESCE(jsonb_agg(%(item_key)s::text), '[]'::jsonb) FROM generate_series(1, l.items)
+                        )
+                    FROM ledger l WHERE p.user_id = l.user_id
+                    RETURNING p.user_id, p.ryo, p.total_exp, p.village
+                ), progress AS (
+                    UPDATE league_weekly_runs
+                    SET last_user_id = GREATEST(last_user_id, (SELECT MAX(user_id) FROM batch))
+                    WHERE week_start = %(week_start)s AND EXISTS (SELECT 1 FROM batch)
+                )
+                SELECT (SELECT MAX(user_id) FROM batch),
+                       ARRAY(SELECT user_id FROM paid), ARRAY(SELECT ryo FROM paid),
+                       ARRAY(SELECT total_exp FROM paid), ARRAY(SELECT village FROM paid)
+            """, {
+                'week_start': week_start, 'after': after_user_id, 'limit': limit, 'max_user_id': max_user_id,
+                'tier_keys': tier_keys, 'min_points': min_points, 'ryo': ryo, 'exp': exp, 'items': items,
+                'item_key': item_key
+            })
+            last_user_id, paid_ids, balances, total_exps, villages = c.fetchone()
+        conn.commit()
+        
+        cache.clear_player_cache_many(paid_ids)
+        cache.leaderboard_record_many([
+            (user_id, {'ryo': ryo, 'total_exp': total_exp, 'village': village})
+            for user_id, ryo, total_exp, village in zip(paid_ids, balances, total_exps, villages)
+        ])
+        return (last_user_id, len(paid_ids))
+    
+    return execute_with_retry(_settle_chunk)
+
+def get_weekly_league_settlement(week_start):
+    """(players paid, total ryo) recorded in the ledger for a week."""
+    def _get_settlement(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT COUNT(*), COALESCE(SUM(ryo), 0) FROM league_weekly_settlements WHERE week_start = %s
+            """, (week_start,))
+            return c.fetchone()
+    
+    result = execute_with_retry(_get_settlement)
+    return result if result else (0, 0)
+
+# --- WORLD BOSS DAMAGE ---
+def get_boss_damage_totals(chat_id):
+    """All (user_id, username, total_damage) rows for a chat's boss"""
+    def _get_totals(conn):
+        with conn.cursor() as c:
+            c.execute("SELECT user_id, username, total_damage FROM world_boss_damage WHERE chat_id = %s", (chat_id,))
+            return c.fetchall()
+    
+    result = execute_with_retry(_get_totals)
+    return result if result else []
+
+def flush_boss_damage(chat_id, current_hp, rows):
+    """
+    Persist a batch of boss hits in one transaction.
+    rows: (chat_id, user_id, username, damage_delta) tuples
+    """
+    def _flush_damage(conn):
+        with conn.cursor() as c:
+            c.execute(
+                "UPDATE world_boss_status SET current_hp = %s WHERE chat_id = %s AND is_active = 1",
+                (current_hp, chat_id)
+            )
+            if rows:
+                execute_values(c, """
+                    INSERT INTO world_boss_damage (chat_id, user_id, username, total_damage) VALUES %s
+                    ON CONFLICT (chat_id, user_id) DO UPDATE
+                    SET total_damage = world_boss_damage.total_damage + EXCLUDED.total_damage,
+                        username = EXCLUDED.username
+                """, rows)
+        conn.commit()
+        return True
+    
+    result = execute_with_retry(_flush_damage)
+    return result if result else False
+
+def get_boss_statuses(chat_ids):
+    """world_boss_status rows for many chats: {chat_id: row}"""
+    def _get_statuses(conn):
+        with conn.cursor() as c:
+            c.execute("SELECT * FROM world_boss_status WHERE chat_id = ANY(%s)", (list(chat_ids),))
+            return {row['chat_id']: row for row in (dict_factory(c, r) for r in c.fetchall())}
+    
+    result = execute_with_retry(_get_statuses)
+    return result if result else {}
+
+def spawn_bosses(rows):
+    """
+    Spawn bosses in many chats with one upsert.
+    rows: (chat_id, boss_key, hp, ryo_pool, spawn_time) tuples.
+    Chats whose boss became active meanwhile are left alone.
+    Returns the set of chat_ids that got a new boss.
+    """
+    def _spawn(conn):
+        with conn.cursor() as c:
+            spawned = execute_values(c, """
+                INSERT INTO world_boss_status (chat_id, is_active, boss_key, current_hp, max_hp, ryo_pool, spawn_time)
+                SELECT chat_id, 1, boss_key, hp, hp, ryo_pool, spawn_time
+                FROM (VALUES %s) AS v(chat_id, boss_key, hp, ryo_pool, spawn_time)
+                ON CONFLICT (chat_id) DO UPDATE SET
+                    is_active = 1,
+                    boss_key = EXCLUDED.boss_key,
+                    current_hp = EXCLUDED.current_hp,
+                    max_hp = EXCLUDED.max_hp,
+                    ryo_pool = EXCLUDED.ryo_pool,
+                    spawn_time = EXCLUDED.spawn_time
+                WHERE world_boss_status.is_active = 0
+                RETURNING chat_id
+            """, rows, fetch=True)
+            spawned_ids = [r[0] for r in spawned]
+            c.execute("DELETE FROM world_boss_damage WHERE chat_id = ANY(%s)", (spawned_ids,))
+        conn.commit()
+        return set(spawned_ids)
+    
+    result = execute_with_retry(_spawn)
+    return result if result else set()
+
+def get_boss_sim_profiles(limit=500):
+    """Random sample of real player builds for boss_sim.py"""
+    def _get_profiles(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT level, strength, speed, intelligence, stamina, equipment, known_jutsus
+                FROM players
+                ORDER BY random()
+                LIMIT %s
+            """, (limit,))
+            return [dict_factory(c, r) for r in c.fetchall()]
+    
+    result = execute_with_retry(_get_profiles)
+    return result if result else []
+
+def payout_boss_rewards(chat_id, rewards):
+    """
+    Pay every boss participant and close the fight in one transaction.
+    rewards: {user_id: ryo}. Also clears boss_attack_cooldown for them.
+    """
+    user_ids = list(rewards.keys())
+    amounts = [rewards[user_id] for user_id in user_ids]
+    
+    def _payout(conn):
+        with conn.cursor() as c:
+            if user_ids:
+                c.execute("""
+                    UPDATE players p
+                    SET ryo = p.ryo + r.amount, boss_attack_cooldown = NULL
+                    FROM unnest(%s::bigint[], %s::integer[]) AS r(user_id, amount)
+                    WHERE p.user_id = r.user_id
+                    RETURNING p.user_id, p.ryo, p.village
+                """, (user_ids, amounts))
+                new_balances = c.fetchall()
+            else:
+                new_balances = []
+            c.execute("UPDATE world_boss_status SET is_active = 0, current_hp = 0 WHERE chat_id = %s", (chat_id,))
+            c.execute("DELETE FROM world_boss_damage WHERE chat_id = %s", (chat_id,))
+        conn.commit()
+        
+        cache.clear_player_cache_many(user_ids)
+        cache.leaderboard_record_many([(user_id, {'ryo': ryo, 'village': village}) for user_id, ryo, village in new_balances])
+        return True
+    
+    result = execute_with_retry(_payout)
+    return result if result else False
+
+# --- AKATSUKI FIGHTS ---
+# A fight row plus its (up to 3) participants is loaded in one query,
+# mutated in memory by akatsuki_engine and written back in one transaction.
+# `version` is bumped on every save; a save against an older version is
+# rejected, so a stale click can never overwrite newer fight state.
+
+AKATSUKI_FIGHT_COLUMNS = (
+    'message_id', 'chat_id', 'enemy_name', 'enemy_hp',
+    'player_1_id', 'player_2_id', 'player_3_id',
+    'turn_player_id', 'version', 'created_at'
+)
+
+def load_akatsuki_fight(chat_id, message_id):
+    """
+    Fight row and participant player rows in one query.
+    Returns (fight, {user_id: player}) or (None, {}).
+    """
+    fight_select = ', '.join(f"f.{col}" for col in AKATSUKI_FIGHT_COLUMNS)
+    split = len(AKATSUKI_FIGHT_COLUMNS)
+    
+    def _load_fight(conn):
+        with conn.cursor() as c:
+            c.execute(f"""
+                SELECT {fight_select}, p.*
+                FROM akatsuki_fights f
+                LEFT JOIN players p ON p.user_id IN (f.player_1_id, f.player_2_id, f.player_3_id)
+                WHERE f.chat_id = %s AND f.message_id = %s
+            """, (chat_id, message_id))
+            rows = c.fetchall()
+            if not rows:
+                return (None, {})
+            
+            player_fields = [col[0] for col in c.description[split:]]
+            fight = dict(zip(AKATSUKI_FIGHT_COLUMNS, rows[0][:split]))
+            players = {}
+            for row in rows:
+                player = dict(zip(player_fields, row[split:]))
+                if player.get('user_id') is not None:
+                    player.setdefault('akatsuki_cooldown', {})
+                    players[player['user_id']] = player
+            return (fight, players)
+    
+    result = execute_with_retry(_load_fight)
+    return result if result else (None, {})
+
+def save_akatsuki_fight(fight, player_updates=(), finished=False):
+    """
+    Write a fight and its players' changes in one transaction.
+    player_updates: (user_id, updates, original) tuples - only changed
+    fields are sent. `finished` deletes the fight row instead of updating it.
+    Returns True, or False if the fight changed since it was loaded (stale).
+    """
+    columns = get_player_columns()
+    player_sets = []
+    for user_id, updates, original in player_updates:
+        set_clause, values = build_player_update(updates, original, columns)
+        if set_clause:
+            player_sets.append((user_id, set_clause, values))
+    
+    def _save_fight(conn):
+        written = []
+        with conn.cursor() as c:
+            if finished:
+                c.execute(
+                    "DELETE FROM akatsuki_fights WHERE message_id = %s AND version = %s",
+                    (fight['message_id'], fight['version'])
+                )
+            else:
+                c.execute("""
+                    UPDATE akatsuki_fights
+                    SET enemy_hp = %s, player_1_id = %s, player_2_id = %s, player_3_id = %s,
+                        turn_player_id = %s, version = version + 1
+                    WHERE message_id = %s AND version = %s
+                """, (
+                    fight['enemy_hp'], fight['player_1_id'], fight['player_2_id'], fight['player_3_id'],
+                    fight['turn_player_id'], fight['message_id'], fight['version']
+                ))
+            if c.rowcount == 0:
+                conn.rollback()
+                return 'stale'
+            
+            # Leaderboards get the rows as written (see update_player)
+            for user_id, set_clause, values in player_sets:
+                c.execute(
+                    f"UPDATE players SET {set_clause} WHERE user_id = %s RETURNING {LEADERBOARD_ROW_COLUMNS}",
+                    (*values, user_id)
+                )
+                row = c.fetchone()
+                if row:
+                    written.append((user_id, dict_factory(c, row)))
+        conn.commit()
+        
+        cache.clear_player_cache_many([user_id for user_id, _, _ in player_sets])
+        cache.leaderboard_record_many(written)
+        return True
+    
+    result = execute_with_retry(_save_fight)
+    if result is True:
+        fight['version'] += 1
+        return True
+    return False
+
+def create_akatsuki_fights(rows):
+    """
+    Open fights in many chats with one INSERT.
+    rows: (message_id, chat_id, enemy_name, enemy_hp) tuples.
+    """
+    def _create_fights(conn):
+        with conn.cursor() as c:
+            execute_values(c, """
+                INSERT INTO akatsuki_fights (message_id, chat_id, enemy_name, enemy_hp)
+                VALUES %s
+                ON CONFLICT (chat_id) DO UPDATE SET
+                    message_id = EXCLUDED.message_id,
+                    enemy_name = EXCLUDED.enemy_name,
+                    enemy_hp = EXCLUDED.enemy_hp,
+                    player_1_id = NULL, player_2_id = NULL, player_3_id = NULL,
+                    turn_player_id = NULL,
+                    version = akatsuki_fights.version + 1,
+                    created_at = CURRENT_TIMESTAMP
+            """, rows)
+        conn.commit()
+        return True
+    
+    result = execute_with_retry(_create_fights)
+    return result if result else False
+
+def expire_akatsuki_fights(max_age_minutes):
+    """Delete every fight older than max_age_minutes. Returns the affected chat_ids."""
+    def _expire_fights(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                DELETE FROM akatsuki_fights
+                WHERE created_at < CURRENT_TIMESTAMP - make_interval(mins => %s)
+                RETURNING chat_id
+            """, (max_age_minutes,))
+            chat_ids = [r[0] for r in c.fetchall()]
+        conn.commit()
+        return chat_ids
+    
+    result = execute_with_retry(_expire_fights)
+    return result if result else []
+
+def get_akatsuki_spawn_targets():
+    """Chats (boss-enabled or event-registered) with auto events on and no running fight."""
+    def _get_targets(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                SELECT known.chat_id FROM (
+                    SELECT chat_id FROM world_boss_enabled_chats
+                    UNION
+                    SELECT chat_id FROM group_event_settings
+                ) AS known
+                LEFT JOIN group_event_settings s ON s.chat_id = known.chat_id
+                WHERE COALESCE(s.auto_events, 1) = 1
+                  AND NOT EXISTS (SELECT 1 FROM akatsuki_fights f WHERE f.chat_id = known.chat_id)
+            """)
+            return [r[0] for r in c.fetchall()]
+    
+    result = execute_with_retry(_get_targets)
+    return result if result else []
+
+def set_auto_events_many(chat_ids, status):
+    """Enable (1) / disable (0) Akatsuki ambushes for many chats in one upsert."""
+    def _set_auto_events(conn):
+        with conn.cursor() as c:
+            c.execute("""
+                INSERT INTO group_event_settings (chat_id, auto_events)
+                SELECT chat_id, %s FROM unnest(%s::bigint[]) AS chat_id
+                ON CONFLICT (chat_id) DO UPDATE SET auto_events = EXCLUDED.auto_events
+            """, (status, list(chat_ids)))
+        conn.commit()
+        return True
+    
+    result = execute_with_retry(_set_auto_events)
+    return result if result else False
+
+def toggle_auto_events(chat_id, status):
+    return set_auto_events_many([chat_id], status)
+
+def clear_akatsuki_fight(chat_id):
+    """Drop a chat's fight unconditionally (message gone, timeout, etc.)."""
+    def _clear_fight(conn):
+        with conn.cursor() as c:
+            c.execute("DELETE FROM akatsuki_fights WHERE chat_id = %s", (chat_id,))
+        conn.commit()
+        return True
+    
+    result = execute_with_retry(_clear_fight)
+    return result if result else False
+
+# --- BATTLE HISTORY ---
+def insert_battle_history_batch(rows):
+    """Insert many finished battles in one round trip.
+    rows: (player1_id, player2_id, winner_id, battle_log, duration_seconds) tuples"""
+    def _insert_batch(conn):
+        with conn.cursor() as c:
+            execute_values(c, """
+                INSERT INTO battle_history (player1_id, player2_id, winner_id, battle_log, duration_seconds)
+                VALUES %s
+            """, rows)
+        conn.commit()
+        return True
+    
+    result = execute_with_retry(_insert_batch)
+    return result if result else False
+
+def get_battle_history(battle_id):
+    """Get a single battle_history row"""
+    def _get_battle(conn):
+        with conn.cursor() as c:
+            c.execute("SELECT * FROM battle_history WHERE id = %s", (battle_id,))
+            row = c.fetchone()
+            return dict_factory(c, row) if row else None
+    
+    return execute_with_retry(_get_battle)
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     logger.info("Initializing database...")
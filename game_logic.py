@@ -273,3 +273,38 @@ def get_hospital_status(player_data):
         return True, remaining_seconds
     
     return False, 0
+
+# --- Daily Counters ---
+# Stored as (count, day) and never reset in bulk: a count whose day isn't
+# today reads as 0, and the next bump starts the new day at 1.
+DAILY_COUNTERS = {
+    'battles_today': 'battles_today_date',
+    'daily_train_count': 'last_train_reset_date',
+    'daily_mission_count': 'last_mission_reset_date'
+}
+
+def game_today():
+    """The current game day (days roll over at midnight UTC)."""
+    return datetime.datetime.now(timezone.utc).date()
+
+def get_daily_count(player_data, counter):
+    """Today's value of a daily counter (0 if it was last bumped on an earlier day)."""
+    day = player_data.get(DAILY_COUNTERS[counter])
+    if isinstance(day, str):
+        try:
+            day = datetime.date.fromisoformat(day[:10])
+        except ValueError:
+            return 0
+    elif isinstance(day, datetime.datetime):
+        day = day.date()
+    
+    if day != game_today():
+        return 0
+    return player_data.get(counter) or 0
+
+def bump_daily_count(player_data, counter, amount=1):
+    """Add to a daily counter in place (starting over on a new day). Returns the new count."""
+    count = get_daily_count(player_data, counter) + amount
+    player_data[counter] = count
+    player_data[DAILY_COUNTERS[counter]] = game_today()
+    return count
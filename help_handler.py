@@ -3,6 +3,7 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMe
 from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 import game_logic as gl 
+import media_cache
 from html import escape
 
 logger = logging.getLogger(__name__)
@@ -41,8 +42,8 @@ async def show_main_help_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
         
     # Always send a fresh photo message for the main menu
     try:
-        await context.bot.send_photo(
-            chat_id=chat_id, photo=HELP_IMAGE_URL, caption=help_caption,
+        await media_cache.send_photo(
+            context.bot, chat_id, HELP_IMAGE_URL, caption=help_caption,
             reply_markup=reply_markup, parse_mode="HTML"
         )
     except Exception as e:
@@ -113,7 +114,8 @@ async def show_module_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
         help_text += "  •  The winner gains EXP and Ryo!\n"
         help_text += "  •  <b>Taijutsu</b>: A basic attack based on your Strength.\n"
         help_text += "  •  <b>Use Jutsu</b>: Use your learned jutsus. This costs Chakra.\n"
-        help_text += "  •  <b>Use Item</b>: Use a consumable item from your inventory, like a Health Potion."
+        help_text += "  •  <b>Use Item</b>: Use a consumable item from your inventory, like a Health Potion.\n"
+        help_text += "  •  <b>Spectate</b>: Reply to a fighter with <code>/watch</code> to follow their battle live."
 
     elif module == "shop":
         help_text += "<b>--- 🛒 Shop Help 🛒 ---</b>\n\n"
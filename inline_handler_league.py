@@ -1,10 +1,17 @@
 """
 Enhanced Inline Handler with Battle League System (Part 1)
 Handles inline queries - showing battles, profile, missions
+
+Inline mode fires on every keystroke, so answers are served from a
+per-player result cache and a shared league top-5 fragment, and bursts
+are debounced (see INLINE RESULT CACHE).
 """
+import asyncio
 import logging
+import time
 import uuid
 import datetime
+from collections import OrderedDict, deque
 from datetime import timezone
 from html import escape
 from telegram import Update, InlineQueryResultArticle, InputTextMessageContent, InlineKeyboardMarkup, InlineKeyboardButton
@@ -12,13 +19,13 @@ from telegram.ext import ContextTypes
 
 import database as db
 import game_logic as gl
+import leaderboard_service as lbs
 import league_system as ls
 import battle_enemies as be
 
 logger = logging.getLogger(__name__)
 
-# 🎮 GAME STATE STORAGE (in-memory for active games)
-ACTIVE_GAMES = {}
+# 🎮 Live games are kept by league_sessions (persisted, with a TTL)
 
 # Player Jutsu Options
 PLAYER_JUTSUS = {
@@ -76,10 +83,19 @@ def get_wallet_text(player):
     )
 
 
-def get_top_league_text():
-    """Get top players by league points."""
+# ═══════════════════════════════════════
+# SHARED LEAGUE TOP-5 FRAGMENT
+# ═══════════════════════════════════════
+# Same for every player, so it is rendered once per refresh instead of
+# running the leaderboard query on every inline keystroke.
+
+LEAGUE_TOP_REFRESH_SECONDS = 60
+TOP_LEAGUE = {'text': None, 'article': None}
+
+
+def render_top_league_text(top_players):
+    """Render the top players list (rows from leaderboard_service.top)."""
     text = "🏆 <b>Top 5 League Champions</b> 🏆\n\n"
-    top_players = db.get_top_players_by_league(limit=5)
     
     if not top_players:
         text += "No league battles yet...\n"
@@ -95,6 +111,29 @@ def get_top_league_text():
     return text
 
 
+def refresh_top_league():
+    """Re-query the top 5 and rebuild the shared article."""
+    text = render_top_league_text(lbs.top('league', limit=5))
+    TOP_LEAGUE['text'] = text
+    TOP_LEAGUE['article'] = InlineQueryResultArticle(
+        id="league_top",
+        title="🏆 League Champions",
+        description="View top 5 league leaders",
+        input_message_content=InputTextMessageContent(text, parse_mode="HTML")
+    )
+    return text
+
+
+def get_top_league_text():
+    """Get top players by league points (shared fragment, refreshed by a job)."""
+    return TOP_LEAGUE['text'] or refresh_top_league()
+
+
+async def league_top_refresh_job(context: ContextTypes.DEFAULT_TYPE):
+    """Repeating job: refresh the shared league top-5 fragment."""
+    await asyncio.to_thread(refresh_top_league)
+
+
 def get_daily_missions_text(player):
     """Get daily missions display."""
     missions_data = ls.get_daily_missions(player)
@@ -137,163 +176,296 @@ def get_daily_missions_text(player):
     return text
 
 
-async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Enhanced inline query handler with league system."""
-    query = update.inline_query
-    if not query:
-        return
+# ═══════════════════════════════════════
+# INLINE RESULT CACHE
+# ═══════════════════════════════════════
+# Rendered results are keyed by (user_id, player-state version): any change
+# to a field shown in the articles gives a new version, so a hit is never
+# stale. Battle articles are cached as specs and get a fresh game id on
+# every answer, so two posted battles never share one.
 
-    user_id = query.from_user.id
-    player = db.get_player(user_id)
-    results = []
+INLINE_CACHE_TTL_SECONDS = 60  # bounds time-based text (hospital timers, mission reset hours)
+INLINE_CACHE_SIZE = 5000
+INLINE_DEBOUNCE_SECONDS = 0.3  # queries this close together are a burst: only the newest is answered
 
-    if player:
-        is_hosp, _ = gl.get_hospital_status(player)
-        league_display = ls.get_league_display(player)
-        tier_key = league_display['tier_key']
-        tier_data = ls.LEAGUE_TIERS[tier_key]
-        
-        # --- 1. Show Profile/Wallet ---
-        wallet_text = get_wallet_text(player)
-        results.append(
-            InlineQueryResultArticle(
-                id="wallet",
-                title=f"{league_display['emoji']} My Ninja Profile",
-                description=f"{league_display['tier_name']} League | {league_display['points']} pts | Streak: {player.get('win_streak', 0)}",
-                input_message_content=InputTextMessageContent(wallet_text, parse_mode="HTML")
-            )
-        )
-        
-        # --- 2. League Leaderboard ---
-        results.append(
-            InlineQueryResultArticle(
-                id="league_top",
-                title="🏆 League Champions",
-                description="View top 5 league leaders",
-                input_message_content=InputTextMessageContent(get_top_league_text(), parse_mode="HTML")
-            )
+INLINE_CACHE = OrderedDict()  # (user_id, version) -> (expires_at, items)
+LATENCY_SAMPLES_MS = deque(maxlen=2000)
+INLINE_STATS = {
+    'queries': 0,
+    'debounced': 0,
+    'hits': 0,
+    'misses': 0
+}
+
+_latest_query = OrderedDict()  # user_id -> (id, monotonic time) of the newest inline query
+
+# Player fields that appear in the rendered articles
+STATE_FIELDS = (
+    'username', 'level', 'rank', 'ryo', 'league_points', 'win_streak', 'battles_today',
+    'battles_today_date', 'total_battles', 'kills', 'hospitalized_until', 'daily_missions_reset'
+)
+
+# Placeholder for the shared top-5 article inside cached items
+_LEAGUE_TOP = 'league_top'
+
+
+def player_state_version(player):
+    """Hash of everything the inline articles show for this player."""
+    is_hosp, _ = gl.get_hospital_status(player)
+    return hash((
+        tuple(str(player.get(field)) for field in STATE_FIELDS),
+        repr(player.get('daily_missions_data')),
+        is_hosp
+    ))
+
+
+def _battle_spec(player, league_display, tier_key, tier_data, enemy_key, enemy_data):
+    """Everything of a battle article except its game id."""
+    entry_fee = tier_data['entry_fee']
+    potential_reward = f"{tier_data['reward_min']}-{tier_data['reward_max']}"
+    
+    # Show streak bonus if active
+    streak = player.get('win_streak', 0)
+    streak_status = ls.get_streak_status(streak)
+    streak_text = ""
+    if streak_status and streak > 0:
+        multiplier_percent = int((streak_status['multiplier'] - 1) * 100)
+        if multiplier_percent > 0:
+            streak_text = f"\n🔥 <b>Streak Bonus:</b> {streak_status['name']} (+{multiplier_percent}% Ryo!)"
+    
+    start_text = (
+        f"🎮 <b>{league_display['emoji']} {league_display['tier_name'].upper()} LEAGUE BATTLE!</b> 🎮\n\n"
+        f"<b>Enemy:</b> {enemy_data['name']} {enemy_data['emoji']}\n"
+        f"<b>Difficulty:</b> {enemy_data['difficulty'].title()}\n"
+        f"<b>HP:</b> {health_bar(enemy_data['max_hp'], enemy_data['max_hp'])}\n"
+        f"<b>Chakra:</b> {chakra_bar(enemy_data['chakra'], enemy_data['chakra'])}\n\n"
+        f"<b>Your HP:</b> {health_bar(100, 100)}\n"
+        f"<b>Your Chakra:</b> {chakra_bar(100, 100)}\n\n"
+        f"💰 <b>Entry Fee:</b> {entry_fee} Ryo\n"
+        f"🏆 <b>Reward:</b> {potential_reward} Ryo\n"
+        f"⭐ <b>Points:</b> +{tier_data['point_gain']} (win) / -{tier_data['point_loss']} (lose)\n"
+        f"📊 <b>Battles Today:</b> {gl.get_daily_count(player, 'battles_today')}/{tier_data['daily_battle_limit']}"
+        f"{streak_text}\n\n"
+        f"<i>Ready to fight?</i>"
+    )
+    
+    return {
+        'tier_key': tier_key,
+        'enemy_key': enemy_key,
+        'title': f"⚔️ Battle: {enemy_data['name']} ({enemy_data['difficulty'].title()})",
+        'description': f"Fee: {entry_fee} Ryo | Reward: {potential_reward} Ryo | +{tier_data['point_gain']} pts",
+        'content': InputTextMessageContent(start_text, parse_mode="HTML"),
+        'thumbnail_url': enemy_data.get('image', '')
+    }
+
+
+def _battle_article(spec):
+    game_id = uuid.uuid4().hex[:6]
+    keyboard = [[InlineKeyboardButton("⚔️ START BATTLE!", callback_data=f"lb_start_{game_id}_{spec['enemy_key']}")]]
+    return InlineQueryResultArticle(
+        id=f"battle_{spec['tier_key']}_{spec['enemy_key']}_{game_id}",
+        title=spec['title'],
+        description=spec['description'],
+        input_message_content=spec['content'],
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        thumbnail_url=spec['thumbnail_url']
+    )
+
+
+def render_player_items(player):
+    """
+    Build a registered player's inline results.
+    Returns ready articles, plus battle specs (dicts) and the _LEAGUE_TOP placeholder.
+    """
+    items = []
+    is_hosp, _ = gl.get_hospital_status(player)
+    league_display = ls.get_league_display(player)
+    tier_key = league_display['tier_key']
+    tier_data = ls.LEAGUE_TIERS[tier_key]
+    
+    # --- 1. Show Profile/Wallet ---
+    wallet_text = get_wallet_text(player)
+    items.append(
+        InlineQueryResultArticle(
+            id="wallet",
+            title=f"{league_display['emoji']} My Ninja Profile",
+            description=f"{league_display['tier_name']} League | {league_display['points']} pts | Streak: {player.get('win_streak', 0)}",
+            input_message_content=InputTextMessageContent(wallet_text, parse_mode="HTML")
         )
-        
-        # --- 3. Daily Missions ---
-        missions_data = ls.get_daily_missions(player)
-        completed = len(missions_data['completed'])
-        results.append(
-            InlineQueryResultArticle(
-                id="missions",
-                title=f"📋 Daily Missions ({completed}/3)",
-                description="View your daily challenges",
-                input_message_content=InputTextMessageContent(get_daily_missions_text(player), parse_mode="HTML")
-            )
+    )
+    
+    # --- 2. League Leaderboard (shared fragment) ---
+    items.append(_LEAGUE_TOP)
+    
+    # --- 3. Daily Missions ---
+    missions_data = ls.get_daily_missions(player)
+    completed = len(missions_data['completed'])
+    items.append(
+        InlineQueryResultArticle(
+            id="missions",
+            title=f"📋 Daily Missions ({completed}/3)",
+            description="View your daily challenges",
+            input_message_content=InputTextMessageContent(get_daily_missions_text(player), parse_mode="HTML")
         )
+    )
+    
+    # --- 4. LEAGUE BATTLES ---
+    if not is_hosp:
+        battle_check = ls.can_battle_today(player)
         
-        # --- 4. LEAGUE BATTLES ---
-        if not is_hosp:
-            battle_check = ls.can_battle_today(player)
-            
-            if battle_check['can_battle'] and player['ryo'] >= tier_data['entry_fee']:
-                # Get enemies for player's league
-                available_enemies = be.get_enemies_for_league(tier_key)
-                
-                for enemy_key, enemy_data in available_enemies.items():
-                    game_id = uuid.uuid4().hex[:6]
-                    
-                    entry_fee = tier_data['entry_fee']
-                    potential_reward = f"{tier_data['reward_min']}-{tier_data['reward_max']}"
-                    
-                    # Show streak bonus if active
-                    streak = player.get('win_streak', 0)
-                    streak_status = ls.get_streak_status(streak)
-                    streak_text = ""
-                    if streak_status and streak > 0:
-                        multiplier_percent = int((streak_status['multiplier'] - 1) * 100)
-                        if multiplier_percent > 0:
-                            streak_text = f"\n🔥 <b>Streak Bonus:</b> {streak_status['name']} (+{multiplier_percent}% Ryo!)"
-                    
-                    start_text = (
-                        f"🎮 <b>{league_display['emoji']} {league_display['tier_name'].upper()} LEAGUE BATTLE!</b> 🎮\n\n"
-                        f"<b>Enemy:</b> {enemy_data['name']} {enemy_data['emoji']}\n"
-                        f"<b>Difficulty:</b> {enemy_data['difficulty'].title()}\n"
-                        f"<b>HP:</b> {health_bar(enemy_data['max_hp'], enemy_data['max_hp'])}\n"
-                        f"<b>Chakra:</b> {chakra_bar(enemy_data['chakra'], enemy_data['chakra'])}\n\n"
-                        f"<b>Your HP:</b> {health_bar(100, 100)}\n"
-                        f"<b>Your Chakra:</b> {chakra_bar(100, 100)}\n\n"
-                        f"💰 <b>Entry Fee:</b> {entry_fee} Ryo\n"
-                        f"🏆 <b>Reward:</b> {potential_reward} Ryo\n"
-                        f"⭐ <b>Points:</b> +{tier_data['point_gain']} (win) / -{tier_data['point_loss']} (lose)\n"
-                        f"📊 <b>Battles Today:</b> {player.get('battles_today', 0)}/{tier_data['daily_battle_limit']}"
-                        f"{streak_text}\n\n"
-                        f"<i>Ready to fight?</i>"
-                    )
-                    
-                    keyboard = [[InlineKeyboardButton("⚔️ START BATTLE!", callback_data=f"lb_start_{game_id}_{enemy_key}")]]
-                    
-                    results.append(
-                        InlineQueryResultArticle(
-                            id=f"battle_{tier_key}_{enemy_key}_{game_id}",
-                            title=f"⚔️ Battle: {enemy_data['name']} ({enemy_data['difficulty'].title()})",
-                            description=f"Fee: {entry_fee} Ryo | Reward: {potential_reward} Ryo | +{tier_data['point_gain']} pts",
-                            input_message_content=InputTextMessageContent(start_text, parse_mode="HTML"),
-                            reply_markup=InlineKeyboardMarkup(keyboard),
-                            thumbnail_url=enemy_data.get('image', '')
-                        )
-                    )
-            
-            elif not battle_check['can_battle']:
-                # Daily limit reached
-                results.append(
-                    InlineQueryResultArticle(
-                        id="limit_reached",
-                        title="⚠️ Daily Battle Limit Reached",
-                        description=f"Come back tomorrow! ({tier_data['daily_battle_limit']} battles/day)",
-                        input_message_content=InputTextMessageContent(
-                            f"⚠️ <b>Daily Battle Limit Reached!</b>\n\n"
-                            f"You've completed <b>{tier_data['daily_battle_limit']}</b> battles today.\n"
-                            f"Come back tomorrow for more league battles!\n\n"
-                            f"<i>Tip: Complete daily missions for extra Ryo!</i>",
-                            parse_mode="HTML"
-                        )
-                    )
-                )
+        if battle_check['can_battle'] and player['ryo'] >= tier_data['entry_fee']:
+            # Get enemies for player's league
+            available_enemies = be.get_enemies_for_league(tier_key)
             
-            elif player['ryo'] < tier_data['entry_fee']:
-                # Not enough Ryo
-                results.append(
-                    InlineQueryResultArticle(
-                        id="low_ryo",
-                        title="❌ Not Enough Ryo",
-                        description=f"Need {tier_data['entry_fee']} Ryo to battle in {league_display['tier_name']}",
-                        input_message_content=InputTextMessageContent(
-                            f"❌ <b>Insufficient Ryo</b>\n\n"
-                            f"You need <b>{tier_data['entry_fee']} Ryo</b> to battle in the {league_display['emoji']} {league_display['tier_name']} League.\n\n"
-                            f"<b>Your Balance:</b> {player['ryo']:,} Ryo\n"
-                            f"<b>Need:</b> {tier_data['entry_fee'] - player['ryo']:,} more Ryo\n\n"
-                            f"💡 <b>How to earn Ryo:</b>\n"
-                            f"• Complete daily missions\n"
-                            f"• Fight in main game (/fight)\n"
-                            f"• Rob other players (/rob)",
-                            parse_mode="HTML"
-                        )
+            for enemy_key, enemy_data in available_enemies.items():
+                items.append(_battle_spec(player, league_display, tier_key, tier_data, enemy_key, enemy_data))
+        
+        elif not battle_check['can_battle']:
+            # Daily limit reached
+            items.append(
+                InlineQueryResultArticle(
+                    id="limit_reached",
+                    title="⚠️ Daily Battle Limit Reached",
+                    description=f"Come back tomorrow! ({tier_data['daily_battle_limit']} battles/day)",
+                    input_message_content=InputTextMessageContent(
+                        f"⚠️ <b>Daily Battle Limit Reached!</b>\n\n"
+                        f"You've completed <b>{tier_data['daily_battle_limit']}</b> battles today.\n"
+                        f"Come back tomorrow for more league battles!\n\n"
+                        f"<i>Tip: Complete daily missions for extra Ryo!</i>",
+                        parse_mode="HTML"
                     )
                 )
-        else:
-            # Hospitalized
-            results.append(
+            )
+        
+        elif player['ryo'] < tier_data['entry_fee']:
+            # Not enough Ryo
+            items.append(
                 InlineQueryResultArticle(
-                    id="hospitalized",
-                    title="🏥 You're Hospitalized!",
-                    description="Can't battle while recovering",
+                    id="low_ryo",
+                    title="❌ Not Enough Ryo",
+                    description=f"Need {tier_data['entry_fee']} Ryo to battle in {league_display['tier_name']}",
                     input_message_content=InputTextMessageContent(
-                        f"🏥 <b>You're Hospitalized!</b>\n\n"
-                        f"You can't participate in league battles while recovering.\n"
-                        f"Wait for your recovery time to expire, or use /hospital to check status.",
+                        f"❌ <b>Insufficient Ryo</b>\n\n"
+                        f"You need <b>{tier_data['entry_fee']} Ryo</b> to battle in the {league_display['emoji']} {league_display['tier_name']} League.\n\n"
+                        f"<b>Your Balance:</b> {player['ryo']:,} Ryo\n"
+                        f"<b>Need:</b> {tier_data['entry_fee'] - player['ryo']:,} more Ryo\n\n"
+                        f"💡 <b>How to earn Ryo:</b>\n"
+                        f"• Complete daily missions\n"
+                        f"• Fight in main game (/fight)\n"
+                        f"• Rob other players (/rob)",
                         parse_mode="HTML"
                     )
                 )
             )
+    else:
+        # Hospitalized
+        items.append(
+            InlineQueryResultArticle(
+                id="hospitalized",
+                title="🏥 You're Hospitalized!",
+                description="Can't battle while recovering",
+                input_message_content=InputTextMessageContent(
+                    f"🏥 <b>You're Hospitalized!</b>\n\n"
+                    f"You can't participate in league battles while recovering.\n"
+                    f"Wait for your recovery time to expire, or use /hospital to check status.",
+                    parse_mode="HTML"
+                )
+            )
+        )
+    
+    return items
+
+
+def get_player_items(player):
+    """Cached render_player_items for the player's current state."""
+    key = (player['user_id'], player_state_version(player))
+    now = time.monotonic()
     
+    entry = INLINE_CACHE.get(key)
+    if entry and entry[0] > now:
+        INLINE_CACHE.move_to_end(key)
+        INLINE_STATS['hits'] += 1
+        return entry[1]
+    
+    INLINE_STATS['misses'] += 1
+    items = render_player_items(player)
+    INLINE_CACHE[key] = (now + INLINE_CACHE_TTL_SECONDS, items)
+    INLINE_CACHE.move_to_end(key)
+    while len(INLINE_CACHE) > INLINE_CACHE_SIZE:
+        INLINE_CACHE.popitem(last=False)
+    return items
+
+
+def materialize(items):
+    """Turn cached items into the articles sent to Telegram."""
+    results = []
+    for item in items:
+        if item is _LEAGUE_TOP:
+            if TOP_LEAGUE['article'] is None:
+                refresh_top_league()
+            results.append(TOP_LEAGUE['article'])
+        elif isinstance(item, dict):
+            results.append(_battle_article(item))
+        else:
+            results.append(item)
+    return results
+
+
+def latency_stats():
+    """p50/p99 inline answer latency (ms, from handler entry, including any debounce wait) over recent queries."""
+    samples = sorted(LATENCY_SAMPLES_MS)
+    if not samples:
+        return None
+    
+    def pct(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+    return {'count': len(samples), 'p50': pct(50), 'p99': pct(99)}
+
+
+def stats_text():
+    lookups = INLINE_STATS['hits'] + INLINE_STATS['misses']
+    hit_rate = INLINE_STATS['hits'] / lookups if lookups else 0
+    latency = latency_stats()
+    latency_text = f"p50 **{latency['p50']:.1f}ms** / p99 **{latency['p99']:.1f}ms**" if latency else "no samples"
+    return (
+        f"  • Queries: **{INLINE_STATS['queries']:,}** ({INLINE_STATS['debounced']:,} debounced)\n"
+        f"  • Result Cache Hits: **{hit_rate:.0%}** ({len(INLINE_CACHE):,} entries)\n"
+        f"  • Answer Latency: {latency_text}"
+    )
+
+
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Enhanced inline query handler with league system."""
+    query = update.inline_query
+    if not query:
+        return
+
+    started = time.perf_counter()
+    user_id = query.from_user.id
+    INLINE_STATS['queries'] += 1
+    
+    # Debounce keystroke bursts: a query that follows the user's previous one
+    # within the window waits to see if a newer one arrives; a lone query is
+    # answered right away
+    now = time.monotonic()
+    previous = _latest_query.pop(user_id, None)
+    _latest_query[user_id] = (query.id, now)
+    if len(_latest_query) > INLINE_CACHE_SIZE:
+        _latest_query.popitem(last=False)
+    if previous and now - previous[1] < INLINE_DEBOUNCE_SECONDS:
+        await asyncio.sleep(INLINE_DEBOUNCE_SECONDS)
+        latest = _latest_query.get(user_id)
+        if not latest or latest[0] != query.id:
+            INLINE_STATS['debounced'] += 1
+            return
+    
+    player = db.get_player(user_id)
+
+    if player:
+        results = materialize(get_player_items(player))
     else:
         # Not registered
-        results.append(
+        results = [
             InlineQueryResultArticle(
                 id="register",
                 title="❌ Not Registered!",
@@ -305,9 +477,10 @@ async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYP
                     parse_mode="HTML"
                 )
             )
-        )
+        ]
 
     try:
         await query.answer(results, cache_time=0)
     except Exception as e:
         logger.error(f"Inline query error: {e}")
+    LATENCY_SAMPLES_MS.append((time.perf_counter() - started) * 1000)
@@ -4,6 +4,7 @@ Handles all button interactions for league battles
 """
 import logging
 import random
+from collections import OrderedDict
 from html import escape
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
@@ -11,52 +12,82 @@ from telegram.ext import ContextTypes
 import database as db
 import league_system as ls
 import battle_enemies as be
+import league_sessions
 
 logger = logging.getLogger(__name__)
 
 # Import from part 1
 from inline_handler_league import (
-    ACTIVE_GAMES, PLAYER_JUTSUS, health_bar, chakra_bar
+    PLAYER_JUTSUS, health_bar, chakra_bar
 )
 
+# 🔁 IDEMPOTENT CALLBACKS
+# Move and surrender buttons carry the game's move number:
+#   lb_move_{game_id}_{seq}_{jutsu}   lb_end_{game_id}_{seq}_surrender
+# A click whose seq isn't the game's current one (double tap, old message,
+# retried delivery) is answered and dropped before any game work. Answers
+# are kept per callback query id, so a redelivered query gets the same
+# answer straight away.
+ANSWER_CACHE = OrderedDict()  # query id -> (text, show_alert)
+ANSWER_CACHE_SIZE = 5000
 
-async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handles button clicks in league battle games."""
-    query = update.callback_query
+STALE_CLICK_TEXT = "⏳ Already played - use the latest buttons."
+
+
+async def answer(query, text=None, show_alert=False):
+    """Answer a callback query once (later calls are no-ops) and remember the answer."""
+    if query.id in ANSWER_CACHE:
+        return
+    ANSWER_CACHE[query.id] = (text, show_alert)
+    if len(ANSWER_CACHE) > ANSWER_CACHE_SIZE:
+        ANSWER_CACHE.popitem(last=False)
     
-    # Try to answer query
     try:
-        await query.answer()
+        await query.answer(text, show_alert=show_alert)
     except Exception as e:
         logger.warning(f"Could not answer callback query: {e}")
+
+
+async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handles button clicks in league battle games."""
+    query = update.callback_query
     
+    # Redelivered query: answer it again, touch nothing
+    cached = ANSWER_CACHE.get(query.id)
+    if cached is not None:
+        league_sessions.STATS['redelivered'] += 1
+        try:
+            await query.answer(cached[0], show_alert=cached[1])
+        except Exception:
+            pass
+        return
+    
+    await handle_league_click(query)
+    await answer(query)
+
+
+async def handle_league_click(query):
     parts = query.data.split('_')
-    if len(parts) < 3:
+    if len(parts) < 4:
         return
     
     action = parts[1]  # 'start', 'move', 'end'
-    
-    player = db.get_player(query.from_user.id)
-    if not player:
-        try:
-            await query.answer("You need to register first!", show_alert=True)
-        except:
-            pass
-        return
+    game_id = parts[2]
     
     # START NEW BATTLE
     if action == 'start':
-        game_id = parts[2]
         enemy_key = parts[3]
         
-        # Check if already started
-        if game_id in ACTIVE_GAMES:
-            if ACTIVE_GAMES[game_id]['player_id'] != query.from_user.id:
-                try:
-                    await query.answer("🚫 Someone else started this battle!", show_alert=True)
-                except:
-                    pass
-                return
+        # Already started (double tap, retry): nothing to redo
+        game_state = league_sessions.get(game_id)
+        if game_state:
+            await answer_started(query, game_state)
+            return
+        
+        player = db.get_player(query.from_user.id)
+        if not player:
+            await answer(query, "You need to register first!", show_alert=True)
+            return
         
         # Get league tier and check entry fee
         league_display = ls.get_league_display(player)
@@ -64,87 +95,78 @@ async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_T
         tier_data = ls.LEAGUE_TIERS[tier_key]
         
         if player['ryo'] < tier_data['entry_fee']:
-            try:
-                await query.answer(f"❌ Need {tier_data['entry_fee']} Ryo!", show_alert=True)
-            except:
-                pass
+            await answer(query, f"❌ Need {tier_data['entry_fee']} Ryo!", show_alert=True)
             return
         
         # Check daily limit
         battle_check = ls.can_battle_today(player)
         if not battle_check['can_battle']:
-            try:
-                await query.answer("⚠️ Daily battle limit reached!", show_alert=True)
-            except:
-                pass
+            await answer(query, "⚠️ Daily battle limit reached!", show_alert=True)
             return
         
         enemy_data = be.get_enemy_by_key(enemy_key)
         if not enemy_data:
             return
         
-        # Initialize game state
-        ACTIVE_GAMES[game_id] = {
-            'player_id': query.from_user.id,
-            'enemy_key': enemy_key,
-            'player_hp': 100,
-            'player_chakra': 100,
-            'enemy_hp': enemy_data['max_hp'],
-            'enemy_chakra': enemy_data['chakra'],
-            'turn': 1,
-            'log': [],
-            'player_move_history': [],
-            'used_heal': False,
-            'tier_key': tier_key
-        }
-        
-        # Deduct entry fee and increment battles today
-        db.update_player(query.from_user.id, {
-            'ryo': player['ryo'] - tier_data['entry_fee'],
-            'battles_today': player.get('battles_today', 0) + 1,
-            'total_battles': player.get('total_battles', 0) + 1
-        })
+        # Deduct entry fee, count the battle and persist the game together
+        game_state = league_sessions.new_state(
+            game_id, player, enemy_key, enemy_data, tier_key, query.inline_message_id
+        )
+        status = league_sessions.start(game_state, tier_data)
+        if status == 'exists':
+            game_state = league_sessions.get(game_id)
+            if game_state:
+                await answer_started(query, game_state)
+            return
+        if status == 'refused':
+            await answer(query, "❌ Not enough Ryo or daily limit reached!", show_alert=True)
+            return
+        if status != 'opened':
+            await answer(query, "❌ Couldn't start the battle, try again!", show_alert=True)
+            return
         
         # Show jutsu selection
-        await show_battle_screen(query, game_id, ACTIVE_GAMES[game_id], enemy_data, tier_data)
+        await answer(query)
+        await show_battle_screen(query, game_id, game_state, enemy_data, tier_data)
+        return
+    
+    # MOVES & SURRENDER: validate before doing anything
+    game_state = league_sessions.get(game_id)
+    if not game_state:
+        await answer(query, "⚠️ Game expired!", show_alert=True)
+        return
+    
+    if game_state['player_id'] != query.from_user.id:
+        await answer(query, "🚫 Not your game!", show_alert=True)
+        return
+    
+    if len(parts) < 5 or parts[3] != str(game_state['seq']):
+        league_sessions.STATS['stale_clicks'] += 1
+        await answer(query, STALE_CLICK_TEXT)
+        return
+    
+    enemy_data = be.get_enemy_by_key(game_state['enemy_key'])
+    tier_data = ls.LEAGUE_TIERS[game_state['tier_key']]
+    if not enemy_data:
+        return
     
     # PLAYER MAKES A MOVE
-    elif action == 'move':
-        game_id = parts[2]
-        jutsu_key = parts[3]
-        
-        game_state = ACTIVE_GAMES.get(game_id)
-        if not game_state:
-            try:
-                await query.answer("⚠️ Game expired!", show_alert=True)
-            except:
-                pass
-            return
-        
-        if game_state['player_id'] != query.from_user.id:
-            try:
-                await query.answer("🚫 Not your game!", show_alert=True)
-            except:
-                pass
-            return
-        
-        enemy_data = be.get_enemy_by_key(game_state['enemy_key'])
-        player_jutsu = PLAYER_JUTSUS.get(jutsu_key)
-        tier_data = ls.LEAGUE_TIERS[game_state['tier_key']]
-        
-        if not player_jutsu or not enemy_data:
+    if action == 'move':
+        player_jutsu = PLAYER_JUTSUS.get(parts[4])
+        if not player_jutsu:
             return
         
         # Check chakra
         if game_state['player_chakra'] < player_jutsu['chakra']:
-            try:
-                await query.answer("❌ Not enough chakra!", show_alert=True)
-            except:
-                pass
+            await answer(query, "❌ Not enough chakra!", show_alert=True)
             return
         
+        # Claim the move before the first await: a second click with this seq is now stale
+        game_state['seq'] += 1
+        await answer(query)
+        
         # Track move for AI and heal usage
-        game_state['player_move_history'].append(player_jutsu['type'])
+        league_sessions.push_move(game_state, player_jutsu['type'])
         if player_jutsu['type'] == 'heal':
             game_state['used_heal'] = True
         
@@ -155,7 +177,7 @@ async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_T
             # Healing jutsu
             heal_amount = min(player_jutsu['heal'], 100 - game_state['player_hp'])
             game_state['player_hp'] = min(100, game_state['player_hp'] + heal_amount)
-            game_state['log'].append(f"💚 You healed {heal_amount} HP!")
+            league_sessions.push_log(game_state, f"💚 You healed {heal_amount} HP!")
         else:
             # Attack jutsu
             damage = player_jutsu['power']
@@ -163,15 +185,15 @@ async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_T
             # Type effectiveness
             if player_jutsu['type'] == enemy_data.get('weakness'):
                 damage = int(damage * 1.5)
-                game_state['log'].append(f"💥 SUPER EFFECTIVE! (+50% damage)")
+                league_sessions.push_log(game_state, f"💥 SUPER EFFECTIVE! (+50% damage)")
             
             # Critical hit chance (15%)
             if random.random() < 0.15:
                 damage = int(damage * 2)
-                game_state['log'].append(f"⚡ CRITICAL HIT! (2x damage)")
+                league_sessions.push_log(game_state, f"⚡ CRITICAL HIT! (2x damage)")
             
             game_state['enemy_hp'] -= damage
-            game_state['log'].append(f"⚔️ You used {player_jutsu['name']} - {damage} damage!")
+            league_sessions.push_log(game_state, f"⚔️ You used {player_jutsu['name']} - {damage} damage!")
         
         # Check if enemy defeated
         if game_state['enemy_hp'] <= 0:
@@ -193,12 +215,12 @@ async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_T
             last_player_type = game_state['player_move_history'][-1] if game_state['player_move_history'] else None
             if last_player_type in enemy_attack.get('strong_vs', []):
                 enemy_damage = int(enemy_damage * 1.3)
-                game_state['log'].append(f"⚠️ Enemy countered your move!")
+                league_sessions.push_log(game_state, f"⚠️ Enemy countered your move!")
             
             game_state['player_hp'] -= enemy_damage
-            game_state['log'].append(f"💢 {enemy_data['name']} used {enemy_attack['name']} - {enemy_damage} damage!")
+            league_sessions.push_log(game_state, f"💢 {enemy_data['name']} used {enemy_attack['name']} - {enemy_damage} damage!")
         else:
-            game_state['log'].append(f"💤 {enemy_data['name']} is out of chakra!")
+            league_sessions.push_log(game_state, f"💤 {enemy_data['name']} is out of chakra!")
         
         # Check if player defeated
         if game_state['player_hp'] <= 0:
@@ -207,36 +229,26 @@ async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_T
         
         # Continue battle
         game_state['turn'] += 1
+        if not league_sessions.save(game_state):
+            await answer(query, "⚠️ Game expired!", show_alert=True)
+            return
         
         # Show updated battle screen
         await show_battle_screen(query, game_id, game_state, enemy_data, tier_data)
     
     # END GAME (Surrender)
     elif action == 'end':
-        game_id = parts[2]
-        reason = parts[3] if len(parts) > 3 else 'surrender'
-        
-        game_state = ACTIVE_GAMES.get(game_id)
-        if not game_state:
-            return
-        
-        if game_state['player_id'] != query.from_user.id:
-            return
-        
-        enemy_data = be.get_enemy_by_key(game_state['enemy_key'])
-        tier_data = ls.LEAGUE_TIERS[game_state['tier_key']]
-        
-        if reason == 'surrender':
-            # Apply loss penalties
-            player = db.get_player(query.from_user.id)
-            league_display = ls.get_league_display(player)
+        if parts[4] == 'surrender':
+            game_state['seq'] += 1
+            await answer(query)
             
-            new_points = max(0, player.get('league_points', 0) - tier_data['point_loss'])
-            
-            db.update_player(query.from_user.id, {
-                'league_points': new_points,
-                'win_streak': 0
-            })
+            # Apply loss penalties (closes the session in the same write)
+            settlement = ls.build_settlement(None, game_state, enemy_data, tier_data, won=False)
+            settlement['status'] = 'surrendered'
+            result = league_sessions.settle(game_id, game_state['player_id'], settlement)
+            if not result:
+                return
+            new_points = result['league_points']
             
             result_text = (
                 f"🏳️ <b>SURRENDERED</b>\n\n"
@@ -259,10 +271,14 @@ async def league_battle_callback(update: Update, context: ContextTypes.DEFAULT_T
                 )
             except:
                 pass
-            
-            # Clean up
-            if game_id in ACTIVE_GAMES:
-                del ACTIVE_GAMES[game_id]
+
+
+async def answer_started(query, game_state):
+    """A start click on a game that is already running."""
+    if game_state['player_id'] != query.from_user.id:
+        await answer(query, "🚫 Someone else started this battle!", show_alert=True)
+    else:
+        await answer(query, "⚔️ Battle already started!")
 
 
 async def show_battle_screen(query, game_id, game_state, enemy_data, tier_data):
@@ -271,9 +287,8 @@ async def show_battle_screen(query, game_id, game_state, enemy_data, tier_data):
     # Build battle log (last 3 actions)
     log_text = "\n".join(game_state['log'][-3:]) if game_state['log'] else "Battle started!"
     
-    # Streak info
-    player = db.get_player(game_state['player_id'])
-    streak = player.get('win_streak', 0)
+    # Streak info (snapshotted when the game started)
+    streak = game_state.get('win_streak', 0)
     streak_display = f"🔥 {streak}-Win Streak!" if streak > 0 else ""
     
     battle_text = (
@@ -288,26 +303,27 @@ async def show_battle_screen(query, game_id, game_state, enemy_data, tier_data):
         f"<i>Choose your jutsu:</i>"
     )
     
-    # Build jutsu keyboard
+    # Build jutsu keyboard (buttons carry the move number, see IDEMPOTENT CALLBACKS)
+    seq = game_state['seq']
     keyboard = [
         [
-            InlineKeyboardButton(f"🔥 Fire (15💙)", callback_data=f"lb_move_{game_id}_f"),
-            InlineKeyboardButton(f"👊 Taijutsu (5💙)", callback_data=f"lb_move_{game_id}_t")
+            InlineKeyboardButton(f"🔥 Fire (15💙)", callback_data=f"lb_move_{game_id}_{seq}_f"),
+            InlineKeyboardButton(f"👊 Taijutsu (5💙)", callback_data=f"lb_move_{game_id}_{seq}_t")
         ],
         [
-            InlineKeyboardButton(f"🌊 Water (25💙)", callback_data=f"lb_move_{game_id}_wa"),
-            InlineKeyboardButton(f"⚡ Lightning (30💙)", callback_data=f"lb_move_{game_id}_l")
+            InlineKeyboardButton(f"🌊 Water (25💙)", callback_data=f"lb_move_{game_id}_{seq}_wa"),
+            InlineKeyboardButton(f"⚡ Lightning (30💙)", callback_data=f"lb_move_{game_id}_{seq}_l")
         ],
         [
-            InlineKeyboardButton(f"💫 Rasengan (35💙)", callback_data=f"lb_move_{game_id}_r"),
-            InlineKeyboardButton(f"👁️ Genjutsu (20💙)", callback_data=f"lb_move_{game_id}_g")
+            InlineKeyboardButton(f"💫 Rasengan (35💙)", callback_data=f"lb_move_{game_id}_{seq}_r"),
+            InlineKeyboardButton(f"👁️ Genjutsu (20💙)", callback_data=f"lb_move_{game_id}_{seq}_g")
         ],
         [
-            InlineKeyboardButton(f"🌀 Clone (20💙)", callback_data=f"lb_move_{game_id}_sc"),
-            InlineKeyboardButton(f"💚 Heal (25💙)", callback_data=f"lb_move_{game_id}_h")
+            InlineKeyboardButton(f"🌀 Clone (20💙)", callback_data=f"lb_move_{game_id}_{seq}_sc"),
+            InlineKeyboardButton(f"💚 Heal (25💙)", callback_data=f"lb_move_{game_id}_{seq}_h")
         ],
         [
-            InlineKeyboardButton(f"🏳️ Surrender", callback_data=f"lb_end_{game_id}_surrender")
+            InlineKeyboardButton(f"🏳️ Surrender", callback_data=f"lb_end_{game_id}_{seq}_surrender")
         ]
     ]
     
@@ -323,58 +339,26 @@ async def show_battle_screen(query, game_id, game_state, enemy_data, tier_data):
 
 async def end_game(query, game_id, game_state, enemy_data, tier_data, won):
     """End the game and show results."""
-    player = db.get_player(game_state['player_id'])
+    player = db.get_player(game_state['player_id']) if won else None
+    if won and not player:
+        return
+    
+    # Rewards, streak, points, items and missions go out in one write that
+    # also closes the session, so a repeated final click settles nothing
+    settlement = ls.build_settlement(player, game_state, enemy_data, tier_data, won)
+    result = league_sessions.settle(game_id, game_state['player_id'], settlement)
+    if not result:
+        return
+    new_points = result['league_points']
     
     if won:
-        # Calculate rewards
-        reward_data = ls.calculate_battle_rewards(player, True, enemy_data['base_reward'])
-        
-        # Update player stats
-        new_streak = player.get('win_streak', 0) + 1
-        new_points = player.get('league_points', 0) + reward_data['points']
-        
-        updates = {
-            'ryo': player['ryo'] + reward_data['ryo'],
-            'exp': player['exp'] + reward_data['exp'],
-            'total_exp': player['total_exp'] + reward_data['exp'],
-            'league_points': new_points,
-            'win_streak': new_streak
-        }
+        reward_data = settlement['reward_data']
+        new_streak = result['win_streak']
         
-        # Add bonus items to inventory
-        if reward_data['bonus_items']:
-            inventory = player.get('inventory') or []
-            inventory.extend(reward_data['bonus_items'])
-            updates['inventory'] = inventory
-        
-        db.update_player(game_state['player_id'], updates)
-        
-        # Check for mission completion
-        mission_results = []
-        
-        # Win 3 battles mission
-        missions_data = ls.get_daily_missions(player)
-        win_mission = ls.update_mission_progress(player, 'win_3', 1)
-        if win_mission['completed']:
-            mission_results.append(f"✅ Mission Complete: {win_mission['mission']['description']}")
-        
-        # Win without heal mission
-        if not game_state['used_heal']:
-            no_heal_mission = ls.update_mission_progress(player, 'win_no_heal', 1)
-            if no_heal_mission['completed']:
-                mission_results.append(f"✅ Mission Complete: {no_heal_mission['mission']['description']}")
-        
-        # Perfect win mission (80+ HP)
-        if game_state['player_hp'] >= 80:
-            perfect_mission = ls.update_mission_progress(player, 'perfect_win', 1)
-            if perfect_mission['completed']:
-                mission_results.append(f"✅ Mission Complete: {perfect_mission['mission']['description']}")
-        
-        # Win streak mission
-        if new_streak >= 3:
-            streak_mission = ls.update_mission_progress(player, 'win_streak_3', 1)
-            if streak_mission['completed']:
-                mission_results.append(f"✅ Mission Complete: {streak_mission['mission']['description']}")
+        mission_results = [
+            f"✅ Mission Complete: {mission['description']} (+{mission['reward_ryo']} Ryo, +{mission['reward_exp']} EXP)"
+            for mission in result['completed_missions']
+        ]
         
         # Build result text
         streak_info = ""
@@ -415,13 +399,6 @@ async def end_game(query, game_id, game_state, enemy_data, tier_data, won):
         )
     else:
         # Loss
-        new_points = max(0, player.get('league_points', 0) - tier_data['point_loss'])
-        
-        db.update_player(game_state['player_id'], {
-            'league_points': new_points,
-            'win_streak': 0
-        })
-        
         result_text = (
             f"💔 <b>DEFEATED!</b> 💔\n\n"
             f"You were defeated by <b>{enemy_data['name']}</b>!\n\n"
@@ -446,7 +423,3 @@ async def end_game(query, game_id, game_state, enemy_data, tier_data, won):
         )
     except Exception as e:
         logger.error(f"Error ending game: {e}")
-    
-    # Clean up
-    if game_id in ACTIVE_GAMES:
-        del ACTIVE_GAMES[game_id]
@@ -4,6 +4,7 @@ from telegram.ext import ContextTypes
 from html import escape
 
 import database as db
+import leaderboard_service as lbs
 
 logger = logging.getLogger(__name__)
 
@@ -31,22 +32,22 @@ async def leaderboard_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     def get_mention(uid, uname): return f'<a href="tg://user?id={uid}">{escape(uname)}</a>'
 
     if category == "ryo":
-        text = "💰 **Top 10 Richest Ninja** 💰\n*(By Total Ryo)*\n\n"; top_players = db.get_top_players_by_ryo(limit=10)
+        text = "💰 **Top 10 Richest Ninja** 💰\n*(By Total Ryo)*\n\n"; top_players = lbs.top('ryo', limit=10)
         if not top_players: text += "No ninja have earned any Ryo yet."
         else:
             for i, p in enumerate(top_players): text += f"{['🥇','🥈','🥉'][i] if i<3 else f'<b>{i+1}.</b>'} {get_mention(p['user_id'], p['username'])} - {p['ryo']:,} Ryo\n"
     elif category == "exp":
-        text = "🔥 **Top 10 Strongest Ninja** 🔥\n*(By Total EXP)*\n\n"; top_players = db.get_top_players_by_exp(limit=10)
+        text = "🔥 **Top 10 Strongest Ninja** 🔥\n*(By Total EXP)*\n\n"; top_players = lbs.top('exp', limit=10)
         if not top_players: text += "No ninja have earned any EXP yet."
         else:
             for i, p in enumerate(top_players): text += f"{['🥇','🥈','🥉'][i] if i<3 else f'<b>{i+1}.</b>'} {get_mention(p['user_id'], p['username'])} - Lvl {p['level']} ({p['total_exp']:,} EXP)\n"
     elif category == "wins":
-        text = "⚔️ **Top 10 Fighters** ⚔️\n*(By PvP Wins)*\n\n"; top_players = db.get_top_players_by_wins(limit=10)
+        text = "⚔️ **Top 10 Fighters** ⚔️\n*(By PvP Wins)*\n\n"; top_players = lbs.top('wins', limit=10)
         if not top_players: text += "No ninja have won any battles yet."
         else:
             for i, p in enumerate(top_players): text += f"{['🥇','🥈','🥉'][i] if i<3 else f'<b>{i+1}.</b>'} {get_mention(p['user_id'], p['username'])} - {p['wins']} Wins\n"
     elif category == "kills":
-        text = "☠️ **Top 10 Deadliest Ninja** ☠️\n*(By Assassination Kills)*\n\n"; top_players = db.get_top_players_by_kills(limit=10)
+        text = "☠️ **Top 10 Deadliest Ninja** ☠️\n*(By Assassination Kills)*\n\n"; top_players = lbs.top('kills', limit=10)
         if not top_players: text += "No successful assassinations yet. The village is peaceful... for now."
         else:
             for i, p in enumerate(top_players): text += f"{['🥇','🥈','🥉'][i] if i<3 else f'<b>{i+1}.</b>'} {get_mention(p['user_id'], p['username'])} - {p['kills']} Kills\n"
@@ -61,7 +62,7 @@ async def leaderboard_back_callback(update: Update, context: ContextTypes.DEFAUL
 async def topkillers_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Direct command to show top killers."""
     text = "☠️ **Top 10 Deadliest Ninja** ☠️\n*(By Assassination Kills)*\n\n"
-    top_players = db.get_top_players_by_kills(limit=10)
+    top_players = lbs.top('kills', limit=10)
     if not top_players:
         text += "No successful assassinations yet."
     else:
@@ -72,3 +73,83 @@ async def topkillers_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
             text += f"{rank} {mention} - {p['kills']} Kills\n"
             
     await update.message.reply_text(text, parse_mode="HTML")
+
+# --- /rank: where do I stand? ---
+RANK_CATEGORIES = {
+    'ryo': ("💰 Ryo", 'ryo', "Ryo"),
+    'exp': ("🔥 EXP", 'total_exp', "EXP"),
+    'wins': ("⚔️ Wins", 'wins', "Wins"),
+    'kills': ("☠️ Kills", 'kills', "Kills"),
+    'league': ("🏆 League", 'league_points', "pts")
+}
+
+def _rank_line(standing):
+    return f"#{standing['rank']:,} of {standing['total']:,}" if standing else "Unranked"
+
+def build_rank_text(player, category, chat_id=None):
+    """Global, village and chat rank for one category, plus the players around you."""
+    title, column, unit = RANK_CATEGORIES[category]
+    user_id = player['user_id']
+    standing = lbs.neighborhood(category, user_id)
+    village_standing = lbs.neighborhood(category, user_id, village=player['village'])
+
+    text = f"📊 <b>{escape(player['username'])}'s Rank - {title}</b>\n\n"
+    text += f"🌍 <b>Global:</b> {_rank_line(standing)}\n"
+    text += f"🏘️ <b>{escape(player['village'])}:</b> {_rank_line(village_standing)}\n"
+    if chat_id:
+        text += f"💬 <b>This Chat:</b> {_rank_line(lbs.chat_neighborhood(category, chat_id, user_id))}\n"
+
+    if standing:
+        text += "\n<b>Around You:</b>\n"
+        for row in standing['rows']:
+            name = escape(row['username'])
+            if row['user_id'] == user_id:
+                name = f"<b>➤ {name}</b>"
+            text += f"<b>{row['position']:,}.</b> {name} - {row[column]:,} {unit}\n"
+    return text
+
+def rank_keyboard(category):
+    buttons = [
+        InlineKeyboardButton(f"• {title} •" if key == category else title, callback_data=f"rank_{key}")
+        for key, (title, _, _) in RANK_CATEGORIES.items()
+    ]
+    return InlineKeyboardMarkup([buttons[:3], buttons[3:]])
+
+async def rank_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Shows your exact rank and neighbors: /rank [ryo|exp|wins|kills|league]"""
+    player = db.get_player(update.effective_user.id)
+    if not player:
+        await update.message.reply_text("You must /start first!")
+        return
+
+    category = context.args[0].lower() if context.args else 'ryo'
+    if category not in RANK_CATEGORIES:
+        await update.message.reply_text(f"Usage: /rank [{'|'.join(RANK_CATEGORIES)}]")
+        return
+
+    chat = update.effective_chat
+    chat_id = chat.id if chat.type != 'private' else None
+    await update.message.reply_text(build_rank_text(player, category, chat_id), reply_markup=rank_keyboard(category), parse_mode="HTML")
+
+async def rank_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Switches the /rank category (shows the clicking player's rank)."""
+    query = update.callback_query
+    category = query.data.split('_', 1)[1]
+    player = db.get_player(query.from_user.id)
+    if not player or category not in RANK_CATEGORIES:
+        await query.answer("You must /start first!", show_alert=True)
+        return
+
+    await query.answer()
+    chat = query.message.chat
+    chat_id = chat.id if chat.type != 'private' else None
+    try:
+        await query.edit_message_text(build_rank_text(player, category, chat_id), reply_markup=rank_keyboard(category), parse_mode="HTML")
+    except Exception as e:
+        logger.warning(f"Rank edit failed: {e}")
+
+async def track_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Remembers who talks in each group, for per-chat ranks."""
+    chat, user = update.effective_chat, update.effective_user
+    if chat and user and chat.type in ('group', 'supergroup'):
+        lbs.note_chat_member(chat.id, user.id)
@@ -0,0 +1,153 @@
+"""
+🏆 LEADERBOARD SERVICE - Materialized Rankings in Redis
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Every leaderboard view used to run ORDER BY <column> DESC LIMIT N over
+the whole (unindexed) players table. Rankings are now kept in Redis
+sorted sets (cache.leaderboard_*), so a top-N read is O(log n + N).
+
+- Writes keep them current: update_player, atomic_add_*, escrow and boss
+  payouts record the new absolute values after they commit
+- reconcile() rebuilds everything from Postgres every
+  RECONCILE_INTERVAL_SECONDS to repair drift (Redis restarts, writes that
+  bypass database.py), paging through players by primary key
+- Until the first rebuild, or when Redis is down, reads fall back to SQL
+- Ranks: exact rank and the players around it, globally and per village
+  in O(log n), per chat among the players seen talking there
+"""
+
+import asyncio
+import logging
+import time
+
+import cache
+import database as db
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_INTERVAL_SECONDS = 900
+RECONCILE_BATCH_SIZE = 5000
+
+# category -> players column, whether zero scores are hidden, SQL fallback
+CATEGORIES = {
+    'ryo': {'column': 'ryo', 'positive_only': False, 'fallback': db.get_top_players_by_ryo},
+    'exp': {'column': 'total_exp', 'positive_only': False, 'fallback': db.get_top_players_by_exp},
+    'wins': {'column': 'wins', 'positive_only': True, 'fallback': db.get_top_players_by_wins},
+    'kills': {'column': 'kills', 'positive_only': True, 'fallback': db.get_top_players_by_kills},
+    'league': {'column': 'league_points', 'positive_only': True, 'fallback': db.get_top_players_by_league}
+}
+
+RANK_RADIUS = 5
+CHAT_MEMBER_REFRESH_SECONDS = 86400  # re-mark a chat member at most once a day (keeps the TTL alive)
+
+_chat_members_seen = {}  # (chat_id, user_id) -> monotonic time last written
+
+STATS = {
+    'reads': 0,
+    'fallbacks': 0,
+    'reconciles': 0,
+    'last_reconcile_rows': 0,
+    'last_reconcile_seconds': 0.0
+}
+
+# ═══════════════════════════════════════
+# READS
+# ═══════════════════════════════════════
+
+def top(category, limit=10):
+    """Top players for a category, shaped like the db.get_top_players_by_* rows."""
+    info = CATEGORIES[category]
+    STATS['reads'] += 1
+
+    rows = cache.leaderboard_top(info['column'], limit, info['positive_only'])
+    if rows is None:
+        STATS['fallbacks'] += 1
+        rows = info['fallback'](limit=limit)
+    return rows
+
+def _ranked(category, standing):
+    """None for unranked players (and zero scores on boards that hide them)."""
+    if not standing or standing['rank'] is None:
+        return None
+    if CATEGORIES[category]['positive_only'] and standing['score'] <= 0:
+        return None
+    return standing
+
+def neighborhood(category, user_id, radius=RANK_RADIUS, village=None):
+    """
+    A player's rank in a category: {'rank', 'total', 'score', 'rows'}
+    (rows = the players around them, each with a 'position').
+    Returns None if the player isn't ranked or nothing could be read.
+    """
+    column = CATEGORIES[category]['column']
+    STATS['reads'] += 1
+
+    standing = cache.leaderboard_neighborhood(column, user_id, radius, village)
+    if standing is None:
+        STATS['fallbacks'] += 1
+        standing = db.get_rank_neighborhood(user_id, column, radius, village)
+    return _ranked(category, standing)
+
+def chat_neighborhood(category, chat_id, user_id, radius=RANK_RADIUS):
+    """Same as neighborhood(), among the players seen in a chat (Redis only)."""
+    standing = cache.leaderboard_chat_neighborhood(chat_id, CATEGORIES[category]['column'], user_id, radius)
+    return _ranked(category, standing)
+
+def note_chat_member(chat_id, user_id):
+    """Record that a player talks in a chat (cheap: one Redis write per pair per day)."""
+    key = (chat_id, user_id)
+    now = time.monotonic()
+    last = _chat_members_seen.get(key)
+    if last is not None and now - last < CHAT_MEMBER_REFRESH_SECONDS:
+        return
+
+    if len(_chat_members_seen) > 200_000:
+        _chat_members_seen.clear()
+    _chat_members_seen[key] = now
+    cache.leaderboard_note_chat_members([key])
+
+# ═══════════════════════════════════════
+# RECONCILE
+# ═══════════════════════════════════════
+
+def _player_pages():
+    after_user_id = 0
+    while True:
+        rows = db.get_leaderboard_rows(after_user_id, RECONCILE_BATCH_SIZE)
+        if not rows:
+            return
+        yield rows
+        after_user_id = rows[-1]['user_id']
+
+def reconcile():
+    """
+    Rebuild all leaderboards from Postgres. Players written while the rebuild
+    was reading are re-read afterwards so the swap can't roll them back.
+    Returns the number of players indexed, or None if Redis is unavailable.
+    """
+    if not cache.redis_conn:
+        return None
+
+    started = time.perf_counter()
+    cache.leaderboard_track_writes()
+    try:
+        count = cache.leaderboard_replace(_player_pages())
+    finally:
+        touched = cache.leaderboard_take_touched()
+    if count is None:
+        return None
+
+    if touched:
+        cache.leaderboard_record_many(
+            (row['user_id'], row) for row in db.get_leaderboard_rows_for(touched)
+        )
+
+    elapsed = time.perf_counter() - started
+    STATS['reconciles'] += 1
+    STATS['last_reconcile_rows'] = count
+    STATS['last_reconcile_seconds'] = elapsed
+    logger.info(f"🏆 Leaderboards rebuilt: {count} players in {elapsed:.2f}s ({len(touched)} re-read)")
+    return count
+
+async def leaderboard_reconcile_job(context):
+    """Repeating job: rebuild the Redis leaderboards from Postgres."""
+    await asyncio.to_thread(reconcile)
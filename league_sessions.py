@@ -0,0 +1,176 @@
+"""
+⏳ LEAGUE SESSIONS - Persisted Inline League Games with a TTL
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Inline league games used to live only in a module dict: abandoned games
+were never removed, and a restart wiped live games whose entry fee had
+already been paid.
+
+- start() charges the fee and writes the session row in one transaction
+  (db.open_league_session); every move saves the state and pushes the
+  expiry back by SESSION_TTL_SECONDS
+- Sessions are served from memory; after a restart they are read back
+  from league_sessions on first use
+- State is a fixed set of small fields: the log and move history are
+  capped, and the player fields the battle screen shows are snapshotted
+  at start so rendering a turn never reads the player
+- settle() closes the game and applies its result in one transaction,
+  once per game, so a game can't be settled twice
+- league_session_sweep_job expires idle games (refund if no move was
+  made, a loss otherwise) and edits their message
+"""
+
+import asyncio
+import logging
+import time
+
+from telegram import InlineKeyboardMarkup, InlineKeyboardButton
+
+import database as db
+import outbound
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = 900          # idle time before a game expires
+SWEEP_INTERVAL_SECONDS = 60
+LOG_LINES = 3                      # battle log lines kept (the screen shows 3)
+MOVE_HISTORY = 2                   # player moves kept for the enemy AI
+
+# game_id -> state dict (see new_state)
+SESSIONS = {}
+
+STATS = {
+    'started': 0,
+    'restored': 0,
+    'settled': 0,
+    'expired': 0,
+    'stale_clicks': 0,
+    'redelivered': 0
+}
+
+# ═══════════════════════════════════════
+# STATE
+# ═══════════════════════════════════════
+
+def new_state(game_id, player, enemy_key, enemy_data, tier_key, inline_message_id=None):
+    """Initial state of a game, with the player fields the battle screen needs."""
+    return {
+        'game_id': game_id,
+        'player_id': player['user_id'],
+        'enemy_key': enemy_key,
+        'tier_key': tier_key,
+        'player_hp': 100,
+        'player_chakra': 100,
+        'enemy_hp': enemy_data['max_hp'],
+        'enemy_chakra': enemy_data['chakra'],
+        'turn': 1,
+        'seq': 0,                  # move number carried by the buttons (stale clicks are dropped)
+        'used_heal': False,
+        'log': [],
+        'player_move_history': [],
+        'username': player.get('username'),
+        'win_streak': player.get('win_streak', 0),
+        'league_points': player.get('league_points', 0),
+        'inline_message_id': inline_message_id,
+        'expires_at': time.time() + SESSION_TTL_SECONDS
+    }
+
+def push_log(state, line):
+    state['log'].append(line)
+    del state['log'][:-LOG_LINES]
+
+def push_move(state, move_type):
+    state['player_move_history'].append(move_type)
+    del state['player_move_history'][:-MOVE_HISTORY]
+
+# ═══════════════════════════════════════
+# LIFECYCLE
+# ═══════════════════════════════════════
+
+def start(state, tier_data):
+    """
+    Charge the entry fee, count the battle and persist the new game.
+    Returns 'opened', 'exists', 'refused' or None (database failure).
+    """
+    status = db.open_league_session(
+        state['game_id'], state['player_id'], tier_data['entry_fee'], tier_data['point_loss'],
+        tier_data['daily_battle_limit'], state, SESSION_TTL_SECONDS
+    )
+    if status == 'opened':
+        SESSIONS[state['game_id']] = state
+        STATS['started'] += 1
+    return status
+
+def get(game_id):
+    """State of a live game, or None if it ended or expired."""
+    state = SESSIONS.get(game_id)
+    if state is not None:
+        if state['expires_at'] > time.time():
+            return state
+        SESSIONS.pop(game_id, None)
+        return None
+
+    session = db.get_league_session(game_id)
+    if not session:
+        return None
+    state, remaining = session
+    state.setdefault('seq', 0)
+    state['expires_at'] = time.time() + remaining
+    SESSIONS[game_id] = state
+    STATS['restored'] += 1
+    return state
+
+def save(state):
+    """Persist a move and extend the game's life. False if the game is gone."""
+    state['expires_at'] = time.time() + SESSION_TTL_SECONDS
+    if db.save_league_session(state['game_id'], state, SESSION_TTL_SECONDS):
+        return True
+    SESSIONS.pop(state['game_id'], None)
+    return False
+
+def settle(game_id, player_id, settlement):
+    """
+    End a game and apply its result (ls.build_settlement) in one write.
+    Returns the player's new values - only for the caller that actually
+    closed the game - or None.
+    """
+    SESSIONS.pop(game_id, None)
+    result = db.settle_league_battle(game_id, player_id, settlement)
+    if result:
+        STATS['settled'] += 1
+    return result
+
+# ═══════════════════════════════════════
+# EXPIRY
+# ═══════════════════════════════════════
+
+def expired_text(refunded):
+    if refunded:
+        return (
+            "⌛ <b>BATTLE EXPIRED</b>\n\n"
+            "The battle was never fought - your entry fee was refunded."
+        )
+    return (
+        "⌛ <b>BATTLE EXPIRED</b>\n\n"
+        "You left the fight unfinished and it counts as a loss.\n"
+        "📉 League points lost, 🔥 win streak reset."
+    )
+
+async def league_session_sweep_job(context):
+    """Repeating job: settle idle games and tell their players."""
+    expired = await asyncio.to_thread(db.expire_league_sessions)
+    if not expired:
+        return
+
+    STATS['expired'] += len(expired)
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("🎮 Battle Again", switch_inline_query_current_chat="")]])
+    for game_id, inline_message_id, refunded in expired:
+        SESSIONS.pop(game_id, None)
+        if inline_message_id:
+            outbound.queue_edit(('inline', inline_message_id), expired_text(refunded), keyboard)
+
+def stats_text():
+    return (
+        f"  • League Games: **{len(SESSIONS):,}** live "
+        f"({STATS['started']:,} started, {STATS['restored']:,} restored, {STATS['expired']:,} expired)\n"
+        f"  • Dropped Clicks: **{STATS['stale_clicks']:,}** stale, **{STATS['redelivered']:,}** redelivered"
+    )
@@ -2,8 +2,12 @@
 League System - Battle League Rankings & Rewards
 Handles all league tier calculations, rewards, and progression
 """
+import bisect
+import functools
 import logging
 
+import game_logic as gl
+
 logger = logging.getLogger(__name__)
 
 # 🏆 LEAGUE TIER DEFINITIONS
@@ -108,6 +112,24 @@ STREAK_BONUSES = {
     10: {'ryo_multiplier': 3.0, 'name': 'LEGENDARY 10-STREAK!', 'emoji': '⚡🔥⚡', 'legendary_chance': 0.15}
 }
 
+# ⚡ COMPILED LOOKUPS
+# Tiers and streak bonuses are both threshold tables ({floor: value}):
+# compiled once into sorted floors so a lookup is a bisect instead of a
+# scan / sort on every profile, inline query and reward.
+
+def _compile_thresholds(thresholds):
+    floors = sorted(thresholds)
+    return floors, [thresholds[floor] for floor in floors]
+
+def _lookup_threshold(table, value):
+    """Value for the highest floor <= value, or None below the lowest floor."""
+    floors, values = table
+    i = bisect.bisect_right(floors, value) - 1
+    return values[i] if i >= 0 else None
+
+TIER_TABLE = _compile_thresholds({tier['min_points']: (key, tier) for key, tier in LEAGUE_TIERS.items()})
+STREAK_TABLE = _compile_thresholds(STREAK_BONUSES)
+
 # 📋 DAILY MISSIONS POOL
 DAILY_MISSIONS = [
     {
@@ -150,10 +172,19 @@ DAILY_MISSIONS = [
 
 def get_league_tier(points):
     """Get league tier based on points."""
-    for tier_key, tier_data in LEAGUE_TIERS.items():
-        if tier_data['min_points'] <= points <= tier_data['max_points']:
-            return tier_key, tier_data
-    return 'genin', LEAGUE_TIERS['genin']
+    return _lookup_threshold(TIER_TABLE, points) or ('genin', LEAGUE_TIERS['genin'])
+
+
+@functools.lru_cache(maxsize=64)
+def _league_fragment(tier_key, stars):
+    """Display strings for a (tier, star bucket) - there are only 25 of them."""
+    tier_data = LEAGUE_TIERS[tier_key]
+    return (
+        tier_data['name'],
+        tier_data['emoji'],
+        '⭐' * stars,
+        tier_data['max_points'] + 1 if tier_key != 'kage' else None
+    )
 
 
 def get_league_display(player):
@@ -166,15 +197,14 @@ def get_league_display(player):
     progress = points - tier_data['min_points']
     stars = min(5, max(1, int((progress / tier_range) * 5) + 1)) if tier_range > 0 else 1
     
-    star_display = '⭐' * stars
-    
+    tier_name, emoji, star_display, next_tier_points = _league_fragment(tier_key, stars)
     return {
         'tier_key': tier_key,
-        'tier_name': tier_data['name'],
-        'emoji': tier_data['emoji'],
+        'tier_name': tier_name,
+        'emoji': emoji,
         'points': points,
         'stars': star_display,
-        'next_tier_points': tier_data['max_points'] + 1 if tier_key != 'kage' else None
+        'next_tier_points': next_tier_points
     }
 
 
@@ -188,18 +218,10 @@ def calculate_battle_rewards(player, won, enemy_reward_base):
         base_ryo = enemy_reward_base
         
         # Apply streak multiplier
-        multiplier = 1.0
-        streak_bonus = None
+        streak_bonus = _lookup_threshold(STREAK_TABLE, streak)
+        multiplier = streak_bonus['ryo_multiplier'] if streak_bonus else 1.0
         bonus_items = []
         
-        if streak >= 3:
-            for streak_level in sorted(STREAK_BONUSES.keys(), reverse=True):
-                if streak >= streak_level:
-                    bonus_data = STREAK_BONUSES[streak_level]
-                    multiplier = bonus_data['ryo_multiplier']
-                    streak_bonus = bonus_data
-                    break
-        
         final_ryo = int(base_ryo * multiplier)
         base_exp = 50 + (tier_data['point_gain'] * 2)
         
@@ -235,74 +257,137 @@ def calculate_battle_rewards(player, won, enemy_reward_base):
         }
 
 
-def get_daily_missions(player):
-    """Get player's daily missions."""
-    import random
+def missions_need_reset(player):
+    """True if the player has no mission set yet or it is 24h+ old."""
     from datetime import datetime, timezone
     
-    # Check if missions need reset
+    missions_data = player.get('daily_missions_data') or {}
     last_reset = player.get('daily_missions_reset')
-    now = datetime.now(timezone.utc)
+    if not last_reset or not missions_data.get('missions'):
+        return True
     
-    # Reset if last reset was more than 24 hours ago or doesn't exist
-    needs_reset = True
-    if last_reset:
-        if isinstance(last_reset, str):
-            try:
-                last_reset = datetime.fromisoformat(last_reset)
-            except:
-                last_reset = None
-        
-        if last_reset and last_reset.tzinfo is None:
-            last_reset = last_reset.replace(tzinfo=timezone.utc)
-        
-        if last_reset:
-            hours_diff = (now - last_reset).total_seconds() / 3600
-            needs_reset = hours_diff >= 24
+    if isinstance(last_reset, str):
+        try:
+            last_reset = datetime.fromisoformat(last_reset)
+        except:
+            return True
+    if last_reset.tzinfo is None:
+        last_reset = last_reset.replace(tzinfo=timezone.utc)
+    
+    hours_diff = (datetime.now(timezone.utc) - last_reset).total_seconds() / 3600
+    return hours_diff >= 24
+
+
+def get_daily_missions(player):
+    """Get player's daily missions."""
+    import random
+    from datetime import datetime, timezone
     
-    if needs_reset:
+    if missions_need_reset(player):
         # Generate 3 random missions
         missions = random.sample(DAILY_MISSIONS, 3)
         return {
             'missions': missions,
             'progress': {m['id']: 0 for m in missions},
             'completed': [],
-            'reset_time': now
+            'reset_time': datetime.now(timezone.utc).isoformat()
         }
-    else:
-        # Return existing missions
-        return player.get('daily_missions_data', {
-            'missions': [],
-            'progress': {},
-            'completed': [],
-            'reset_time': last_reset
-        })
+    
+    # Return existing missions
+    return player['daily_missions_data']
+
 
+# League win -> missions it counts towards
+def won_battle_missions(game_state, new_streak):
+    """Mission ids a won league game progresses (by 1 each)."""
+    mission_ids = ['win_3']
+    if not game_state['used_heal']:
+        mission_ids.append('win_no_heal')
+    if game_state['player_hp'] >= 80:
+        mission_ids.append('perfect_win')
+    if new_streak >= 3:
+        mission_ids.append('win_streak_3')
+    return mission_ids
 
-def update_mission_progress(player, mission_type, amount=1):
-    """Update progress on daily missions."""
+
+def plan_mission_progress(player, mission_ids):
+    """
+    Progress on the player's daily missions, without touching the player.
+    Returns {
+        'fresh': the whole new mission set (progress applied) if it had to
+                 be rolled, else None - then only 'progress'/'completed'
+                 are written, as JSONB path updates,
+        'progress': ids to bump by 1,
+        'completed': missions that these bumps complete
+    }
+    """
+    fresh = missions_need_reset(player)
     missions_data = get_daily_missions(player)
     
+    progress = []
+    completed = []
     for mission in missions_data['missions']:
-        if mission['id'] == mission_type and mission['id'] not in missions_data['completed']:
-            missions_data['progress'][mission['id']] = missions_data['progress'].get(mission['id'], 0) + amount
-            
-            # Check if completed
-            if missions_data['progress'][mission['id']] >= mission['target']:
-                missions_data['completed'].append(mission['id'])
-                return {
-                    'completed': True,
-                    'mission': mission,
-                    'all_complete': len(missions_data['completed']) == 3
-                }
+        mission_id = mission['id']
+        if mission_id not in mission_ids or mission_id in missions_data['completed']:
+            continue
+        progress.append(mission_id)
+        if missions_data['progress'].get(mission_id, 0) + 1 >= mission['target']:
+            completed.append(mission)
+    
+    if fresh:
+        for mission_id in progress:
+            missions_data['progress'][mission_id] += 1
+        missions_data['completed'].extend(m['id'] for m in completed)
     
-    return {'completed': False}
+    return {
+        'fresh': missions_data if fresh else None,
+        'progress': progress,
+        'completed': completed
+    }
+
+
+def plan_won_missions(game_state, player):
+    """Mission progress of a won game, planned from the player's current row."""
+    new_streak = player.get('win_streak', 0) + 1
+    return plan_mission_progress(player, won_battle_missions(game_state, new_streak))
+
+
+def build_settlement(player, game_state, enemy_data, tier_data, won):
+    """
+    Everything a finished league game changes on the player, as deltas for
+    db.settle_league_battle: rewards, league points, streak and bonus items.
+    Daily missions are planned by db.settle_league_battle from the locked
+    player row ('missions' is the planner), so two games finishing at once
+    can't both complete (and pay) the same mission.
+    """
+    if not won:
+        return {
+            'won': False,
+            'ryo': 0,
+            'exp': 0,
+            'points': -tier_data['point_loss'],
+            'bonus_items': [],
+            'missions': None,
+            'reward_data': None
+        }
+    
+    reward_data = calculate_battle_rewards(player, True, enemy_data['base_reward'])
+    
+    return {
+        'won': True,
+        'ryo': reward_data['ryo'],
+        'exp': reward_data['exp'],
+        'points': reward_data['points'],
+        'bonus_items': reward_data['bonus_items'],
+        'missions': functools.partial(plan_won_missions, game_state),
+        'reward_data': reward_data
+    }
 
 
 def can_battle_today(player):
     """Check if player can battle today (hasn't hit daily limit)."""
     tier_key, tier_data = get_league_tier(player.get('league_points', 0))
-    battles_today = player.get('battles_today', 0)
+    battles_today = gl.get_daily_count(player, 'battles_today')
     
     return {
         'can_battle': battles_today < tier_data['daily_battle_limit'],
@@ -317,15 +402,14 @@ def get_streak_status(streak):
         return None
     
     # Find the highest achieved streak bonus
-    for streak_level in sorted(STREAK_BONUSES.keys(), reverse=True):
-        if streak >= streak_level:
-            bonus = STREAK_BONUSES[streak_level]
-            return {
-                'streak': streak,
-                'name': bonus['name'],
-                'emoji': bonus['emoji'],
-                'multiplier': bonus['ryo_multiplier']
-            }
+    bonus = _lookup_threshold(STREAK_TABLE, streak)
+    if bonus:
+        return {
+            'streak': streak,
+            'name': bonus['name'],
+            'emoji': bonus['emoji'],
+            'multiplier': bonus['ryo_multiplier']
+        }
     
     # Below minimum streak for bonuses
     return {
@@ -337,7 +421,7 @@ def get_streak_status(streak):
 
 
 def apply_weekly_rewards(player):
-    """Calculate and return weekly rewards for player's tier."""
+    """Calculate and return weekly rewards for player's tier (paid in bulk by league_weekly)."""
     tier_key, tier_data = get_league_tier(player.get('league_points', 0))
     rewards = tier_data['weekly_reward'].copy()
     
@@ -0,0 +1,133 @@
+"""
+📅 LEAGUE WEEKLY - Set-Based Weekly League Reward Settlement
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Every Monday each ranked player (league_points > 0) is paid their tier's
+weekly_reward (ls.LEAGUE_TIERS) for the week that just ended.
+
+- Players are paid in chunks of SETTLE_CHUNK_SIZE by user_id, one
+  statement per chunk (db.settle_weekly_league_chunk): tier lookup,
+  ledger insert and payout together, so each chunk holds its row locks
+  only briefly
+- league_weekly_settlements is the ledger: one row per (week, player);
+  only players newly inserted into it are paid
+- league_weekly_runs has one row per week: the user_id range fixed when
+  the week's run first started, a cursor moved with every chunk, and a
+  finished marker. A rerun resumes from the cursor inside that range;
+  a finished week is never scanned again, so players who became ranked
+  later aren't paid for it
+- A failed run is retried after SETTLE_RETRY_SECONDS, up to
+  SETTLE_RETRIES times
+- A startup job settles last week in case the bot was down on Monday or
+  stopped mid-way (nothing to do if the week is finished)
+"""
+
+import asyncio
+import datetime
+import logging
+import time
+from datetime import timezone
+
+import database as db
+import game_logic as gl
+import league_system as ls
+
+logger = logging.getLogger(__name__)
+
+SETTLE_CHUNK_SIZE = 2000
+SETTLE_DAY = 1                     # JobQueue days: 0 = Sunday, 1 = Monday
+SETTLE_TIME = datetime.time(0, 10, tzinfo=timezone.utc)
+REWARD_ITEM = 'health_potion'      # weekly_reward['items'] is a count of these
+SETTLE_RETRIES = 3
+SETTLE_RETRY_SECONDS = 300
+
+STATS = {
+    'last_week': None,
+    'last_paid': 0,
+    'last_seconds': 0.0
+}
+
+# ═══════════════════════════════════════
+# SETTLEMENT
+# ═══════════════════════════════════════
+
+def week_to_settle(today=None):
+    """Monday of the last complete week (weeks run Monday-Sunday, UTC)."""
+    today = today or gl.game_today()
+    return today - datetime.timedelta(days=today.weekday() + 7)
+
+def reward_tiers():
+    """(tier_key, min_points, ryo, exp, items) for every tier."""
+    return [
+        (tier_key, tier['min_points'], tier['weekly_reward']['ryo'],
+         tier['weekly_reward']['exp'], tier['weekly_reward']['items'])
+        for tier_key, tier in ls.LEAGUE_TIERS.items()
+    ]
+
+def settle_week(week_start, chunk_size=SETTLE_CHUNK_SIZE, min_user_id=0, max_user_id=None):
+    """
+    Pay every ranked player their weekly reward for week_start (once).
+    min_user_id/max_user_id bound the scan on the week's first run only.
+    Returns (players paid, seconds), or None if a chunk failed - the
+    ledger and the run cursor keep what was done, so running it again
+    finishes the week. A finished week returns (0, 0.0).
+    """
+    run = db.start_weekly_league_run(week_start, min_user_id, max_user_id)
+    if not run:
+        logger.error(f"📅 Weekly league settlement for {week_start} could not start")
+        return None
+    if run['finished']:
+        logger.info(f"📅 Weekly league rewards for {week_start} were already paid")
+        return 0, 0.0
+
+    tiers = reward_tiers()
+    started = time.perf_counter()
+    after_user_id = run['last_user_id']
+    paid = 0
+
+    while after_user_id is not None:
+        result = db.settle_weekly_league_chunk(
+            week_start, tiers, REWARD_ITEM, after_user_id, chunk_size, run['max_user_id']
+        )
+        if not result:
+            logger.error(f"📅 Weekly league settlement for {week_start} stopped after user {after_user_id}")
+            return None
+        after_user_id, chunk_paid = result
+        paid += chunk_paid
+
+    if not db.finish_weekly_league_run(week_start):
+        logger.error(f"📅 Weekly league settlement for {week_start} paid but not marked finished")
+        return None
+
+    elapsed = time.perf_counter() - started
+    STATS.update({'last_week': week_start, 'last_paid': paid, 'last_seconds': elapsed})
+    logger.info(f"📅 Weekly league rewards for {week_start}: {paid} players paid in {elapsed:.2f}s")
+    return paid, elapsed
+
+async def league_weekly_job(context):
+    """
+    Weekly job: pay the league rewards of the week that just ended.
+    Also runs as the startup catch-up and as its own retry; job.data holds
+    the week being settled and the attempt number.
+    """
+    data = context.job.data or {}
+    week_start = data.get('week_start') or week_to_settle()
+    attempt = data.get('attempt', 1)
+
+    if await asyncio.to_thread(settle_week, week_start) is not None:
+        return
+    if attempt > SETTLE_RETRIES:
+        logger.error(f"📅 Weekly league settlement for {week_start} gave up after {attempt} attempts")
+        return
+    logger.warning(f"📅 Retrying weekly league settlement for {week_start} in {SETTLE_RETRY_SECONDS}s")
+    context.job_queue.run_once(
+        league_weekly_job, when=SETTLE_RETRY_SECONDS,
+        data={'week_start': week_start, 'attempt': attempt + 1},
+        name=f"league_weekly_retry_{week_start}"
+    )
+
+async def league_weekly_catchup_job(context):
+    """
+    Startup job: settle last week if its run never finished - a week the
+    bot missed or stopped mid-way. A finished week is left alone.
+    """
+    await league_weekly_job(context)
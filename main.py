@@ -1,7 +1,7 @@
 import logging
 import json
 import asyncio 
-from datetime import timedelta, datetime, time
+from datetime import timedelta, datetime
 
 # Setup Logging FIRST
 logging.basicConfig(
@@ -32,7 +32,12 @@ import missions
 import training
 import jutsu
 import battle
+import battle_log
+import outbound
+import boss_engine
+import cooldowns
 import cache
+import media_cache
 import shop
 import help_handler
 import sudo       
@@ -41,10 +46,13 @@ import animations
 import minigames 
 import minigames_v2
 import leaderboard 
+import leaderboard_service
 import daily 
 # 🎮 UPDATED: New League Battle System imports
 import inline_handler_league
 import inline_handler_league_2
+import league_sessions
+import league_weekly
 import league_system
 import battle_enemies
 import auto_register  # 🔥 AUTO-REGISTRATION
@@ -113,9 +121,8 @@ async def on_new_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE
             reply_markup = InlineKeyboardMarkup(keyboard)
 
             try:
-                await context.bot.send_photo(
-                    chat_id=chat_id,
-                    photo=START_IMAGE_URL,
+                await media_cache.send_photo(
+                    context.bot, chat_id, START_IMAGE_URL,
                     caption=welcome_text,
                     reply_markup=reply_markup,
                     parse_mode="HTML"
@@ -158,15 +165,6 @@ async def global_error_handler(update: object, context: ContextTypes.DEFAULT_TYP
     # Send to log channel
     await data.log_error(update, context)
 
-# 🎮 NEW: Daily Battle Reset Job
-async def daily_battle_reset_job(context: ContextTypes.DEFAULT_TYPE):
-    """Reset daily battles counter at midnight."""
-    try:
-        db.reset_daily_battles()
-        logger.info("✅ Daily battles reset completed")
-    except Exception as e:
-        logger.error(f"Error in daily battle reset: {e}")
-
 async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Allows users to register directly in the group."""
     user = update.effective_user
@@ -176,7 +174,7 @@ async def register_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     keyboard = [[InlineKeyboardButton(name, callback_data=f"village_{key}")] for key, name in gl.VILLAGES.items()]
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_photo(photo=START_IMAGE_URL, caption=f"🥷 **Welcome, {user.mention_html()}!**\n\nTo begin your journey in the Shinobi World, you must choose your home village.\n\n**Choose wisely:**", reply_markup=reply_markup, parse_mode="HTML")
+    await media_cache.reply_photo(update.message, START_IMAGE_URL, caption=f"🥷 **Welcome, {user.mention_html()}!**\n\nTo begin your journey in the Shinobi World, you must choose your home village.\n\n**Choose wisely:**", reply_markup=reply_markup, parse_mode="HTML")
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -220,7 +218,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup = InlineKeyboardMarkup([[help_button], [summon_button, updates_button]])
         
         try:
-            await context.bot.send_photo(update.effective_chat.id, photo=START_IMAGE_URL, caption=welcome_text, parse_mode="HTML", reply_markup=reply_markup)
+            await media_cache.send_photo(context.bot, update.effective_chat.id, START_IMAGE_URL, caption=welcome_text, parse_mode="HTML", reply_markup=reply_markup)
         except Exception as e:
             logger.error(f"Failed to send start photo: {e}")
             await update.message.reply_text(welcome_text, parse_mode="HTML", reply_markup=reply_markup)
@@ -296,7 +294,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup = InlineKeyboardMarkup(village_keyboard)
         
         try:
-            await context.bot.send_photo(update.effective_chat.id, photo=START_IMAGE_URL, caption=welcome_text, parse_mode="HTML", reply_markup=reply_markup)
+            await media_cache.send_photo(context.bot, update.effective_chat.id, START_IMAGE_URL, caption=welcome_text, parse_mode="HTML", reply_markup=reply_markup)
         except Exception as e:
             logger.error(f"Failed to send start photo: {e}")
             await update.message.reply_text(welcome_text, parse_mode="HTML", reply_markup=reply_markup)
@@ -433,6 +431,7 @@ def main():
     logger.info("Starting bot...")
     db.create_tables()
     db.update_schema()
+    db.sweep_orphaned_escrows()  # No battles survive a restart; refund their bets
     app = Application.builder().token(BOT_TOKEN).build()
     
     # 🔥 Initialize group counter to 0 on bot start
@@ -484,6 +483,8 @@ def main():
     app.add_handler(CommandHandler("topkillers", leaderboard.topkillers_command))
     app.add_handler(CallbackQueryHandler(leaderboard.leaderboard_back_callback, pattern="^leaderboard_main$"))
     app.add_handler(CallbackQueryHandler(leaderboard.leaderboard_callback, pattern="^leaderboard_"))
+    app.add_handler(CommandHandler("rank", leaderboard.rank_command))
+    app.add_handler(CallbackQueryHandler(leaderboard.rank_callback, pattern="^rank_"))
 
     # RPG Modules
     app.add_handler(CommandHandler("missions", missions.missions_command))
@@ -497,6 +498,7 @@ def main():
 
     # Battle - /fight REMOVED, only /battle remains
     app.add_handler(CommandHandler("battle", battle.battle_command))
+    app.add_handler(CommandHandler("watch", battle.watch_command))
     app.add_handler(CallbackQueryHandler(battle.battle_invite_callback, pattern="^battle_invite_"))
     app.add_handler(CallbackQueryHandler(battle.battle_action_callback, pattern="^battle_action_")) 
     app.add_handler(CallbackQueryHandler(battle.battle_stance_callback, pattern="^battle_stance_"))
@@ -510,6 +512,7 @@ def main():
     app.add_handler(CommandHandler("sudo_give", sudo.sudo_give_command))
     app.add_handler(CommandHandler("sudo_set", sudo.sudo_set_command))
     app.add_handler(CommandHandler("list_boss_chats", sudo.list_boss_chats_command))
+    app.add_handler(CommandHandler("boss_cards", sudo.boss_cards_command))
     app.add_handler(CommandHandler("sudo_leave", sudo.sudo_leave_command))
     app.add_handler(CommandHandler("get_user", sudo.get_user_command))
     app.add_handler(CommandHandler("bot_stats", sudo.bot_stats_command))
@@ -517,7 +520,8 @@ def main():
     app.add_handler(CommandHandler("flushcache", sudo.flushcache_command))
     
     # 🎮 UPDATED: New League Battle System Inline Handlers
-    app.add_handler(InlineQueryHandler(inline_handler_league.inline_query_handler))
+    # block=False: queries run concurrently so the debouncer sees newer keystrokes
+    app.add_handler(InlineQueryHandler(inline_handler_league.inline_query_handler, block=False))
     
     # 🎮 NEW: League Battle Callback Handler (pattern: lb_ = league battle)
     app.add_handler(CallbackQueryHandler(inline_handler_league_2.league_battle_callback, pattern="^lb_"))
@@ -540,19 +544,91 @@ def main():
         spawn_system.trigger_spawn_on_message
     ), group=5)
     
+    # 📊 Chat membership for per-chat /rank (Group 6)
+    app.add_handler(MessageHandler(filters.ChatType.GROUPS, leaderboard.track_chat_member), group=6)
+    
     # 🔥 UPDATED: Now accepts TEXT AND STICKERS with CORRECT Filter
     app.add_handler(MessageHandler((filters.TEXT | filters.Sticker.ALL) & (~filters.COMMAND), ai_chat.naruto_chat_handler), group=2)
     
     # 🔥 NEW: Register Global Error Handler
     app.add_error_handler(global_error_handler)
     
-    # 🎮 NEW: Daily Battle Reset Job (runs at midnight)
+    # 🎮 battles_today needs no midnight reset: daily counters are (count, day)
+    # pairs that read as 0 once the day has passed (gl.get_daily_count)
     job_queue = app.job_queue
+
+    # 📜 Battle log batch flush (writes finished PvP battles to battle_history)
+    job_queue.run_repeating(
+        battle_log.flush_battle_log_job,
+        interval=battle_log.FLUSH_INTERVAL_SECONDS,
+        first=battle_log.FLUSH_INTERVAL_SECONDS
+    )
+    logger.info("✅ Battle log flush job scheduled")
+
+    # 💰 Refund bets held by battles that vanished (crash recovery)
+    job_queue.run_repeating(
+        battle.escrow_sweep_job,
+        interval=battle.ESCROW_SWEEP_INTERVAL_SECONDS,
+        first=battle.ESCROW_SWEEP_INTERVAL_SECONDS
+    )
+    logger.info("✅ Battle escrow sweep job scheduled")
+
+    # 📤 Outbound queue drain (spectator fan-out, broadcasts)
+    job_queue.run_repeating(
+        outbound.outbound_flush_job,
+        interval=outbound.TICK_SECONDS,
+        first=outbound.TICK_SECONDS
+    )
+    logger.info("✅ Outbound queue job scheduled")
+
+    # 💹 World boss damage flush (batched writes from the in-memory engine)
+    job_queue.run_repeating(
+        boss_engine.boss_flush_job,
+        interval=boss_engine.FLUSH_INTERVAL_SECONDS,
+        first=boss_engine.FLUSH_INTERVAL_SECONDS
+    )
+    logger.info("✅ Boss damage flush job scheduled")
+
+    # ⏳ Mirror new action cooldowns to Redis (survive restarts)
+    job_queue.run_repeating(
+        cooldowns.cooldown_flush_job,
+        interval=cooldowns.FLUSH_INTERVAL_SECONDS,
+        first=cooldowns.FLUSH_INTERVAL_SECONDS
+    )
+    logger.info("✅ Cooldown flush job scheduled")
+
+    # 🏆 Rebuild the Redis leaderboards from Postgres (drift repair; also seeds them at startup)
+    job_queue.run_repeating(
+        leaderboard_service.leaderboard_reconcile_job,
+        interval=leaderboard_service.RECONCILE_INTERVAL_SECONDS,
+        first=5
+    )
+    logger.info("✅ Leaderboard reconcile job scheduled")
+
+    # ⏳ Expire idle inline league games (refund unplayed ones, edit their message)
+    job_queue.run_repeating(
+        league_sessions.league_session_sweep_job,
+        interval=league_sessions.SWEEP_INTERVAL_SECONDS,
+        first=league_sessions.SWEEP_INTERVAL_SECONDS
+    )
+    logger.info("✅ League session sweep job scheduled")
+
+    # 📅 Weekly league rewards (Monday, for the week that ended; ledger makes reruns safe)
     job_queue.run_daily(
-        daily_battle_reset_job,
-        time=time(hour=0, minute=0, second=0)  # Midnight UTC
+        league_weekly.league_weekly_job,
+        time=league_weekly.SETTLE_TIME,
+        days=(league_weekly.SETTLE_DAY,)
+    )
+    job_queue.run_once(league_weekly.league_weekly_catchup_job, when=60)
+    logger.info("✅ Weekly league rewards job scheduled")
+
+    # 🏆 Shared league top-5 fragment for inline mode
+    job_queue.run_repeating(
+        inline_handler_league.league_top_refresh_job,
+        interval=inline_handler_league.LEAGUE_TOP_REFRESH_SECONDS,
+        first=1
     )
-    logger.info("✅ Daily battle reset job scheduled")
+    logger.info("✅ League top refresh job scheduled")
 
     logger.info("🔥 Bot is polling - OPTIMIZED & FAST with LEAGUE BATTLES! 🔥")
     app.run_polling()
@@ -0,0 +1,103 @@
+"""
+🖼️ MEDIA CACHE - Reuse Telegram file_ids for Repeated Media
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+The first time a photo (URL or local file) is sent, Telegram returns a
+file_id. Every later send of the same media uses that file_id instead of
+making Telegram re-fetch the URL or re-uploading the file.
+
+file_ids are kept in memory and persisted in a Redis hash so they survive
+restarts. If Telegram rejects a cached file_id, it is dropped and the
+original media is sent again.
+"""
+
+import logging
+import os
+
+from telegram.error import BadRequest
+
+import cache
+import outbound
+
+logger = logging.getLogger(__name__)
+
+FILE_IDS = {}  # media key -> file_id
+
+STATS = {
+    'uploads': 0,      # sent from URL/file (Telegram had to fetch it)
+    'reused': 0,       # sent by file_id (upload avoided)
+    'invalidated': 0   # cached file_id rejected, fell back to the source
+}
+
+def get_file_id(media_key):
+    file_id = FILE_IDS.get(media_key)
+    if file_id is None:
+        file_id = cache.get_media_file_id(media_key)
+        if file_id:
+            FILE_IDS[media_key] = file_id
+    return file_id
+
+def remember(media_key, message):
+    """Store the file_id of a sent photo message."""
+    if message and message.photo:
+        file_id = message.photo[-1].file_id
+        FILE_IDS[media_key] = file_id
+        cache.set_media_file_id(media_key, file_id)
+
+def forget(media_key):
+    FILE_IDS.pop(media_key, None)
+    cache.delete_media_file_id(media_key)
+
+def _load_source(media_key):
+    """Local files are read as bytes (re-sendable on retry); URLs pass through."""
+    if os.path.isfile(media_key):
+        with open(media_key, 'rb') as f:
+            return f.read()
+    return media_key
+
+async def send_photo(bot, chat_id, photo, rate_limited=False, **kwargs):
+    """
+    Drop-in for bot.send_photo where `photo` is a URL or local file path.
+    Raises FileNotFoundError for a missing local file (same as open()).
+    """
+    async def _send(photo_input):
+        if rate_limited:
+            return await outbound.run_limited(bot.send_photo, chat_id=chat_id, photo=photo_input, **kwargs)
+        return await bot.send_photo(chat_id=chat_id, photo=photo_input, **kwargs)
+
+    file_id = get_file_id(photo)
+    if file_id:
+        try:
+            message = await _send(file_id)
+            STATS['reused'] += 1
+            return message
+        except BadRequest as e:
+            # Only a rejected file_id means the cache entry is stale; any
+            # other bad request (caption, chat, markup) would fail the same
+            # way with a fresh upload
+            error = str(e).lower()
+            if 'wrong file identifier' not in error and 'file_id' not in error:
+                raise
+            logger.warning(f"Cached file_id for {photo} rejected ({e}), sending source again.")
+            STATS['invalidated'] += 1
+            forget(photo)
+
+    if not photo.startswith(('http://', 'https://')) and not os.path.isfile(photo):
+        raise FileNotFoundError(photo)
+
+    message = await _send(_load_source(photo))
+    STATS['uploads'] += 1
+    remember(photo, message)
+    return message
+
+async def reply_photo(message, photo, **kwargs):
+    """Drop-in for message.reply_photo(photo=...): replies in the message's thread."""
+    kwargs.setdefault('reply_to_message_id', message.message_id)
+    kwargs.setdefault('message_thread_id', message.message_thread_id)
+    return await send_photo(message.get_bot(), message.chat_id, photo, **kwargs)
+
+def stats_text():
+    return (
+        f"  • Uploads: **{STATS['uploads']:,}**\n"
+        f"  • Uploads Avoided: **{STATS['reused']:,}** ♻️\n"
+        f"  • Stale file_ids: **{STATS['invalidated']:,}**"
+    )
@@ -1,6 +1,5 @@
 import logging
 import asyncio
-import datetime 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
@@ -28,13 +27,7 @@ async def missions_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Registration failed. Try again.")
         return
 
-    today_date = datetime.date.today()
-    if player.get('last_mission_reset_date') != today_date:
-        player['daily_mission_count'] = 0
-        player['last_mission_reset_date'] = today_date
-        db.update_player(user.id, {'daily_mission_count': 0, 'last_mission_reset_date': today_date})
-    
-    missions_done = player.get('daily_mission_count', 0)
+    missions_done = gl.get_daily_count(player, 'daily_mission_count')
     
     text = (f"📜 --- **MISSION BOARD** --- 📜\nYou have completed **{missions_done} / {DAILY_MISSION_LIMIT}** missions today.\n\nSelect a mission to begin:\n")
     
@@ -80,13 +73,9 @@ async def mission_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     mission = gl.MISSIONS[mission_key]
+    original = db.snapshot_player(player)
     
-    today_date = datetime.date.today()
-    if player.get('last_mission_reset_date') != today_date:
-        player['daily_mission_count'] = 0
-        player['last_mission_reset_date'] = today_date
-        
-    missions_done = player.get('daily_mission_count', 0)
+    missions_done = gl.get_daily_count(player, 'daily_mission_count')
     if missions_done >= DAILY_MISSION_LIMIT:
         await query.edit_message_text(f"You have already completed your **{DAILY_MISSION_LIMIT}** missions for the day.\nRest up, ninja! New missions will be available tomorrow.")
         return
@@ -97,11 +86,10 @@ async def mission_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     temp_player_data['exp'] += mission['exp']
     temp_player_data['total_exp'] += mission['exp']
     temp_player_data['ryo'] += mission['ryo']
-    temp_player_data['daily_mission_count'] += 1
-    temp_player_data['last_mission_reset_date'] = today_date
+    gl.bump_daily_count(temp_player_data, 'daily_mission_count')
 
     final_player_data, leveled_up, messages = gl.check_for_level_up(temp_player_data)
-    success = db.update_player(user.id, final_player_data)
+    success = db.update_player(user.id, final_player_data, original=original)
 
     if success:
         result_text = (f"<b>--- MISSION COMPLETE ---</b>\nRewards: +{mission['exp']} EXP | +{mission['ryo']} Ryo 💰\n\n<i>Missions completed today: {temp_player_data['daily_mission_count']} / {DAILY_MISSION_LIMIT}</i>")
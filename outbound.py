@@ -0,0 +1,196 @@
+"""
+📤 OUTBOUND - Rate-Limited Telegram Send Queue
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Non-urgent messages (spectator views, broadcasts) are queued here and
+drained by a repeating job at a steady rate, so fan-out never blocks a
+handler or trips Telegram's flood limits.
+
+- Edits are coalesced per target: only the latest frame is sent.
+- Sends are delivered in FIFO order.
+- RetryAfter pushes the item back and pauses the queue.
+- run_limited() lets callers that need the result (e.g. a message_id)
+  make a call directly while sharing the same rate budget.
+
+Targets:
+    ('chat', chat_id, message_id)  - regular message
+    ('inline', inline_message_id)  - inline-mode message
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════
+# QUEUE STATE
+# ═══════════════════════════════════════
+
+PENDING_EDITS = OrderedDict()  # target -> (text, reply_markup)
+PENDING_SENDS = deque()        # (chat_id, text, reply_markup)
+
+TICK_SECONDS = 1.0
+RATE_PER_SECOND = 25  # Telegram allows ~30 messages/sec per bot
+MAX_PER_TICK = 25
+
+STATS = {
+    'queued': 0,
+    'coalesced': 0,
+    'delivered': 0,
+    'failed': 0,
+    'throttled': 0
+}
+
+_paused_until = 0.0
+_tokens = float(RATE_PER_SECOND)
+_last_refill = time.monotonic()
+
+# ═══════════════════════════════════════
+# RATE LIMIT (token bucket shared by the queue and run_limited)
+# ═══════════════════════════════════════
+
+def _refill():
+    global _tokens, _last_refill
+    now = time.monotonic()
+    _tokens = min(float(RATE_PER_SECOND), _tokens + (now - _last_refill) * RATE_PER_SECOND)
+    _last_refill = now
+
+def _try_take(count):
+    """Take up to `count` tokens without waiting; returns how many were taken."""
+    global _tokens
+    _refill()
+    taken = min(count, int(_tokens))
+    _tokens -= taken
+    return taken
+
+async def acquire():
+    """Wait for one send slot."""
+    global _tokens
+    while True:
+        wait = _paused_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+            continue
+        _refill()
+        if _tokens >= 1:
+            _tokens -= 1
+            return
+        await asyncio.sleep((1 - _tokens) / RATE_PER_SECOND)
+
+async def run_limited(func, *args, **kwargs):
+    """
+    Await a Bot API call under the shared rate limit and return its result.
+    Retries once after a RetryAfter.
+    """
+    global _paused_until
+    await acquire()
+    try:
+        return await func(*args, **kwargs)
+    except RetryAfter as e:
+        STATS['throttled'] += 1
+        wait = e.retry_after
+        if hasattr(wait, 'total_seconds'):
+            wait = wait.total_seconds()
+        _paused_until = max(_paused_until, time.monotonic() + float(wait))
+        await acquire()
+        return await func(*args, **kwargs)
+
+# ═══════════════════════════════════════
+# QUEUEING
+# ═══════════════════════════════════════
+
+def queue_edit(target, text, reply_markup=None):
+    """Queue an edit. A newer frame for the same target replaces the old one."""
+    if target in PENDING_EDITS:
+        STATS['coalesced'] += 1
+    else:
+        STATS['queued'] += 1
+    PENDING_EDITS[target] = (text, reply_markup)
+
+def queue_send(chat_id, text, reply_markup=None):
+    """Queue a new message."""
+    STATS['queued'] += 1
+    PENDING_SENDS.append((chat_id, text, reply_markup))
+
+def pending_count():
+    return len(PENDING_EDITS) + len(PENDING_SENDS)
+
+# ═══════════════════════════════════════
+# DELIVERY
+# ═══════════════════════════════════════
+
+async def _edit(bot, target, text, reply_markup):
+    if target[0] == 'inline':
+        await bot.edit_message_text(
+            inline_message_id=target[1], text=text,
+            reply_markup=reply_markup, parse_mode="HTML"
+        )
+    else:
+        await bot.edit_message_text(
+            chat_id=target[1], message_id=target[2], text=text,
+            reply_markup=reply_markup, parse_mode="HTML"
+        )
+
+async def _send(bot, chat_id, text, reply_markup):
+    await bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup, parse_mode="HTML")
+
+async def outbound_flush_job(context):
+    """Repeating job: deliver up to MAX_PER_TICK queued items concurrently."""
+    global _paused_until
+
+    if time.monotonic() < _paused_until or not pending_count():
+        return
+
+    budget = _try_take(min(MAX_PER_TICK, pending_count()))
+
+    sends = []
+    while PENDING_SENDS and len(sends) < budget:
+        sends.append(PENDING_SENDS.popleft())
+
+    edits = []
+    while PENDING_EDITS and len(sends) + len(edits) < budget:
+        edits.append(PENDING_EDITS.popitem(last=False))
+
+    if not sends and not edits:
+        return
+
+    bot = context.bot
+    results = await asyncio.gather(
+        *(_send(bot, *item) for item in sends),
+        *(_edit(bot, target, *frame) for target, frame in edits),
+        return_exceptions=True
+    )
+
+    retry_after = 0
+    throttled_sends = []
+    for i, result in enumerate(results):
+        if not isinstance(result, Exception):
+            STATS['delivered'] += 1
+            continue
+
+        if isinstance(result, RetryAfter):
+            STATS['throttled'] += 1
+            wait = result.retry_after
+            if hasattr(wait, 'total_seconds'):
+                wait = wait.total_seconds()
+            retry_after = max(retry_after, float(wait))
+            if i < len(sends):
+                throttled_sends.append(sends[i])
+            else:
+                target, frame = edits[i - len(sends)]
+                # Keep any newer frame queued meanwhile
+                PENDING_EDITS.setdefault(target, frame)
+        elif isinstance(result, BadRequest) and "not modified" in str(result):
+            STATS['delivered'] += 1
+        else:
+            STATS['failed'] += 1
+            logger.warning(f"Outbound delivery failed: {result}")
+
+    PENDING_SENDS.extendleft(reversed(throttled_sends))
+
+    if retry_after:
+        _paused_until = time.monotonic() + retry_after
+        logger.warning(f"📤 Outbound queue throttled for {retry_after:.1f}s")
@@ -6,6 +6,7 @@ import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import database as db
+import media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -120,9 +121,8 @@ async def spawn_character(chat_id, context):
     )
     
     try:
-        msg = await context.bot.send_photo(
-            chat_id=chat_id,
-            photo=char['image'],
+        msg = await media_cache.send_photo(
+            context.bot, chat_id, char['image'],
             caption=caption,
             parse_mode="Markdown"
         )
@@ -138,9 +138,8 @@ async def spawn_character(chat_id, context):
         # Fallback image if main fails
         try:
             fallback = "https://upload.wikimedia.org/wikipedia/en/c/c7/Naruto_logo.svg"
-            msg = await context.bot.send_photo(
-                chat_id=chat_id,
-                photo=fallback,
+            msg = await media_cache.send_photo(
+                context.bot, chat_id, fallback,
                 caption=caption + "\n\n*(Image failed, but you can still catch!)*",
                 parse_mode="Markdown"
             )
@@ -0,0 +1,88 @@
+"""
+👀 SPECTATOR - Battle Read Model for Watchers
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Spectators subscribe a message (in any chat, or an inline message) to an
+active PvP battle. Each time the battle view changes, the spectator frame
+is rendered ONCE and fanned out to every subscriber through the outbound
+queue - so cost per turn doesn't grow with the number of viewers.
+
+State lives on the battle_state dict:
+    battle_state['spectators']      -> {target: True}
+    battle_state['spectator_view']  -> (base_text, rendered frame)
+"""
+
+import logging
+
+import outbound
+
+logger = logging.getLogger(__name__)
+
+MAX_SPECTATORS = 50
+
+STATS = {
+    'renders': 0,
+    'fanout': 0
+}
+
+# ═══════════════════════════════════════
+# SUBSCRIPTIONS
+# ═══════════════════════════════════════
+
+def subscribe(battle_state, target):
+    """Add a spectator target. Returns False when the battle is full."""
+    spectators = battle_state.setdefault('spectators', {})
+    if target not in spectators and len(spectators) >= MAX_SPECTATORS:
+        return False
+    spectators[target] = True
+    return True
+
+def unsubscribe(battle_state, target):
+    battle_state.get('spectators', {}).pop(target, None)
+
+def spectator_count(battle_state):
+    return len(battle_state.get('spectators', {}))
+
+# ═══════════════════════════════════════
+# RENDER & FAN-OUT
+# ═══════════════════════════════════════
+
+def render_view(battle_state):
+    """
+    Spectator frame for the battle's current view.
+    Rebuilt only when base_text changes; otherwise the cached frame is reused.
+    """
+    base_text = battle_state.get('base_text', '')
+    cached = battle_state.get('spectator_view')
+    if cached and cached[0] == base_text:
+        return cached[1]
+
+    STATS['renders'] += 1
+    frame = f"👀 <b>SPECTATING</b>\n\n{base_text}"
+    battle_state['spectator_view'] = (base_text, frame)
+    return frame
+
+def publish(battle_state):
+    """Push the current view to all spectators (no-op without subscribers)."""
+    spectators = battle_state.get('spectators')
+    if not spectators:
+        return
+
+    cached = battle_state.get('spectator_view')
+    if cached and cached[0] == battle_state.get('base_text', ''):
+        return  # Spectators already have this frame
+
+    frame = render_view(battle_state)
+    for target in spectators:
+        outbound.queue_edit(target, frame)
+    STATS['fanout'] += len(spectators)
+
+def publish_result(battle_state, result_text):
+    """Send the final result to all spectators and drop the subscriptions."""
+    spectators = battle_state.pop('spectators', None)
+    if not spectators:
+        return
+
+    frame = f"👀 <b>BATTLE OVER</b>\n\n{result_text}"
+    for target in spectators:
+        outbound.queue_edit(target, frame)
+    STATS['fanout'] += len(spectators)
@@ -11,6 +11,9 @@ from telegram.ext import ContextTypes
 
 import database as db
 import game_logic as gl
+import inline_handler_league
+import league_sessions
+import media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -160,6 +163,23 @@ async def list_boss_chats_command(update: Update, context: ContextTypes.DEFAULT_
     finally:
         db.put_db_connection(conn)
 
+@owner_only
+async def boss_cards_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Boss card edit metrics per chat (coalesced renderer)."""
+    import world_boss
+    rows = world_boss.card_stats()
+    if not rows:
+        await update.message.reply_text("No boss cards rendered since startup.")
+        return
+    
+    lines = [f"💹 **Boss Card Edits** (window {world_boss.CARD_WINDOW_SECONDS}s)\n"]
+    for row in rows[:15]:
+        lines.append(
+            f"`{row['chat_id']}`: {row['requests']} req → {row['edits']} edits "
+            f"({row['edits_per_min']:.1f}/min), {row['unchanged']} skipped, {row['failed']} failed"
+        )
+    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+
 @owner_only
 async def sudo_leave_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try: 
@@ -360,6 +380,13 @@ async def bot_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"  • Total Ryo Circulation: **{total_ryo:,}**\n"
             f"  • Messages Today: **{messages_today:,}** 💬\n\n"
             
+            f"🖼️ **MEDIA CACHE:**\n"
+            f"{media_cache.stats_text()}\n\n"
+            
+            f"🔎 **INLINE MODE:**\n"
+            f"{inline_handler_league.stats_text()}\n"
+            f"{league_sessions.stats_text()}\n\n"
+            
             f"🖥️ **SERVER STATUS:**\n"
             f"  {server_stats_text}\n\n"
             
@@ -1,6 +1,5 @@
 import logging
 import asyncio
-import datetime 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
@@ -59,16 +58,12 @@ async def training_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.edit_message_text("Error: Invalid training type.")
         return
 
+    original = db.snapshot_player(player)
     player_data = dict(player) 
     
-    today_date = datetime.date.today() # Use date object directly for comparison if DB returns date object
     TRAINING_LIMIT = 2
 
-    if player_data.get('last_train_reset_date') != today_date:
-        player_data['daily_train_count'] = 0
-        player_data['last_train_reset_date'] = today_date
-    
-    if player_data.get('daily_train_count', 0) >= TRAINING_LIMIT:
+    if gl.get_daily_count(player_data, 'daily_train_count') >= TRAINING_LIMIT:
         await query.edit_message_text(f"🧘 You have reached your daily training limit of {TRAINING_LIMIT} per day. Come back tomorrow!", parse_mode="HTML", reply_markup=None); return
     
     try:
@@ -82,8 +77,8 @@ async def training_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     player_data['current_hp'] = player_data['max_hp']
     player_data['current_chakra'] = player_data['max_chakra']
-    player_data['daily_train_count'] += 1
+    gl.bump_daily_count(player_data, 'daily_train_count')
 
-    success = db.update_player(user.id, player_data)
+    success = db.update_player(user.id, player_data, original=original)
     if success: await query.message.reply_text(f"<b>Training Complete!</b>\n{training_info['reward_text']}", parse_mode="HTML")
     else: await query.message.reply_text("An error occurred while saving your training gains.")
@@ -14,6 +14,10 @@ from collections import Counter
 import database as db
 import game_logic as gl
 import animations as anim 
+import boss_engine
+import cooldowns
+import outbound
+import media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +28,7 @@ KUNAI_COOLDOWN_SECONDS = 45
 JUTSU_COOLDOWN_SECONDS = 180 
 FAINT_LOCKOUT_HOURS = 1
 ACTIVE_BOSS_MESSAGES = {} 
+SPAWN_SHARD_SIZE = 100    # chats per bulk upsert / announcement wave
 
 # --- Helper Functions ---
 def get_boss_battle_text(boss_status, boss_info, chat_id):
@@ -43,8 +48,21 @@ def get_boss_battle_text(boss_status, boss_info, chat_id):
     text += "\nChoose your attack:"
     return text
 
-async def send_or_edit_boss_message(context: ContextTypes.DEFAULT_TYPE, chat_id, boss_status, boss_info):
-    text = get_boss_battle_text(boss_status, boss_info, chat_id)
+async def _send_boss_photo(context: ContextTypes.DEFAULT_TYPE, chat_id, image_path, caption, reply_markup):
+    """
+    Send the boss photo (file_id reused via media_cache after the first upload).
+    Returns the Message, or None if the image is missing.
+    """
+    try:
+        return await media_cache.send_photo(
+            context.bot, chat_id, image_path, rate_limited=True,
+            caption=caption, reply_markup=reply_markup, parse_mode="HTML"
+        )
+    except FileNotFoundError:
+        logger.error(f"Boss image not found at {image_path}. Sending text only.")
+        return None
+
+def _boss_keyboard():
     keyboard = [
         [
             InlineKeyboardButton("⚔️ Taijutsu", callback_data="wb_action_taijutsu"), 
@@ -55,45 +73,128 @@ async def send_or_edit_boss_message(context: ContextTypes.DEFAULT_TYPE, chat_id,
             InlineKeyboardButton("📊 Status Update", callback_data="wb_action_status") 
         ]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return InlineKeyboardMarkup(keyboard)
+
+BOSS_KEYBOARD = _boss_keyboard()
+
+async def send_or_edit_boss_message(context: ContextTypes.DEFAULT_TYPE, chat_id, boss_status, boss_info):
+    text = get_boss_battle_text(boss_status, boss_info, chat_id)
+    reply_markup = BOSS_KEYBOARD
     message_id = ACTIVE_BOSS_MESSAGES.get(chat_id)
+    card = _card(chat_id)
+    
+    if message_id and card['caption'] == text:
+        card['unchanged'] += 1
+        return
     
     try:
         if message_id:
-            await context.bot.edit_message_caption( 
+            await outbound.run_limited(
+                context.bot.edit_message_caption,
                 chat_id=chat_id, message_id=message_id, caption=text,
                 reply_markup=reply_markup, parse_mode="HTML"
             )
+            card['edits'] += 1
         else:
             image_path = boss_info.get('image', 'images/default_boss.png') 
-            try:
-                with open(image_path, 'rb') as f:
-                    pass 
-                photo_input = open(image_path, 'rb')
-            except FileNotFoundError:
-                logger.error(f"Boss image not found at {image_path}. Sending text only.")
-                photo_input = None 
+            message = await _send_boss_photo(context, chat_id, image_path, text, reply_markup)
             
-            if photo_input:
-                message = await context.bot.send_photo(
-                    chat_id=chat_id, photo=photo_input, 
-                    caption=text, reply_markup=reply_markup, parse_mode="HTML"
-                )
+            if message:
                 ACTIVE_BOSS_MESSAGES[chat_id] = message.message_id 
                 logger.info(f"Sent new boss message for chat {chat_id}, msg_id: {message.message_id}")
-                photo_input.close()
             else: 
-                message = await context.bot.send_message(
+                message = await outbound.run_limited(
+                    context.bot.send_message,
                     chat_id=chat_id, text=text, reply_markup=reply_markup, parse_mode="HTML"
                 )
                 logger.warning(f"Sent boss message as text due to missing image for chat {chat_id}")
                 ACTIVE_BOSS_MESSAGES[chat_id] = message.message_id
+        card['caption'] = text
     except Exception as e:
-        if "Message is not modified" not in str(e): 
+        if "Message is not modified" in str(e):
+            card['caption'] = text
+            card['unchanged'] += 1
+        else:
             logger.error(f"Error sending/editing boss message for chat {chat_id}: {e}")
+            card['failed'] += 1
+            card['caption'] = None
             if chat_id in ACTIVE_BOSS_MESSAGES:
                 del ACTIVE_BOSS_MESSAGES[chat_id]
 
+# ═══════════════════════════════════════
+# BOSS CARD RENDERER (coalesced edits)
+# ═══════════════════════════════════════
+# Attacks don't edit the boss card directly. They mark it for an update,
+# and every chat gets at most one edit per CARD_WINDOW_SECONDS carrying the
+# latest state. Edits whose caption matches what the message already shows
+# are skipped.
+
+CARD_WINDOW_SECONDS = 1.5
+
+# chat_id -> {'caption', 'pending', 'requests', 'edits', 'unchanged', 'failed', 'since'}
+BOSS_CARDS = {}
+
+def _card(chat_id):
+    card = BOSS_CARDS.get(chat_id)
+    if card is None:
+        card = BOSS_CARDS[chat_id] = {
+            'caption': None, 'pending': False,
+            'requests': 0, 'edits': 0, 'unchanged': 0, 'failed': 0,
+            'since': time.monotonic()
+        }
+    return card
+
+def request_card_update(context: ContextTypes.DEFAULT_TYPE, chat_id, overwritten=False):
+    """
+    Schedule a boss card refresh for the end of the current window.
+    Pass overwritten=True when something else (an attack animation) has
+    changed the message, so the next render is sent even if the card is unchanged.
+    """
+    card = _card(chat_id)
+    card['requests'] += 1
+    if overwritten:
+        card['caption'] = None
+    if card['pending']:
+        return
+    
+    card['pending'] = True
+    context.job_queue.run_once(_card_flush_job, CARD_WINDOW_SECONDS, data=chat_id)
+
+async def _card_flush_job(context: ContextTypes.DEFAULT_TYPE):
+    chat_id = context.job.data
+    card = BOSS_CARDS.get(chat_id)
+    if card is None:
+        return  # Reset (boss defeated / message replaced) while waiting
+    card['pending'] = False
+    
+    boss_status = boss_engine.get_status(chat_id)
+    if not boss_status or not boss_status['is_active']:
+        return
+    boss_info = gl.WORLD_BOSSES.get(boss_status['boss_key'])
+    if boss_info:
+        await send_or_edit_boss_message(context, chat_id, boss_status, boss_info)
+
+def reset_card(chat_id):
+    """Forget the card when its message is replaced or the boss is gone."""
+    BOSS_CARDS.pop(chat_id, None)
+
+def card_stats():
+    """Per-chat edit metrics, busiest chats first."""
+    now = time.monotonic()
+    rows = []
+    for chat_id, card in BOSS_CARDS.items():
+        minutes = max((now - card['since']) / 60, 1 / 60)
+        rows.append({
+            'chat_id': chat_id,
+            'requests': card['requests'],
+            'edits': card['edits'],
+            'unchanged': card['unchanged'],
+            'failed': card['failed'],
+            'edits_per_min': card['edits'] / minutes
+        })
+    rows.sort(key=lambda row: row['requests'], reverse=True)
+    return rows
+
 async def enable_world_boss_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat = update.effective_chat
     user = update.effective_user
@@ -127,7 +228,7 @@ async def enable_world_boss_command(update: Update, context: ContextTypes.DEFAUL
 
 async def boss_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
-    boss_status = db.get_boss_status(chat_id)
+    boss_status = boss_engine.get_status(chat_id)
     
     if not boss_status or not boss_status['is_active']:
         await update.message.reply_text("There is no active World Boss in this chat right now.")
@@ -139,6 +240,7 @@ async def boss_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     old_message_id = ACTIVE_BOSS_MESSAGES.pop(chat_id, None)
+    reset_card(chat_id)
     if old_message_id:
         try:
             await context.bot.delete_message(chat_id=chat_id, message_id=old_message_id)
@@ -147,6 +249,35 @@ async def boss_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     await send_or_edit_boss_message(context, chat_id, boss_status, boss_info)
 
+# ═══════════════════════════════════════
+# DAMAGE FORMULAS (shared with boss_sim.py)
+# ═══════════════════════════════════════
+# Each returns (damage, is_crit, recoil_damage). `rng` is anything with
+# randint()/random() - the random module, or a seeded random.Random.
+
+def roll_taijutsu(total_stats, boss_info, rng=random):
+    base_damage = total_stats['strength'] * 2
+    damage_dealt = rng.randint(int(base_damage * 0.8), int(base_damage * 1.2))
+    is_crit = rng.random() < 0.1
+    final_damage = int(damage_dealt * (2.0 if is_crit else 1.0))
+    recoil_damage = int(total_stats['max_hp'] * boss_info['taijutsu_recoil'])
+    return final_damage, is_crit, recoil_damage
+
+def roll_throw_kunai(level, total_stats, boss_info, rng=random):
+    damage_dealt = rng.randint(8, 12) + level
+    is_crit = rng.random() < 0.08
+    final_damage = int(damage_dealt * (1.8 if is_crit else 1.0))
+    recoil_damage = int(total_stats['max_hp'] * boss_info['taijutsu_recoil'])
+    return final_damage, is_crit, recoil_damage
+
+def roll_jutsu(jutsu_info, total_stats, boss_info, rng=random):
+    base_damage = jutsu_info['power'] + (total_stats['intelligence'] * 2.5)
+    damage_dealt = rng.randint(int(base_damage * 0.9), int(base_damage * 1.1))
+    is_crit = rng.random() < 0.15
+    final_damage = int(damage_dealt * (2.5 if is_crit else 1.0))
+    recoil_damage = int(total_stats['max_hp'] * boss_info['jutsu_recoil'])
+    return final_damage, is_crit, recoil_damage
+
 # ✅ FIXED: Cooldown check with proper timezone handling
 def _check_cooldown(player_data, cooldown_duration_seconds):
     """Checks if a player is on cooldown. Returns (can_act, remaining_seconds)."""
@@ -199,6 +330,11 @@ def _check_cooldown(player_data, cooldown_duration_seconds):
     else:
         return True, 0
 
+def _cooldown_text(remaining_seconds):
+    if remaining_seconds >= 60:
+        return f"⏳ On cooldown! Wait {remaining_seconds / 60:.1f} minutes."
+    return f"⏳ On cooldown! Wait {remaining_seconds:.1f} seconds."
+
 # --- Callback Handlers for Buttons ---
 async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handles main boss action buttons: Taijutsu, Throw Kunai, Jutsu, Status."""
@@ -207,13 +343,21 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     action = "_".join(query.data.split('_')[2:])
     user = query.from_user
     chat_id = query.message.chat_id
+    
+    # Reject button mashing before touching Redis/DB
+    if action != "status":
+        can_act, remaining_seconds = cooldowns.check('boss', user.id, 'attack')
+        if not can_act:
+            await query.answer(_cooldown_text(remaining_seconds), show_alert=True)
+            return
+    
     player_data = db.get_player(user.id)
     
     if not player_data:
         await query.answer("You need to /start your journey first!", show_alert=True)
         return
 
-    boss_status = db.get_boss_status(chat_id)
+    boss_status = boss_engine.get_status(chat_id)
     if not boss_status or not boss_status['is_active']:
         await query.answer("The World Boss is no longer active.", show_alert=True)
         try:
@@ -229,7 +373,7 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
          
     if action == "status":
         await query.answer("Status refreshed!", show_alert=False) 
-        await send_or_edit_boss_message(context, chat_id, boss_status, boss_info)
+        request_card_update(context, chat_id)
         return
         
     # --- Action is Attack - Perform Checks FIRST ---
@@ -250,14 +394,13 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
     
     cooldown_check, remaining_seconds = _check_cooldown(player_data, cooldown_seconds)
     if not cooldown_check:
-        time_unit = "seconds"
-        time_val = remaining_seconds
-        if cooldown_seconds == JUTSU_COOLDOWN_SECONDS:
-            time_unit = "minutes"
-            time_val = remaining_seconds / 60
-        await query.answer(f"⏳ On cooldown! Wait {time_val:.1f} {time_unit}.", show_alert=True)
+        cooldowns.start('boss', user.id, 'attack', remaining_seconds)
+        await query.answer(_cooldown_text(remaining_seconds), show_alert=True)
         return
     
+    if action != "jutsu":
+        cooldowns.start('boss', user.id, 'attack', cooldown_seconds)
+    
     player_total_stats = gl.get_total_stats(player_data)
     
     battle_state_for_anim = {
@@ -278,11 +421,7 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.answer()
         await anim.edit_battle_message(context, battle_state_for_anim, f"{battle_state_for_anim['base_text']}\n\n<i>Processing attack...</i>", reply_markup=None)
         
-        base_damage = player_total_stats['strength'] * 2
-        damage_dealt = random.randint(int(base_damage * 0.8), int(base_damage * 1.2))
-        is_crit = random.random() < 0.1
-        final_damage = int(damage_dealt * (2.0 if is_crit else 1.0))
-        recoil_damage = int(player_total_stats['max_hp'] * boss_info['taijutsu_recoil'])
+        final_damage, is_crit, recoil_damage = roll_taijutsu(player_total_stats, boss_info)
         player_data['current_hp'] -= recoil_damage
         boss_defender_sim = {'username': boss_info['name']} 
         
@@ -293,10 +432,7 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.answer()
         await anim.edit_battle_message(context, battle_state_for_anim, f"{battle_state_for_anim['base_text']}\n\n<i>Processing attack...</i>", reply_markup=None)
         
-        damage_dealt = random.randint(8, 12) + player_data['level'] 
-        is_crit = random.random() < 0.08 
-        final_damage = int(damage_dealt * (1.8 if is_crit else 1.0))
-        recoil_damage = int(player_total_stats['max_hp'] * boss_info['taijutsu_recoil']) 
+        final_damage, is_crit, recoil_damage = roll_throw_kunai(player_data['level'], player_total_stats, boss_info)
         player_data['current_hp'] -= recoil_damage
         boss_defender_sim = {'username': boss_info['name']}
         
@@ -334,7 +470,7 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         if available_jutsus == 0:
             await anim.edit_battle_message(context, battle_state_for_anim, f"{battle_state_for_anim['base_text']}\n\n<i>Not enough Chakra for any Jutsu!</i>")
             await asyncio.sleep(2) 
-            await send_or_edit_boss_message(context, chat_id, boss_status, boss_info)
+            request_card_update(context, chat_id, overwritten=True)
             return 
         
         keyboard.append([InlineKeyboardButton("Cancel", callback_data="boss_usejutsu_cancel")])
@@ -343,7 +479,7 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
 
     # --- Update DB after Taijutsu or Throw Kunai ---
     if action in ["taijutsu", "throw_kunai"]:
-        boss_defeated, new_boss_hp = _update_boss_and_player_damage(chat_id, user.id, player_data['username'], final_damage, boss_status)
+        boss_defeated, new_boss_hp = boss_engine.apply_hit(chat_id, user.id, player_data['username'], final_damage)
         player_updates = {
             'current_hp': max(1, player_data['current_hp']), 
             'boss_attack_cooldown': new_cooldown_time_iso
@@ -362,39 +498,41 @@ async def boss_action_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         await anim.edit_battle_message(context, battle_state_for_anim, final_text, reply_markup=None)
         await asyncio.sleep(2.5) 
 
-    if not boss_defeated and action != "jutsu":
-        updated_boss_status = db.get_boss_status(chat_id)
-        if updated_boss_status and updated_boss_status['is_active']:
-            await send_or_edit_boss_message(context, chat_id, updated_boss_status, boss_info)
-        else:
-            boss_defeated = True 
-
+    # Only the hit that killed the boss processes the defeat
     if boss_defeated:
-        final_boss_status = db.get_boss_status(chat_id)
-        await _process_boss_defeat(context, chat_id, final_boss_status if final_boss_status else boss_status, boss_info)
+        await _process_boss_defeat(context, chat_id, boss_engine.get_status(chat_id) or boss_status, boss_info)
         if chat_id in ACTIVE_BOSS_MESSAGES:
             del ACTIVE_BOSS_MESSAGES[chat_id]
+        reset_card(chat_id)
+    elif action != "jutsu":
+        request_card_update(context, chat_id, overwritten=True)
 
 async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     user = query.from_user
     chat_id = query.message.chat_id
+    parts = query.data.split('_')
+    jutsu_key = "_".join(parts[2:]) 
+    
+    if jutsu_key not in ("cancel", "nochakra"):
+        can_act, remaining_seconds = cooldowns.check('boss', user.id, 'attack')
+        if not can_act:
+            await query.answer(f"⏳ On Jutsu cooldown! Wait {remaining_seconds / 60:.1f} minutes.", show_alert=True)
+            return
+    
     player_data = db.get_player(user.id)
     
     if not player_data:
         await query.answer("Error: Player data not found.", show_alert=True)
         return
     
-    parts = query.data.split('_')
-    jutsu_key = "_".join(parts[2:]) 
-    
     if jutsu_key == "cancel":
         await query.answer()
-        boss_status = db.get_boss_status(chat_id)
+        boss_status = boss_engine.get_status(chat_id)
         if boss_status and boss_status['is_active']:
             boss_info = gl.WORLD_BOSSES.get(boss_status['boss_key'])
             if boss_info:
-                await send_or_edit_boss_message(context, chat_id, boss_status, boss_info)
+                request_card_update(context, chat_id, overwritten=True)
         else:
             await query.edit_message_caption(caption="Boss fight ended.", reply_markup=None) 
         return
@@ -414,6 +552,8 @@ async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     cooldown_check, remaining_seconds = _check_cooldown(player_data, JUTSU_COOLDOWN_SECONDS)
     if not cooldown_check:
+        if player_data['current_hp'] > 1:
+            cooldowns.start('boss', user.id, 'attack', remaining_seconds)
         await query.answer(f"⏳ On Jutsu cooldown! Wait {remaining_seconds / 60:.1f} minutes.", show_alert=True)
         return
     
@@ -421,7 +561,7 @@ async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer(f"😵 You are fainted! Cannot use Jutsu.", show_alert=True)
         return
     
-    boss_status = db.get_boss_status(chat_id)
+    boss_status = boss_engine.get_status(chat_id)
     if not boss_status or not boss_status['is_active']:
         await query.answer("The World Boss was defeated before you could attack!", show_alert=True)
         await query.edit_message_caption(caption="Boss fight ended.", reply_markup=None)
@@ -432,6 +572,7 @@ async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer("Error finding boss info.", show_alert=True)
         return
     
+    cooldowns.start('boss', user.id, 'attack', JUTSU_COOLDOWN_SECONDS)
     await query.answer() 
     
     battle_state_for_anim = {
@@ -445,12 +586,8 @@ async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     await anim.edit_battle_message(context, battle_state_for_anim, f"{battle_state_for_anim['base_text']}\n\n<i>Processing Jutsu...</i>", reply_markup=None)
     
     player_total_stats = gl.get_total_stats(player_data) 
-    base_damage = jutsu_info['power'] + (player_total_stats['intelligence'] * 2.5)
-    damage_dealt = random.randint(int(base_damage * 0.9), int(base_damage * 1.1))
-    is_crit = random.random() < 0.15
-    final_damage = int(damage_dealt * (2.5 if is_crit else 1.0))
+    final_damage, is_crit, recoil_damage = roll_jutsu(jutsu_info, player_total_stats, boss_info)
     damage_data = (final_damage, is_crit, False) 
-    recoil_damage = int(player_total_stats['max_hp'] * boss_info['jutsu_recoil'])
     
     player_data['current_hp'] -= recoil_damage
     player_data['current_chakra'] -= jutsu_info['chakra_cost']
@@ -464,7 +601,7 @@ async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     await anim.battle_animation_flow(context, battle_state_for_anim, player_data, boss_defender_sim, jutsu_info_for_anim, damage_data)
     
-    boss_defeated, new_boss_hp = _update_boss_and_player_damage(chat_id, user.id, player_data['username'], final_damage, boss_status)
+    boss_defeated, new_boss_hp = boss_engine.apply_hit(chat_id, user.id, player_data['username'], final_damage)
     
     new_cooldown_time_iso = (datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=JUTSU_COOLDOWN_SECONDS)).isoformat()
     player_updates = {
@@ -485,67 +622,20 @@ async def boss_jutsu_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     await anim.edit_battle_message(context, battle_state_for_anim, final_text, reply_markup=None)
     await asyncio.sleep(2.5) 
     
-    if not boss_defeated:
-        updated_boss_status = db.get_boss_status(chat_id)
-        if updated_boss_status and updated_boss_status['is_active']:
-            await send_or_edit_boss_message(context, chat_id, updated_boss_status, boss_info)
-        else:
-            boss_defeated = True 
-    
+    # Only the hit that killed the boss processes the defeat
     if boss_defeated:
-        final_boss_status = db.get_boss_status(chat_id)
-        await _process_boss_defeat(context, chat_id, final_boss_status if final_boss_status else boss_status, boss_info)
+        await _process_boss_defeat(context, chat_id, boss_engine.get_status(chat_id) or boss_status, boss_info)
         if chat_id in ACTIVE_BOSS_MESSAGES:
             del ACTIVE_BOSS_MESSAGES[chat_id]
-
-def _update_boss_and_player_damage(chat_id, user_id, username, damage_dealt, current_boss_status):
-    """Updates boss HP and player damage in the database atomically."""
-    conn = db.get_db_connection()
-    if conn is None:
-        logger.error("DB connection failed...")
-        return False, current_boss_status['current_hp']
-    
-    new_boss_hp = 0
-    boss_defeated = False
-    
-    try:
-        with conn.cursor() as cursor:
-            # Lock the row for update to prevent race conditions
-            cursor.execute("SELECT current_hp FROM world_boss_status WHERE chat_id = %s AND is_active = 1 FOR UPDATE", (chat_id,))
-            current_hp_row = cursor.fetchone()
-            
-            if not current_hp_row: 
-                logger.warning(f"Boss in chat {chat_id} already defeated, damage from {user_id} not counted.")
-                conn.rollback()
-                return True, 0 
-                 
-            current_hp = current_hp_row[0]
-            new_boss_hp = max(0, current_hp - damage_dealt)
-            
-            cursor.execute("UPDATE world_boss_status SET current_hp = %s WHERE chat_id = %s AND is_active = 1", (new_boss_hp, chat_id))
-            
-            cursor.execute(
-                """INSERT INTO world_boss_damage (chat_id, user_id, username, total_damage) 
-                   VALUES (%s, %s, %s, %s)
-                   ON CONFLICT(chat_id, user_id) DO UPDATE 
-                   SET total_damage = world_boss_damage.total_damage + %s, username = %s;""",
-                (chat_id, user_id, username, damage_dealt, damage_dealt, username)
-            )
-            
-        conn.commit()
-        if new_boss_hp == 0:
-            boss_defeated = True
-    except (Exception, psycopg2.DatabaseError) as e: 
-        logger.error(f"Error updating boss damage: {e}")
-        conn.rollback()
-        return False, current_boss_status['current_hp']
-    finally: 
-        db.put_db_connection(conn)
-    
-    return boss_defeated, new_boss_hp
+        reset_card(chat_id)
+    else:
+        request_card_update(context, chat_id, overwritten=True)
 
 def _get_top_damage_dealers(chat_id, limit=5):
     """Gets the top damage dealers for a boss fight."""
+    if chat_id in boss_engine.BOSSES:
+        return boss_engine.top_damage(chat_id, limit)  # Redis ZSET / memory, no SQL
+    
     conn = db.get_db_connection()
     if conn is None:
         return []
@@ -562,153 +652,130 @@ def _get_top_damage_dealers(chat_id, limit=5):
     finally: 
         db.put_db_connection(conn)
 
+def compute_boss_rewards(all_damage, total_ryo_pool):
+    """
+    Split a boss's Ryo pool between its attackers.
+    all_damage: [{'user_id', 'username', 'total_damage'}], any order.
+    Returns (rewards {user_id: ryo}, reward_text_parts).
+    """
+    all_damage = sorted(all_damage, key=lambda entry: entry['total_damage'], reverse=True)
+    rewards = {}
+    remaining_pool = total_ryo_pool
+    reward_text_parts = ["<b>--- 💰 Reward Distribution 💰 ---</b>"]
+    
+    # Top 3 get special rewards
+    for place, (share_pct, label) in enumerate([(0.30, "🥇 1st"), (0.20, "🥈 2nd"), (0.10, "🥉 3rd")]):
+        if len(all_damage) <= place:
+            break
+        entry = all_damage[place]
+        amount = int(total_ryo_pool * share_pct)
+        rewards[entry['user_id']] = rewards.get(entry['user_id'], 0) + amount
+        remaining_pool -= amount
+        reward_text_parts.append(f"{label}: {entry['username']} (+{amount:,} Ryo)")
+    
+    # Distribute remaining pool to participants
+    participants = all_damage[3:]
+    if participants and remaining_pool > 0:
+        share = int(remaining_pool / len(participants))
+        if share > 0:
+            reward_text_parts.append(f"\n🤝 Participation Reward: +{share:,} Ryo each!")
+            for participant in participants:
+                rewards[participant['user_id']] = rewards.get(participant['user_id'], 0) + share
+    elif remaining_pool > 0 and len(all_damage) < 3:
+        # Less than 3 players, distribute remaining evenly
+        share = int(remaining_pool / len(all_damage))
+        reward_text_parts.append(f"\n🤝 Extra Reward: +{share:,} Ryo each!")
+        for player in all_damage:
+            rewards[player['user_id']] = rewards.get(player['user_id'], 0) + share
+    
+    return rewards, reward_text_parts
+
 async def _process_boss_defeat(context: ContextTypes.DEFAULT_TYPE, chat_id, boss_status, boss_info):
     """Processes rewards when a boss is defeated."""
     logger.info(f"Boss defeated in chat {chat_id}!")
     await context.bot.send_message(chat_id=chat_id, text=f"🏆💹 **The {boss_info['name']} has been defeated!** 💹🏆", parse_mode="HTML")
     
-    conn = db.get_db_connection()
-    if conn is None:
-        await context.bot.send_message(chat_id, "DB error during reward calculation.")
+    # Make sure every buffered hit is in world_boss_damage before paying out
+    await boss_engine.flush_chat(chat_id)
+    boss_engine.forget(chat_id)
+    
+    all_damage = [
+        {'user_id': user_id, 'username': username, 'total_damage': total_damage}
+        for user_id, username, total_damage in db.get_boss_damage_totals(chat_id)
+    ]
+    
+    if not all_damage:
+        db.payout_boss_rewards(chat_id, {})
+        await context.bot.send_message(chat_id, "No one damaged the boss? No rewards given.")
         return
     
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT user_id, username, total_damage FROM world_boss_damage WHERE chat_id = %s ORDER BY total_damage DESC", (chat_id,))
-             
-            # Use dict_factory logic manually
-            fields = [column[0] for column in cursor.description]
-            all_damage = [dict(zip(fields, row)) for row in cursor.fetchall()]
-
-            if not all_damage:
-                await context.bot.send_message(chat_id, "No one damaged the boss? No rewards given.")
-                cursor.execute("UPDATE world_boss_status SET is_active = 0, current_hp = 0 WHERE chat_id = %s", (chat_id,))
-                cursor.execute("DELETE FROM world_boss_damage WHERE chat_id = %s", (chat_id,))
-                conn.commit()
-                return
-                
-            total_ryo_pool = boss_status['ryo_pool']
-            rewards = {}
-            remaining_pool = total_ryo_pool
-            reward_text_parts = ["<b>--- 💰 Reward Distribution 💰 ---</b>"]
-             
-            # Top 3 get special rewards
-            if len(all_damage) >= 1:
-                amount = int(total_ryo_pool * 0.30)
-                rewards[all_damage[0]['user_id']] = amount
-                remaining_pool -= amount
-                reward_text_parts.append(f"🥇 1st: {all_damage[0]['username']} (+{amount:,} Ryo)")
-            
-            if len(all_damage) >= 2:
-                amount = int(total_ryo_pool * 0.20)
-                rewards[all_damage[1]['user_id']] = rewards.get(all_damage[1]['user_id'], 0) + amount
-                remaining_pool -= amount
-                reward_text_parts.append(f"🥈 2nd: {all_damage[1]['username']} (+{amount:,} Ryo)")
-            
-            if len(all_damage) >= 3:
-                amount = int(total_ryo_pool * 0.10)
-                rewards[all_damage[2]['user_id']] = rewards.get(all_damage[2]['user_id'], 0) + amount
-                remaining_pool -= amount
-                reward_text_parts.append(f"🥉 3rd: {all_damage[2]['username']} (+{amount:,} Ryo)")
-             
-            # Distribute remaining pool to participants
-            participants = all_damage[3:]
-            if participants and remaining_pool > 0:
-                share = int(remaining_pool / len(participants))
-                if share > 0:
-                    reward_text_parts.append(f"\n🤝 Participation Reward: +{share:,} Ryo each!")
-                    for participant in participants:
-                        rewards[participant['user_id']] = rewards.get(participant['user_id'], 0) + share
-            elif remaining_pool > 0 and len(all_damage) < 3:
-                # Less than 3 players, distribute remaining evenly
-                share = int(remaining_pool / len(all_damage))
-                reward_text_parts.append(f"\n🤝 Extra Reward: +{share:,} Ryo each!")
-                for player in all_damage:
-                    rewards[player['user_id']] = rewards.get(player['user_id'], 0) + share
-             
-            # Update all players' Ryo and clear cooldowns
-            player_ids_to_update = list(rewards.keys())
-            for user_id, ryo_gain in rewards.items():
-                cursor.execute("UPDATE players SET ryo = ryo + %s, boss_attack_cooldown = NULL WHERE user_id = %s", (ryo_gain, user_id))
-             
-            # Mark boss as defeated and clean up
-            cursor.execute("UPDATE world_boss_status SET is_active = 0, current_hp = 0 WHERE chat_id = %s", (chat_id,))
-            cursor.execute("DELETE FROM world_boss_damage WHERE chat_id = %s", (chat_id,))
-             
-        conn.commit()
-        
-        # Clear cache for all rewarded players
-        for user_id in player_ids_to_update:
-            db.cache.clear_player_cache(user_id)
-        
-        await context.bot.send_message(chat_id, "\n".join(reward_text_parts), parse_mode="HTML")
-         
-    except (Exception, psycopg2.DatabaseError) as e: 
-        logger.error(f"Error processing boss defeat: {e}")
+    rewards, reward_text_parts = compute_boss_rewards(all_damage, boss_status['ryo_pool'])
+    
+    # One set-based UPDATE for every participant, boss closed in the same transaction
+    if not db.payout_boss_rewards(chat_id, rewards):
         await context.bot.send_message(chat_id, "A database error occurred during reward distribution.")
-        conn.rollback()
-    finally: 
-        db.put_db_connection(conn)
+        return
+    
+    await context.bot.send_message(chat_id, "\n".join(reward_text_parts), parse_mode="HTML")
 
 async def spawn_world_boss(context: ContextTypes.DEFAULT_TYPE):
-    """Job function to check for and spawn world bosses."""
+    """
+    Job function to check for and spawn world bosses.
+    
+    Chats are handled in shards of SPAWN_SHARD_SIZE: one query reads every
+    status in the shard, one bulk upsert spawns all the new bosses, then the
+    announcements go out concurrently under the outbound rate limit.
+    """
+    started = time.perf_counter()
     logger.info("BOSS JOB: Running spawn check...")
     enabled_chat_ids = db.get_all_boss_chats() 
     
     if not enabled_chat_ids: 
         logger.info("BOSS JOB: No enabled chats.")
         return
-        
-    for chat_id in enabled_chat_ids:
-        boss_status = db.get_boss_status(chat_id)
+    
+    spawned_total = 0
+    for i in range(0, len(enabled_chat_ids), SPAWN_SHARD_SIZE):
+        shard = enabled_chat_ids[i:i + SPAWN_SHARD_SIZE]
+        spawned_total += await _spawn_shard(context, shard)
+    
+    logger.info(f"BOSS JOB: Finished spawn check - {len(enabled_chat_ids)} chats, "
+                f"{spawned_total} spawned in {time.perf_counter() - started:.1f}s.")
+
+async def _spawn_shard(context: ContextTypes.DEFAULT_TYPE, chat_ids):
+    """Spawn/re-announce bosses for one shard of chats. Returns the number spawned."""
+    statuses = db.get_boss_statuses(chat_ids)
+    spawn_time_utc = datetime.datetime.now(datetime.timezone.utc)
+    
+    announcements = []
+    spawn_rows = []
+    for chat_id in chat_ids:
+        boss_status = statuses.get(chat_id)
         if boss_status and boss_status.get('is_active'):
-            logger.info(f"BOSS JOB: Boss active in chat {chat_id}.") 
             boss_info = gl.WORLD_BOSSES.get(boss_status['boss_key'])
-            if boss_info: 
-                await send_or_edit_boss_message(context, chat_id, boss_status, boss_info) 
-            continue 
-            
-        logger.info(f"BOSS JOB: Spawning new boss in chat {chat_id}...")
+            if boss_info:
+                announcements.append((chat_id, boss_engine.get_status(chat_id) or boss_status, boss_info))
+            continue
+        
         boss_key = random.choice(list(gl.WORLD_BOSSES.keys()))
         boss_info = gl.WORLD_BOSSES[boss_key]
-        spawn_time_utc = datetime.datetime.now(datetime.timezone.utc)
-        
-        conn = db.get_db_connection()
-        if conn is None:
-            logger.error(f"BOSS JOB: DB connection failed, skipping spawn for chat {chat_id}")
+        spawn_rows.append((chat_id, boss_key, boss_info['hp'], boss_info['ryo_pool'], spawn_time_utc))
+    
+    spawned_chat_ids = db.spawn_bosses(spawn_rows) if spawn_rows else set()
+    if spawn_rows and not spawned_chat_ids:
+        logger.error(f"BOSS JOB: Bulk spawn failed for {len(spawn_rows)} chats")
+    
+    for chat_id, boss_key, hp, ryo_pool, _ in spawn_rows:
+        if chat_id not in spawned_chat_ids:
             continue
-            
-        try:
-            with conn.cursor() as cursor:
-                # Use INSERT ON CONFLICT DO UPDATE
-                cursor.execute("""
-                    INSERT INTO world_boss_status (chat_id, is_active, boss_key, current_hp, max_hp, ryo_pool, spawn_time) 
-                    VALUES (%s, 1, %s, %s, %s, %s, %s)
-                    ON CONFLICT (chat_id) DO UPDATE SET
-                        is_active = 1,
-                        boss_key = %s,
-                        current_hp = %s,
-                        max_hp = %s,
-                        ryo_pool = %s,
-                        spawn_time = %s
-                """, 
-                (chat_id, boss_key, boss_info['hp'], boss_info['hp'], boss_info['ryo_pool'], spawn_time_utc,
-                 boss_key, boss_info['hp'], boss_info['hp'], boss_info['ryo_pool'], spawn_time_utc))
-                
-                cursor.execute("DELETE FROM world_boss_damage WHERE chat_id = %s", (chat_id,))
-            conn.commit()
-            logger.info(f"BOSS JOB: Spawn successful for {boss_info['name']} in chat {chat_id}")
-        except (Exception, psycopg2.DatabaseError) as e: 
-            logger.error(f"BOSS JOB: DB error spawning boss: {e}")
-            conn.rollback()
-        finally:
-            db.put_db_connection(conn)
-            
-        new_boss_status = db.get_boss_status(chat_id)
-        if new_boss_status and new_boss_status['is_active']:
-            await send_or_edit_boss_message(context, chat_id, new_boss_status, boss_info)
-            await asyncio.sleep(0.5) 
-        else: 
-            logger.error(f"BOSS JOB: Failed get status after spawn {chat_id}")
-    
-    logger.info("BOSS JOB: Finished spawn check.")
+        boss_engine.forget(chat_id)
+        boss_engine.start_boss(chat_id, boss_key, hp, ryo_pool)
+        ACTIVE_BOSS_MESSAGES.pop(chat_id, None)
+        reset_card(chat_id)
+        announcements.append((chat_id, boss_engine.get_status(chat_id), gl.WORLD_BOSSES[boss_key]))
+    
+    await asyncio.gather(*(
+        send_or_edit_boss_message(context, chat_id, boss_status, boss_info)
+        for chat_id, boss_status, boss_info in announcements
+    ))
+    return len(spawned_chat_ids)